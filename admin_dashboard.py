@@ -1,13 +1,58 @@
+import os
+import glob
+import time
+import tempfile
 import streamlit as st
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
 from datetime import datetime, date, timedelta
 from psycopg2.extras import RealDictCursor
 from utils import (
     create_pie_chart, create_bar_chart, format_currency, 
     format_date, format_datetime, create_data_table,
     validate_email, validate_phone, get_flat_numbers,
-    generate_unique_key
+    generate_unique_key, section_fragment, rerun_section, create_heatmap,
+    visitor_pass_status
 )
+from login_throttle import get_login_throttle
+from database import VISITOR_PAGE_SIZE
+from visitor_rollups import refresh_visitor_rollups
+from columnar import fetch_arrow, format_timestamps, title_case, flags
+from models import (
+    User, ResidentBill, UserComplaint, Visitor, SentNotification, Poll, AdminPoll,
+    fetch_all, fetch_one
+)
+import dashboard_sql as sql
+
+# Current visitors board: seconds between delta polls, how far each poll looks
+# back past the last updated_at it saw (to catch late commits), and how long
+# the board can go unpolled before it is read in full again
+VISITOR_BOARD_REFRESH_SECONDS = 5
+VISITOR_BOARD_OVERLAP = timedelta(seconds=30)
+VISITOR_BOARD_MAX_IDLE = timedelta(minutes=10)
+
+# Visitor history exports are temp files; ones older than this were abandoned
+# (logout, closed tab, expired session) and are removed on the next export
+VISITOR_EXPORT_PREFIX = "societysync_visitors_"
+VISITOR_EXPORT_MAX_AGE_SECONDS = int(os.getenv('VISITOR_EXPORT_MAX_AGE_SECONDS', '3600'))
+
+def discard_visitor_export():
+    """Remove this session's prepared visitor export, if any"""
+    export = st.session_state.pop('visitor_export', None)
+    if export and os.path.exists(export['path']):
+        os.remove(export['path'])
+
+def remove_stale_visitor_exports(max_age=VISITOR_EXPORT_MAX_AGE_SECONDS):
+    """Remove export files any session left behind for longer than max_age seconds"""
+    cutoff = time.time() - max_age
+    for path in glob.glob(os.path.join(tempfile.gettempdir(), f"{VISITOR_EXPORT_PREFIX}*")):
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except FileNotFoundError:
+            # Another session cleaned it up first
+            pass
 
 class AdminDashboard:
     def __init__(self, db):
@@ -99,13 +144,7 @@ class AdminDashboard:
         
         # Recent complaints
         cursor = self.db.connection.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("""
-            SELECT c.title, c.flat_number, c.priority, c.created_at, u.name
-            FROM complaints c
-            JOIN users u ON c.user_id = u.user_id
-            ORDER BY c.created_at DESC
-            LIMIT 5
-        """)
+        cursor.execute(sql.LATEST_COMPLAINTS)
         recent_complaints = cursor.fetchall()
         
         if recent_complaints and len(recent_complaints) > 0:
@@ -158,12 +197,7 @@ class AdminDashboard:
                 else:  # tenant
                     # Get available owners for this flat
                     cursor = self.db.connection.cursor(cursor_factory=RealDictCursor)
-                    cursor.execute("""
-                        SELECT o.owner_id, u.name, o.flat_number 
-                        FROM owners o 
-                        JOIN users u ON o.user_id = u.user_id
-                        ORDER BY o.flat_number
-                    """)
+                    cursor.execute(sql.OWNER_OPTIONS)
                     owners = cursor.fetchall()
                     cursor.close()
                     
@@ -243,55 +277,34 @@ class AdminDashboard:
             search_text = st.text_input("Search by Name or Flat", key="user_search_text")
         
         # Get users
-        cursor = self.db.connection.cursor(cursor_factory=RealDictCursor)
-        
-        query = """
-            SELECT user_id, username, role, flat_number, name, email, phone, 
-                   created_at, last_login, password_changed, initial_password
-            FROM users 
-            WHERE role != 'admin'
-        """
-        params = []
-        
-        if role_filter != "all":
-            query += " AND role = %s"
-            params.append(role_filter)
-        
-        if search_text:
-            query += " AND (name ILIKE %s OR flat_number ILIKE %s)"
-            params.extend([f"%{search_text}%", f"%{search_text}%"])
-        
-        query += " ORDER BY created_at DESC"
+        cursor = self.db.connection.cursor()
         
+        query, params = sql.users_query(role=None if role_filter == "all" else role_filter, search=search_text)
         cursor.execute(query, params)
-        users = cursor.fetchall()
+        users = fetch_arrow(cursor)
         cursor.close()
         
-        if users and len(users) > 0:
+        if users.num_rows > 0:
             # Display users in a table format
-            users_data = []
-            for user in users:
-                users_data.append({
-                    'Name': user['name'],
-                    'Role': user['role'].title(),
-                    'Flat': user['flat_number'],
-                    'Email': user['email'],
-                    'Phone': user['phone'],
-                    'Username': user['username'],
-                    'Password Changed': '✅' if user['password_changed'] else '❌',
-                    'Last Login': format_datetime(user['last_login']),
-                    'Created': format_datetime(user['created_at'])
-                })
-            
-            df = pd.DataFrame(users_data)
-            st.dataframe(df, use_container_width=True)
+            table = pa.table({
+                'Name': users['name'],
+                'Role': title_case(users['role']),
+                'Flat': users['flat_number'],
+                'Email': users['email'],
+                'Phone': users['phone'],
+                'Username': users['username'],
+                'Password Changed': flags(users['password_changed'], '✅', '❌'),
+                'Last Login': format_timestamps(users['last_login']),
+                'Created': format_timestamps(users['created_at'])
+            })
+            st.dataframe(table, use_container_width=True)
             
             # Show initial passwords for users who haven't changed them
             st.subheader("🔑 Initial Passwords (Not Changed)")
-            unchanged_users = [user for user in users if not user['password_changed']]
+            unchanged_users = users.filter(pc.invert(pc.fill_null(users['password_changed'], False)))
             
-            if unchanged_users:
-                for user in unchanged_users:
+            if unchanged_users.num_rows > 0:
+                for user in unchanged_users.select(['name', 'username', 'initial_password']).to_pylist():
                     st.write(f"**{user['name']}** ({user['username']}): `{user['initial_password']}`")
             else:
                 st.info("All users have changed their initial passwords.")
@@ -304,12 +317,7 @@ class AdminDashboard:
         
         # User selection
         cursor = self.db.connection.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("""
-            SELECT user_id, name, username, flat_number 
-            FROM users 
-            WHERE role != 'admin'
-            ORDER BY name
-        """)
+        cursor.execute(sql.USER_DETAILS_LIST)
         users = cursor.fetchall()
         
         if users and len(users) > 0:
@@ -318,36 +326,34 @@ class AdminDashboard:
             user_id = user_options[selected_user]
             
             # Get user details
-            cursor.execute("""
-                SELECT * FROM users WHERE user_id = %s
-            """, (user_id,))
-            user = cursor.fetchone()
+            details_cursor = self.db.connection.cursor()
+            details_cursor.execute(sql.USER_BY_ID, (user_id,))
+            user = fetch_one(details_cursor, User)
+            details_cursor.close()
             
             if user:
                 col1, col2 = st.columns(2)
                 
                 with col1:
                     st.write("**Basic Information**")
-                    st.write(f"Name: {user['name']}")
-                    st.write(f"Role: {user['role'].title()}")
-                    st.write(f"Flat Number: {user['flat_number']}")
-                    st.write(f"Email: {user['email']}")
-                    st.write(f"Phone: {user['phone']}")
-                    st.write(f"Username: {user['username']}")
+                    st.write(f"Name: {user.name}")
+                    st.write(f"Role: {user.role.title()}")
+                    st.write(f"Flat Number: {user.flat_number}")
+                    st.write(f"Email: {user.email}")
+                    st.write(f"Phone: {user.phone}")
+                    st.write(f"Username: {user.username}")
                 
                 with col2:
                     st.write("**Account Information**")
-                    st.write(f"Created: {format_datetime(user['created_at'])}")
-                    st.write(f"Last Login: {format_datetime(user['last_login'])}")
-                    st.write(f"Password Changed: {'Yes' if user['password_changed'] else 'No'}")
-                    if not user['password_changed']:
-                        st.write(f"Initial Password: `{user['initial_password']}`")
+                    st.write(f"Created: {format_datetime(user.created_at)}")
+                    st.write(f"Last Login: {format_datetime(user.last_login)}")
+                    st.write(f"Password Changed: {'Yes' if user.password_changed else 'No'}")
+                    if not user.password_changed:
+                        st.write(f"Initial Password: `{user.initial_password}`")
                 
                 # Role-specific information
-                if user['role'] == 'owner':
-                    cursor.execute("""
-                        SELECT * FROM owners WHERE user_id = %s
-                    """, (user_id,))
+                if user.role == 'owner':
+                    cursor.execute(sql.OWNER_BY_USER, (user_id,))
                     owner_info = cursor.fetchone()
                     
                     if owner_info:
@@ -355,14 +361,8 @@ class AdminDashboard:
                         st.write(f"Ownership Start Date: {format_date(owner_info['ownership_start_date'])}")
                         st.write(f"Emergency Contact: {owner_info['emergency_contact']}")
                 
-                elif user['role'] == 'tenant':
-                    cursor.execute("""
-                        SELECT t.*, u.name as owner_name 
-                        FROM tenants t
-                        LEFT JOIN owners o ON t.owner_id = o.owner_id
-                        LEFT JOIN users u ON o.user_id = u.user_id
-                        WHERE t.user_id = %s
-                    """, (user_id,))
+                elif user.role == 'tenant':
+                    cursor.execute(sql.TENANT_BY_USER, (user_id,))
                     tenant_info = cursor.fetchone()
                     
                     if tenant_info:
@@ -440,6 +440,7 @@ class AdminDashboard:
                     except Exception as e:
                         st.error(f"Error creating bill: {e}")
     
+    @section_fragment
     def view_bills(self):
         """View all bills with detailed user information"""
         st.subheader("📋 All Bills")
@@ -460,41 +461,24 @@ class AdminDashboard:
             flat_filter = st.text_input("Filter by Flat Number", key="bill_flat_filter")
         
         # Get bills with user information
-        cursor = self.db.connection.cursor(cursor_factory=RealDictCursor)
-        
-        query = """
-            SELECT b.*, u.name as resident_name, u.role as resident_type
-            FROM bills b
-            LEFT JOIN users u ON b.flat_number = u.flat_number
-            WHERE 1=1
-        """
-        params = []
-        
-        if status_filter != "all":
-            query += " AND b.payment_status = %s"
-            params.append(status_filter)
-        
-        if bill_type_filter != "all":
-            query += " AND b.bill_type = %s"
-            params.append(bill_type_filter)
-        
-        if flat_filter:
-            query += " AND b.flat_number ILIKE %s"
-            params.append(f"%{flat_filter}%")
-        
-        query += " ORDER BY b.created_at DESC"
+        cursor = self.db.connection.cursor()
         
+        query, params = sql.bills_query(
+            status=None if status_filter == "all" else status_filter,
+            bill_type=None if bill_type_filter == "all" else bill_type_filter,
+            flat=flat_filter
+        )
         cursor.execute(query, params)
-        bills = cursor.fetchall()
+        bills = fetch_all(cursor, ResidentBill)
         cursor.close()
         
         # Check for and remove duplicates
         unique_bills = []
         seen_bill_ids = set()
         for bill in bills:
-            if bill['bill_id'] not in seen_bill_ids:
+            if bill.bill_id not in seen_bill_ids:
                 unique_bills.append(bill)
-                seen_bill_ids.add(bill['bill_id'])
+                seen_bill_ids.add(bill.bill_id)
         
         if len(bills) != len(unique_bills):
             st.warning(f"Filtered out {len(bills) - len(unique_bills)} duplicate bills")
@@ -505,36 +489,36 @@ class AdminDashboard:
             
             # Display bills with detailed information
             for i, bill in enumerate(bills):
-                status_color = "🟡" if bill['payment_status'] == 'pending' else ("🟢" if bill['payment_status'] == 'paid' else "🔴")
-                resident_info = f"{bill['resident_name']} ({bill['resident_type'].title()})" if bill['resident_name'] else "No Resident"
+                status_color = "🟡" if bill.payment_status == 'pending' else ("🟢" if bill.payment_status == 'paid' else "🔴")
+                resident_info = f"{bill.resident_name} ({bill.resident_type.title()})" if bill.resident_name else "No Resident"
                 
-                with st.expander(f"{status_color} #{bill['bill_id']} - {bill['bill_type']} - {format_currency(bill['amount'])} - Flat {bill['flat_number']}"):
+                with st.expander(f"{status_color} #{bill.bill_id} - {bill.bill_type} - {format_currency(bill.amount)} - Flat {bill.flat_number}"):
                     col1, col2 = st.columns([2, 1])
                     
                     with col1:
                         st.write(f"**Resident:** {resident_info}")
-                        st.write(f"**Flat Number:** {bill['flat_number']}")
-                        st.write(f"**Bill Type:** {bill['bill_type']}")
-                        st.write(f"**Amount:** {format_currency(bill['amount'])}")
-                        st.write(f"**Due Date:** {format_date(bill['due_date'])}")
-                        st.write(f"**Created:** {format_datetime(bill['created_at'])}")
+                        st.write(f"**Flat Number:** {bill.flat_number}")
+                        st.write(f"**Bill Type:** {bill.bill_type}")
+                        st.write(f"**Amount:** {format_currency(bill.amount)}")
+                        st.write(f"**Due Date:** {format_date(bill.due_date)}")
+                        st.write(f"**Created:** {format_datetime(bill.created_at)}")
                         
-                        if bill['payment_date']:
-                            st.write(f"**Payment Date:** {format_date(bill['payment_date'])}")
-                            st.write(f"**Payment Method:** {bill['payment_method']}")
+                        if bill.payment_date:
+                            st.write(f"**Payment Date:** {format_date(bill.payment_date)}")
+                            st.write(f"**Payment Method:** {bill.payment_method}")
                     
                     with col2:
-                        st.write(f"**Status:** {bill['payment_status'].title()}")
+                        st.write(f"**Status:** {bill.payment_status.title()}")
                         
-                        if bill['payment_status'] == 'pending':
+                        if bill.payment_status == 'pending':
                             st.warning("⏳ Payment Pending")
-                        elif bill['payment_status'] == 'overdue':
+                        elif bill.payment_status == 'overdue':
                             st.error("🚨 Overdue!")
                         else:
                             st.success("✅ Paid")
                         
                         # Admin actions for pending bills
-                        if bill['payment_status'] in ['pending', 'overdue']:
+                        if bill.payment_status in ['pending', 'overdue']:
                             # Create a truly unique key
                             unique_key = generate_unique_key("mark_paid", bill, i)
                             
@@ -546,10 +530,10 @@ class AdminDashboard:
                                         SET payment_status = 'paid', payment_date = CURRENT_DATE, 
                                             payment_method = 'Admin Override'
                                         WHERE bill_id = %s
-                                    """, (bill['bill_id'],))
+                                    """, (bill.bill_id,))
                                     cursor.close()
                                     st.success("Bill marked as paid!")
-                                    st.rerun()
+                                    rerun_section()
                                 except Exception as e:
                                     st.error(f"Error: {e}")
 
@@ -563,16 +547,7 @@ class AdminDashboard:
         cursor = self.db.connection.cursor(cursor_factory=RealDictCursor)
         
         # Payment statistics
-        cursor.execute("""
-            SELECT 
-                COUNT(*) as total_bills,
-                COUNT(CASE WHEN payment_status = 'paid' THEN 1 END) as paid_bills,
-                COUNT(CASE WHEN payment_status = 'pending' THEN 1 END) as pending_bills,
-                COUNT(CASE WHEN payment_status = 'overdue' THEN 1 END) as overdue_bills,
-                SUM(amount) as total_amount,
-                SUM(CASE WHEN payment_status = 'paid' THEN amount ELSE 0 END) as collected_amount
-            FROM bills
-        """)
+        cursor.execute(sql.PAYMENT_STATS)
         
         stats = cursor.fetchone()
         
@@ -607,6 +582,7 @@ class AdminDashboard:
         with tab2:
             self.complaint_analytics()
     
+    @section_fragment
     def view_all_complaints(self):
         """View and manage all complaints"""
         st.subheader("📋 All Complaints")
@@ -627,52 +603,35 @@ class AdminDashboard:
             flat_filter = st.text_input("Filter by Flat", key="complaint_flat_filter")
         
         # Get complaints
-        cursor = self.db.connection.cursor(cursor_factory=RealDictCursor)
-        
-        query = """
-            SELECT c.*, u.name as user_name 
-            FROM complaints c
-            JOIN users u ON c.user_id = u.user_id
-            WHERE 1=1
-        """
-        params = []
-        
-        if status_filter != "all":
-            query += " AND c.status = %s"
-            params.append(status_filter)
-        
-        if priority_filter != "all":
-            query += " AND c.priority = %s"
-            params.append(priority_filter)
-        
-        if flat_filter:
-            query += " AND c.flat_number ILIKE %s"
-            params.append(f"%{flat_filter}%")
-        
-        query += " ORDER BY c.created_at DESC"
+        cursor = self.db.connection.cursor()
         
+        query, params = sql.complaints_query(
+            status=None if status_filter == "all" else status_filter,
+            priority=None if priority_filter == "all" else priority_filter,
+            flat=flat_filter
+        )
         cursor.execute(query, params)
-        complaints = cursor.fetchall()
+        complaints = fetch_all(cursor, UserComplaint)
         
         if complaints and len(complaints) > 0:
             for complaint in complaints:
-                with st.expander(f"#{complaint['complaint_id']} - {complaint['title']} ({complaint['priority'].upper()})"):
+                with st.expander(f"#{complaint.complaint_id} - {complaint.title} ({complaint.priority.upper()})"):
                     col1, col2 = st.columns([2, 1])
                     
                     with col1:
-                        st.write(f"**Complainant:** {complaint['user_name']}")
-                        st.write(f"**Flat:** {complaint['flat_number']}")
-                        st.write(f"**Category:** {complaint['category']}")
-                        st.write(f"**Description:** {complaint['description']}")
-                        if complaint['admin_response']:
-                            st.write(f"**Admin Response:** {complaint['admin_response']}")
+                        st.write(f"**Complainant:** {complaint.user_name}")
+                        st.write(f"**Flat:** {complaint.flat_number}")
+                        st.write(f"**Category:** {complaint.category}")
+                        st.write(f"**Description:** {complaint.description}")
+                        if complaint.admin_response:
+                            st.write(f"**Admin Response:** {complaint.admin_response}")
                     
                     with col2:
-                        st.write(f"**Status:** {complaint['status'].title()}")
-                        st.write(f"**Priority:** {complaint['priority'].title()}")
-                        st.write(f"**Created:** {format_datetime(complaint['created_at'])}")
-                        if complaint['resolved_at']:
-                            st.write(f"**Resolved:** {format_datetime(complaint['resolved_at'])}")
+                        st.write(f"**Status:** {complaint.status.title()}")
+                        st.write(f"**Priority:** {complaint.priority.title()}")
+                        st.write(f"**Created:** {format_datetime(complaint.created_at)}")
+                        if complaint.resolved_at:
+                            st.write(f"**Resolved:** {format_datetime(complaint.resolved_at)}")
                     
                     # Admin actions
                     st.subheader("Admin Actions")
@@ -683,36 +642,36 @@ class AdminDashboard:
                         new_status = st.selectbox(
                             "Update Status",
                             ["open", "in_progress", "resolved", "closed"],
-                            index=["open", "in_progress", "resolved", "closed"].index(complaint['status']),
-                            key=f"status_{complaint['complaint_id']}"
+                            index=["open", "in_progress", "resolved", "closed"].index(complaint.status),
+                            key=f"status_{complaint.complaint_id}"
                         )
                     
                     with col2:
-                        if st.button("Update Status", key=f"update_{complaint['complaint_id']}"):
+                        if st.button("Update Status", key=f"update_{complaint.complaint_id}"):
                             cursor.execute("""
                                 UPDATE complaints 
                                 SET status = %s, updated_at = CURRENT_TIMESTAMP,
                                     resolved_at = CASE WHEN %s = 'resolved' THEN CURRENT_TIMESTAMP ELSE resolved_at END
                                 WHERE complaint_id = %s
-                            """, (new_status, new_status, complaint['complaint_id']))
+                            """, (new_status, new_status, complaint.complaint_id))
                             st.success("Status updated!")
-                            st.rerun()
+                            rerun_section()
                     
                     # Admin response
                     admin_response = st.text_area(
                         "Admin Response",
-                        value=complaint['admin_response'] or "",
-                        key=f"response_{complaint['complaint_id']}"
+                        value=complaint.admin_response or "",
+                        key=f"response_{complaint.complaint_id}"
                     )
                     
-                    if st.button("Save Response", key=f"save_response_{complaint['complaint_id']}"):
+                    if st.button("Save Response", key=f"save_response_{complaint.complaint_id}"):
                         cursor.execute("""
                             UPDATE complaints 
                             SET admin_response = %s, updated_at = CURRENT_TIMESTAMP
                             WHERE complaint_id = %s
-                        """, (admin_response, complaint['complaint_id']))
+                        """, (admin_response, complaint.complaint_id))
                         st.success("Response saved!")
-                        st.rerun()
+                        rerun_section()
         else:
             st.info("No complaints found")
         
@@ -725,33 +684,13 @@ class AdminDashboard:
         cursor = self.db.connection.cursor(cursor_factory=RealDictCursor)
         
         # Complaint statistics
-        cursor.execute("""
-            SELECT 
-                status,
-                COUNT(*) as count
-            FROM complaints
-            GROUP BY status
-        """)
+        cursor.execute(sql.COMPLAINTS_BY_STATUS)
         status_stats = cursor.fetchall()
         
-        cursor.execute("""
-            SELECT 
-                priority,
-                COUNT(*) as count
-            FROM complaints
-            GROUP BY priority
-        """)
+        cursor.execute(sql.COMPLAINTS_BY_PRIORITY)
         priority_stats = cursor.fetchall()
         
-        cursor.execute("""
-            SELECT 
-                category,
-                COUNT(*) as count
-            FROM complaints
-            GROUP BY category
-            ORDER BY count DESC
-            LIMIT 10
-        """)
+        cursor.execute(sql.COMPLAINTS_BY_CATEGORY)
         category_stats = cursor.fetchall()
         
         col1, col2 = st.columns(2)
@@ -788,14 +727,158 @@ class AdminDashboard:
         """Visitor management interface"""
         st.title("🚶 Visitor Management")
         
-        tab1, tab2, tab3 = st.tabs(["Log Visitor", "Current Visitors", "Visitor History"])
+        tab1, tab2, tab3, tab4, tab5 = st.tabs(["Gate Desk", "Log Visitor", "Current Visitors",
+                                                "Visitor History", "Analytics"])
         
         with tab1:
-            self.log_visitor_form()
+            self.gate_desk()
         with tab2:
-            self.current_visitors()
+            self.log_visitor_form()
         with tab3:
+            self.current_visitors()
+        with tab4:
             self.visitor_history()
+        with tab5:
+            self.visitor_analytics()
+    
+    def parse_gate_entries(self, text):
+        """Parse one visitor per line as 'flat, name[, phone[, vehicle[, purpose]]]'
+        
+        Returns (entries, rejected) with entries ready for Database.log_visitors
+        and rejected as (line, reason) pairs.
+        """
+        flats = set(get_flat_numbers())
+        entries, rejected = [], []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            fields = [field.strip() for field in line.split(',', 4)]
+            flat_number, visitor_name, phone, vehicle, purpose = fields + [''] * (5 - len(fields))
+            flat_number = flat_number.upper()
+            if flat_number not in flats:
+                rejected.append((line, f"unknown flat '{flat_number}'"))
+            elif not visitor_name:
+                rejected.append((line, "visitor name is required"))
+            elif phone and not validate_phone(phone):
+                rejected.append((line, f"invalid phone '{phone}'"))
+            else:
+                entries.append((flat_number, visitor_name, phone or None, purpose or None,
+                                vehicle.upper() or None))
+        return entries, rejected
+    
+    def gate_pass_check(self):
+        """Verify a resident's pre-approved pass by code and admit the visitor"""
+        st.subheader("🎫 Pre-approved Pass")
+        with st.form("gate_pass_form", clear_on_submit=True):
+            code = st.text_input("Pass code", key="gate_pass_code")
+            verify = st.form_submit_button("Verify (Enter)", key="gate_pass_verify")
+        
+        if verify and code.strip():
+            st.session_state.gate_pass = self.db.find_visitor_pass(code)
+            if st.session_state.gate_pass is None:
+                st.error(f"No pass with code {code.strip().upper()}")
+        
+        visitor_pass = st.session_state.get('gate_pass')
+        if not visitor_pass:
+            return
+        
+        status = visitor_pass_status(visitor_pass)
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            st.write(f"**{visitor_pass.visitor_name}** for Flat **{visitor_pass.flat_number}**")
+            details = [f"Code {visitor_pass.code}",
+                       f"valid {format_date(visitor_pass.valid_from)} to {format_date(visitor_pass.valid_until)}",
+                       f"{visitor_pass.uses} of {visitor_pass.max_uses} entries used"]
+            if visitor_pass.vehicle_number:
+                details.append(f"vehicle {visitor_pass.vehicle_number}")
+            st.caption(" · ".join(details))
+        with col2:
+            if status == 'valid':
+                if st.button("Admit", key="gate_pass_admit", type="primary"):
+                    visitor_id = self.db.redeem_visitor_pass(visitor_pass.code, st.session_state.user['user_id'])
+                    st.session_state.gate_pass = None
+                    if visitor_id:
+                        st.session_state.gate_desk_notice = (f"Admitted {visitor_pass.visitor_name} to Flat "
+                                                             f"{visitor_pass.flat_number}. Visitor ID: {visitor_id}")
+                        rerun_section()
+                    st.error("The pass was used or revoked in the meantime")
+            else:
+                st.warning(f"Pass is {status}")
+    
+    @section_fragment
+    def gate_desk(self):
+        """Keyboard-driven entry and exit for the gate
+        
+        Entries are typed one per line and inserted in a single statement;
+        exits are looked up by vehicle number or phone on the open entries and
+        checked out together.
+        """
+        notice = st.session_state.pop('gate_desk_notice', None)
+        if notice:
+            st.success(notice)
+        
+        self.gate_pass_check()
+        st.divider()
+        
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            st.subheader("➡️ Entries")
+            with st.form("gate_entry_form", clear_on_submit=True):
+                text = st.text_area("One visitor per line: flat, name, phone, vehicle, purpose",
+                                    placeholder="A011, Ravi Kumar, 9876543210, MH12AB1234, Delivery",
+                                    height=160, key="gate_entry_lines")
+                submit = st.form_submit_button("Log Entries (Ctrl+Enter)", key="gate_entry_submit")
+            
+            if submit:
+                entries, rejected = self.parse_gate_entries(text)
+                if entries:
+                    visitor_ids = self.db.log_visitors(entries, st.session_state.user['user_id'])
+                    st.success(f"Logged {len(visitor_ids)} visitor(s): IDs {', '.join(map(str, visitor_ids))}")
+                if rejected:
+                    # The form was cleared; hand the rejected lines back for correction
+                    st.error("Not logged: " + "; ".join(reason for _, reason in rejected))
+                    st.code("\n".join(line for line, _ in rejected), language=None)
+        
+        with col2:
+            st.subheader("⬅️ Exits")
+            with st.form("gate_exit_form", clear_on_submit=True):
+                lookup = st.text_input("Vehicle numbers or phones, comma separated", key="gate_exit_lookup")
+                auto_checkout = st.checkbox("Check out immediately on a single match", value=True,
+                                            key="gate_exit_auto")
+                find = st.form_submit_button("Find (Enter)", key="gate_exit_find")
+            
+            if find:
+                identifiers = [value for value in lookup.split(',') if value.strip()]
+                matches = self.db.find_open_visitors(identifiers)
+                if auto_checkout and len(identifiers) == 1 and len(matches) == 1:
+                    self.db.check_out_visitors([matches[0].visitor_id])
+                    st.success(f"Checked out {matches[0].visitor_name} (Flat {matches[0].flat_number})")
+                    matches = []
+                elif not matches:
+                    st.warning("No open entries match")
+                st.session_state.gate_exit_matches = matches
+            
+            matches = st.session_state.get('gate_exit_matches') or []
+            if matches:
+                selection = st.data_editor(
+                    pd.DataFrame({
+                        'Check Out': True,
+                        'Name': [v.visitor_name for v in matches],
+                        'Flat': [v.flat_number for v in matches],
+                        'Vehicle': [v.vehicle_number or '' for v in matches],
+                        'Phone': [v.visitor_phone or '' for v in matches],
+                        'Entry': [format_datetime(v.entry_time) for v in matches],
+                    }),
+                    disabled=['Name', 'Flat', 'Vehicle', 'Phone', 'Entry'],
+                    hide_index=True, use_container_width=True, key="gate_exit_selection"
+                )
+                selected = [v.visitor_id for v, checked in zip(matches, selection['Check Out']) if checked]
+                if st.button(f"Check Out {len(selected)} Selected", key="gate_exit_checkout", disabled=not selected):
+                    count = self.db.check_out_visitors(selected)
+                    st.session_state.gate_exit_matches = []
+                    st.session_state.gate_desk_notice = f"Checked out {count} visitor(s)"
+                    rerun_section()
     
     def log_visitor_form(self):
         """Log new visitor form"""
@@ -837,46 +920,82 @@ class AdminDashboard:
                 else:
                     st.error("Please enter visitor name and select flat number")
     
+    def load_visitor_board(self):
+        """Full read of the visitors still inside, plus the watermark later polls start from"""
+        cursor = self.db.connection.cursor()
+        cursor.execute(sql.VISITORS_INSIDE)
+        inside = {visitor.visitor_id: visitor for visitor in fetch_all(cursor, Visitor)}
+        cursor.execute("SELECT LOCALTIMESTAMP")
+        since = cursor.fetchone()[0]
+        cursor.close()
+        return {'inside': inside, 'since': since, 'polled_at': datetime.now()}
+    
+    def poll_visitor_board(self, board):
+        """Merge visitor rows changed since the board's watermark into it
+        
+        Looks back VISITOR_BOARD_OVERLAP before the watermark so rows
+        committed late with an older updated_at are still picked up; merging
+        a row twice is harmless.
+        """
+        cursor = self.db.connection.cursor()
+        cursor.execute(sql.VISITORS_CHANGED_SINCE, (board['since'] - VISITOR_BOARD_OVERLAP,))
+        for visitor in fetch_all(cursor, Visitor):
+            if visitor.status == 'in':
+                board['inside'][visitor.visitor_id] = visitor
+            else:
+                board['inside'].pop(visitor.visitor_id, None)
+            board['since'] = max(board['since'], visitor.updated_at)
+        cursor.close()
+        board['polled_at'] = datetime.now()
+    
+    @section_fragment(run_every=VISITOR_BOARD_REFRESH_SECONDS)
     def current_visitors(self):
-        """View current visitors"""
+        """Live board of current visitors
+        
+        The first render reads everyone inside; every refresh after that only
+        fetches rows whose updated_at moved and merges them into the board
+        kept in session state.
+        """
         st.subheader("👥 Current Visitors")
         
-        cursor = self.db.connection.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("""
-            SELECT * FROM visitors 
-            WHERE status = 'in'
-            ORDER BY entry_time DESC
-        """)
-        current_visitors = cursor.fetchall()
-        
-        if current_visitors and len(current_visitors) > 0:
+        board = st.session_state.get('visitor_board')
+        if board is None or datetime.now() - board['polled_at'] > VISITOR_BOARD_MAX_IDLE:
+            board = st.session_state.visitor_board = self.load_visitor_board()
+        else:
+            self.poll_visitor_board(board)
+        
+        current_visitors = sorted(board['inside'].values(), key=lambda v: v.entry_time or datetime.min, reverse=True)
+        st.caption(f"{len(current_visitors)} inside · refreshes every {VISITOR_BOARD_REFRESH_SECONDS}s")
+        
+        if current_visitors:
             for visitor in current_visitors:
-                with st.expander(f"{visitor['visitor_name']} - Flat {visitor['flat_number']}"):
+                with st.expander(f"{visitor.visitor_name} - Flat {visitor.flat_number}"):
                     col1, col2 = st.columns([2, 1])
                     
                     with col1:
-                        st.write(f"**Name:** {visitor['visitor_name']}")
-                        st.write(f"**Phone:** {visitor['visitor_phone']}")
-                        st.write(f"**Purpose:** {visitor['purpose']}")
-                        st.write(f"**Vehicle:** {visitor['vehicle_number']}")
-                        st.write(f"**Entry Time:** {format_datetime(visitor['entry_time'])}")
+                        st.write(f"**Name:** {visitor.visitor_name}")
+                        st.write(f"**Phone:** {visitor.visitor_phone}")
+                        st.write(f"**Purpose:** {visitor.purpose}")
+                        st.write(f"**Vehicle:** {visitor.vehicle_number}")
+                        st.write(f"**Entry Time:** {format_datetime(visitor.entry_time)}")
                     
                     with col2:
-                        if st.button("Mark Exit", key=f"exit_{visitor['visitor_id']}"):
+                        if st.button("Mark Exit", key=f"exit_{visitor.visitor_id}"):
+                            cursor = self.db.connection.cursor()
                             cursor.execute("""
                                 UPDATE visitors 
-                                SET status = 'out', exit_time = CURRENT_TIMESTAMP
-                                WHERE visitor_id = %s
-                            """, (visitor['visitor_id'],))
+                                SET status = 'out', exit_time = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+                                WHERE visitor_id = %s AND entry_time = %s
+                            """, (visitor.visitor_id, visitor.entry_time))
+                            cursor.close()
                             st.success("Visitor marked as exited!")
-                            st.rerun()
+                            rerun_section()
         else:
             st.info("No current visitors")
-        
-        cursor.close()
 
+    @section_fragment
     def visitor_history(self):
-        """View visitor history"""
+        """Visitor history for a date range and optional flat, keyset paginated, with export"""
         st.subheader("📜 Visitor History")
         
         # Filter options
@@ -884,62 +1003,176 @@ class AdminDashboard:
         with col1:
             flat_filter = st.text_input("Filter by Flat", key="visitor_history_flat_filter")
         with col2:
-            date_filter = st.date_input("Filter by Date", value=None, key="visitor_history_date_filter")
+            today = date.today()
+            date_range = st.date_input("Entry Dates", value=(today - timedelta(days=6), today),
+                                       key="visitor_history_date_filter")
+        
+        # The range picker returns a single date while the second one is being chosen
+        if not isinstance(date_range, (tuple, list)):
+            date_range = (date_range,)
+        start, end = date_range[0], date_range[-1]
+        flat_number = flat_filter.strip().upper() or None
+        
+        # Page start keys for the current filters; index 0 is the newest page
+        filters = (start, end, flat_number)
+        if st.session_state.get('visitor_history_filters') != filters:
+            st.session_state.visitor_history_filters = filters
+            st.session_state.visitor_history_pages = [None]
+        pages = st.session_state.visitor_history_pages
+        
+        try:
+            visitors, has_more = self.db.get_visitor_history(start, end, flat_number, before=pages[-1])
+        except Exception as e:
+            st.error(f"Error fetching visitor history: {e}")
+            return
+        
+        if visitors.num_rows > 0:
+            table = pa.table({
+                'Name': visitors['visitor_name'],
+                'Flat': visitors['flat_number'],
+                'Phone': visitors['visitor_phone'],
+                'Purpose': visitors['purpose'],
+                'Vehicle': visitors['vehicle_number'],
+                'Entry Time': format_timestamps(visitors['entry_time']),
+                'Exit Time': format_timestamps(visitors['exit_time'], missing='Still In'),
+                'Status': title_case(visitors['status'])
+            })
+            st.dataframe(table, use_container_width=True)
+        else:
+            st.info("No visitor records found")
+        
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("◀ Newer", key="visitor_history_newer", disabled=len(pages) == 1):
+                pages.pop()
+                rerun_section()
+        with col2:
+            st.caption(f"Page {len(pages)} · {VISITOR_PAGE_SIZE} per page")
+        with col3:
+            if st.button("Older ▶", key="visitor_history_older", disabled=not has_more):
+                pages.append((visitors['entry_time'][-1].as_py(), visitors['visitor_id'][-1].as_py()))
+                rerun_section()
+        
+        with st.expander("📥 Export this range"):
+            file_format = st.radio("Format", ["csv", "parquet"], horizontal=True, key="visitor_export_format")
+            if st.button("Prepare Export", key="visitor_export_prepare"):
+                discard_visitor_export()
+                remove_stale_visitor_exports()
+                handle, path = tempfile.mkstemp(prefix=VISITOR_EXPORT_PREFIX, suffix=f".{file_format}")
+                os.close(handle)
+                try:
+                    with st.spinner("Exporting..."):
+                        rows = self.db.export_visitor_history(path, file_format, start, end, flat_number)
+                except Exception as e:
+                    os.remove(path)
+                    st.error(f"Error exporting visitor history: {e}")
+                else:
+                    suffix = f"_{flat_number}" if flat_number else ""
+                    st.session_state.visitor_export = {
+                        'path': path,
+                        'rows': rows,
+                        'file_name': f"visitors_{start:%Y%m%d}_{end:%Y%m%d}{suffix}.{file_format}"
+                    }
+            
+            # download_button reads the whole file into the media file store, so it is only
+            # rendered for the run the user asks for it in, and dropped (and freed) on the next
+            export = st.session_state.get('visitor_export')
+            if export and os.path.exists(export['path']):
+                size_mb = os.path.getsize(export['path']) / (1024 * 1024)
+                st.caption(f"{export['file_name']}: {export['rows']:,} rows, {size_mb:.1f} MB")
+                if st.button("Get Download Link", key="visitor_export_link"):
+                    with open(export['path'], 'rb') as f:
+                        st.download_button(f"Download {export['file_name']}", f, file_name=export['file_name'],
+                                           on_click="ignore", key="visitor_export_download")
+    
+    @section_fragment
+    def visitor_analytics(self):
+        """Gate load analytics, read from the rollups visitor_rollups.py maintains"""
+        st.subheader("📊 Visitor Analytics")
         
         cursor = self.db.connection.cursor(cursor_factory=RealDictCursor)
+        cursor.execute(sql.VISITOR_ROLLUP_STATE)
+        state = cursor.fetchone()
+        
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            if state:
+                st.caption(f"Rollups as of {format_datetime(state['refreshed_at'])} "
+                           f"(visitor changes up to {format_datetime(state['watermark'])})")
+            else:
+                st.caption("Rollups have not been built yet")
+        with col2:
+            if st.button("Refresh Rollups", key="visitor_rollups_refresh"):
+                with st.spinner("Refreshing..."):
+                    days = refresh_visitor_rollups(self.db.connection)
+                if days is None:
+                    st.warning("A refresh is already running")
+                else:
+                    cursor.close()
+                    rerun_section()
         
-        query = "SELECT * FROM visitors WHERE 1=1"
-        params = []
+        if not state:
+            cursor.close()
+            return
         
-        # Handle flat filter
-        if flat_filter and flat_filter.strip():
-            query += " AND flat_number ILIKE %s"
-            params.append(f"%{flat_filter.strip()}%")
+        period = st.selectbox("Period", [30, 90, 365], format_func=lambda days: f"Last {days} days",
+                              key="visitor_analytics_period")
+        since = date.today() - timedelta(days=period - 1)
         
-        # Handle date filter - more robust version
-        try:
-            if (date_filter is not None and 
-                hasattr(date_filter, 'strftime') and  # Check if it's a date-like object
-                not pd.isnull(date_filter)):  # Check if it's not a pandas null
-                
-                query += " AND DATE(entry_time) = %s"
-                params.append(date_filter)
-        except (AttributeError, TypeError):
-            # If date_filter is not a proper date object, skip the filter
-            pass
+        cursor.execute(sql.VISITOR_HEATMAP, (since,))
+        hourly = pd.DataFrame(cursor.fetchall(), columns=['weekday', 'hour_of_day', 'visits', 'exits', 'stay_seconds'])
         
-        query += " ORDER BY entry_time DESC LIMIT 100"
+        cursor.execute(sql.VISITOR_TOP_FLATS, (since,))
+        flat_stats = cursor.fetchall()
         
-        try:
-            cursor.execute(query, params)
-            visitors = cursor.fetchall()
-            
-            if visitors and len(visitors) > 0:
-                visitors_data = []
-                for visitor in visitors:
-                    visitors_data.append({
-                        'Name': visitor['visitor_name'],
-                        'Flat': visitor['flat_number'],
-                        'Phone': visitor['visitor_phone'],
-                        'Purpose': visitor['purpose'],
-                        'Vehicle': visitor['vehicle_number'],
-                        'Entry Time': format_datetime(visitor['entry_time']),
-                        'Exit Time': format_datetime(visitor['exit_time']) if visitor['exit_time'] else 'Still In',
-                        'Status': visitor['status'].title()
-                    })
-                
-                df = pd.DataFrame(visitors_data)
-                st.dataframe(df, use_container_width=True)
-            else:
-                st.info("No visitor records found")
+        cursor.execute(sql.VISITOR_FREQUENT_VEHICLES, (since,))
+        vehicle_stats = cursor.fetchall()
+        cursor.close()
         
-        except Exception as e:
-            st.error(f"Error fetching visitor history: {e}")
+        if hourly.empty:
+            st.info("No visitors in this period")
+            return
         
-        finally:
-            cursor.close()
-    
-
+        hourly = hourly.astype({'visits': 'int64', 'exits': 'int64', 'stay_seconds': 'float64'})
+        by_hour = hourly.groupby('hour_of_day')[['visits', 'exits', 'stay_seconds']].sum()
+        total_exits = by_hour['exits'].sum()
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Visits", f"{by_hour['visits'].sum():,}")
+        with col2:
+            average_stay = by_hour['stay_seconds'].sum() / total_exits / 60 if total_exits else 0
+            st.metric("Average Stay", f"{average_stay:.0f} min")
+        with col3:
+            st.metric("Peak Hour", f"{by_hour['visits'].idxmax():02d}:00")
+        
+        weekdays = {1: 'Mon', 2: 'Tue', 3: 'Wed', 4: 'Thu', 5: 'Fri', 6: 'Sat', 7: 'Sun'}
+        fig = create_heatmap(hourly[['weekday', 'hour_of_day', 'visits']], 'hour_of_day', 'weekday', 'visits',
+                             "Visits by Weekday and Hour", y_labels=weekdays)
+        if fig is not None:
+            st.plotly_chart(fig, use_container_width=True)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            stays = by_hour[by_hour['exits'] > 0]
+            stay_minutes = pd.DataFrame({
+                'hour_of_day': stays.index,
+                'minutes': (stays['stay_seconds'] / stays['exits'] / 60).round(1)
+            })
+            fig = create_bar_chart(stay_minutes, 'hour_of_day', 'minutes', "Average Stay by Entry Hour")
+            if fig is not None:
+                st.plotly_chart(fig, use_container_width=True)
+        with col2:
+            if flat_stats:
+                fig = create_bar_chart(flat_stats, 'flat_number', 'visits', "Most Visited Flats")
+                if fig is not None:
+                    st.plotly_chart(fig, use_container_width=True)
+        
+        if vehicle_stats:
+            st.write("**Frequent Vehicles**")
+            st.dataframe(pd.DataFrame(vehicle_stats).rename(columns={
+                'vehicle_number': 'Vehicle', 'flat_number': 'Flat', 'visits': 'Visits', 'days_seen': 'Days Seen'
+            }), use_container_width=True, hide_index=True)
     
     def notification_management(self):
         """Notification management interface"""
@@ -987,25 +1220,17 @@ class AdminDashboard:
         """View notification history"""
         st.subheader("📜 Notification History")
         
-        cursor = self.db.connection.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("""
-            SELECT n.*, u.name as created_by_name,
-                   COUNT(nr.notification_id) as read_count
-            FROM notifications n
-            JOIN users u ON n.created_by = u.user_id
-            LEFT JOIN notification_reads nr ON n.notification_id = nr.notification_id
-            GROUP BY n.notification_id, u.name
-            ORDER BY n.created_at DESC
-        """)
-        notifications = cursor.fetchall()
+        cursor = self.db.connection.cursor()
+        cursor.execute(sql.SENT_NOTIFICATIONS)
+        notifications = fetch_all(cursor, SentNotification)
         
         if notifications and len(notifications) > 0:
             for notification in notifications:
-                with st.expander(f"{notification['title']} - {format_datetime(notification['created_at'])}"):
-                    st.write(f"**Message:** {notification['message']}")
-                    st.write(f"**Priority:** {notification['priority'].title()}")
-                    st.write(f"**Created by:** {notification['created_by_name']}")
-                    st.write(f"**Read by:** {notification['read_count']} users")
+                with st.expander(f"{notification.title} - {format_datetime(notification.created_at)}"):
+                    st.write(f"**Message:** {notification.message}")
+                    st.write(f"**Priority:** {notification.priority.title()}")
+                    st.write(f"**Created by:** {notification.created_by_name}")
+                    st.write(f"**Read by:** {notification.read_count} users")
         else:
             st.info("No notifications found")
         
@@ -1075,46 +1300,35 @@ class AdminDashboard:
                 else:
                     st.error("Please enter poll title and options")
     
+    @section_fragment
     def active_polls(self):
         """View active polls"""
         st.subheader("🗳️ Active Polls")
         
-        cursor = self.db.connection.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("""
-            SELECT p.*, u.name as created_by_name
-            FROM polls p
-            JOIN users u ON p.created_by = u.user_id
-            WHERE p.status = 'active'
-            ORDER BY p.created_at DESC
-        """)
-        polls = cursor.fetchall()
+        cursor = self.db.connection.cursor()
+        cursor.execute(sql.ADMIN_ACTIVE_POLLS)
+        polls = fetch_all(cursor, AdminPoll)
         
         if polls and len(polls) > 0:
             for poll in polls:
-                with st.expander(f"{poll['title']} (Ends: {format_date(poll['end_date'])})"):
-                    st.write(f"**Description:** {poll['description']}")
-                    st.write(f"**Created by:** {poll['created_by_name']}")
-                    st.write(f"**Created:** {format_datetime(poll['created_at'])}")
+                with st.expander(f"{poll.title} (Ends: {format_date(poll.end_date)})"):
+                    st.write(f"**Description:** {poll.description}")
+                    st.write(f"**Created by:** {poll.created_by_name}")
+                    st.write(f"**Created:** {format_datetime(poll.created_at)}")
                     
                     col1, col2 = st.columns(2)
                     
                     with col1:
-                        if st.button("Close Poll", key=f"close_{poll['poll_id']}"):
+                        if st.button("Close Poll", key=f"close_{poll.poll_id}"):
                             cursor.execute("""
                                 UPDATE polls SET status = 'closed' WHERE poll_id = %s
-                            """, (poll['poll_id'],))
+                            """, (poll.poll_id,))
                             st.success("Poll closed!")
-                            st.rerun()
+                            rerun_section()
                     
                     with col2:
                         # Show current vote count
-                        cursor.execute("""
-                            SELECT COUNT(*) as vote_count 
-                            FROM votes 
-                            WHERE poll_id = %s
-                        """, (poll['poll_id'],))
-                        vote_count = cursor.fetchone()['vote_count']
-                        st.write(f"**Total Votes:** {vote_count}")
+                        st.write(f"**Total Votes:** {poll.vote_count}")
         else:
             st.info("No active polls")
         
@@ -1124,29 +1338,21 @@ class AdminDashboard:
         """View poll results"""
         st.subheader("📊 Poll Results")
         
-        cursor = self.db.connection.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("""
-            SELECT * FROM polls 
-            ORDER BY created_at DESC
-        """)
-        polls = cursor.fetchall()
+        cursor = self.db.connection.cursor()
+        cursor.execute(sql.ALL_POLLS)
+        polls = fetch_all(cursor, Poll)
         
         # FIXED: Check length instead of truthiness
         if polls and len(polls) > 0:
+            options_by_poll = self.db.get_poll_options([poll.poll_id for poll in polls])
+            
             for poll in polls:
-                st.write(f"### {poll['title']}")
-                st.write(f"**Status:** {poll['status'].title()}")
-                st.write(f"**End Date:** {format_date(poll['end_date'])}")
+                st.write(f"### {poll.title}")
+                st.write(f"**Status:** {poll.status.title()}")
+                st.write(f"**End Date:** {format_date(poll.end_date)}")
                 
                 # Get poll results
-                cursor.execute("""
-                    SELECT option_text, vote_count 
-                    FROM poll_options 
-                    WHERE poll_id = %s
-                    ORDER BY vote_count DESC
-                """, (poll['poll_id'],))
-                
-                results = cursor.fetchall()
+                results = sorted(options_by_poll[poll.poll_id], key=lambda opt: opt['vote_count'], reverse=True)
                 
                 # FIXED: Check length instead of truthiness
                 if results and len(results) > 0:
@@ -1167,7 +1373,7 @@ class AdminDashboard:
                         # FIXED: Check length and total_votes explicitly
                         if len(results) > 0 and total_votes > 0:
                             results_df = pd.DataFrame(results)
-                            fig = create_bar_chart(results_df, 'option_text', 'vote_count', f"Results: {poll['title']}")
+                            fig = create_bar_chart(results_df, 'option_text', 'vote_count', f"Results: {poll.title}")
                             if fig is not None:
                                 st.plotly_chart(fig, use_container_width=True)
                 else:
@@ -1177,4 +1383,39 @@ class AdminDashboard:
         else:
             st.info("No polls found")
         
-        cursor.close()
\ No newline at end of file
+        cursor.close()
+    
+    def security_management(self):
+        """Security interface"""
+        st.title("🛡️ Security")
+        
+        self.login_throttle_status()
+    
+    def login_throttle_status(self):
+        """View login throttle buckets"""
+        st.subheader("🔐 Login Throttle")
+        
+        throttle = get_login_throttle()
+        settings = throttle.settings()
+        
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Backend", settings['backend'].title())
+        with col2:
+            st.metric("Per-Username Limit", f"{settings['user_burst']} burst")
+            st.caption(f"1 attempt back every {settings['user_refill_seconds']:g}s")
+        with col3:
+            st.metric("Per-Client Limit", f"{settings['client_burst']} burst")
+            st.caption(f"1 attempt back every {settings['client_refill_seconds']:g}s")
+        
+        buckets = throttle.snapshot()
+        
+        if buckets and len(buckets) > 0:
+            blocked = [bucket for bucket in buckets if bucket['blocked_count'] > 0]
+            st.write(f"**Tracking {len(buckets)} buckets, {len(blocked)} with blocked attempts**")
+            
+            df = pd.DataFrame(buckets).sort_values('blocked_count', ascending=False)
+            df.columns = ['Bucket', 'Tokens Left', 'Blocked Attempts', 'Last Seen']
+            st.dataframe(df, use_container_width=True)
+        else:
+            st.info("No login attempts recorded yet")
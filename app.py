@@ -6,6 +6,9 @@ from admin_dashboard import AdminDashboard
 from owner_dashboard import OwnerDashboard
 from tenant_dashboard import TenantDashboard
 from utils import create_sidebar_navigation, display_notification_badge
+from query_stats import page_context
+from rerun_profiler import RerunProfile, profiling_requested, render_perf_panel
+from metrics import start_metrics_export
 
 
 # Page configuration
@@ -16,6 +19,9 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Prometheus-style metrics sidecar / file export (METRICS_PORT, METRICS_FILE)
+start_metrics_export()
+
 
 # Initialize session state
 if 'logged_in' not in st.session_state:
@@ -29,9 +35,11 @@ if 'selected_tab' not in st.session_state:
 # In app.py - improve the main() function
 def main():
     """Main application function"""
+    profile = RerunProfile()
     try:
         # Initialize database and auth manager
-        db = Database()
+        with profile.section("Database"):
+            db = Database()
         
         # Test connection immediately
         try:
@@ -55,17 +63,17 @@ def main():
                 st.rerun()
             return
         
-        auth_manager = AuthManager()
-        
-        # Rest of your main function...
-        
-        # Show loading spinner while checking authentication
-        with st.spinner("Checking authentication..."):
-            authenticated = auth_manager.check_authentication()
+        with profile.section("Auth"):
+            auth_manager = AuthManager()
+            
+            # Show loading spinner while checking authentication
+            with st.spinner("Checking authentication..."):
+                authenticated = auth_manager.check_authentication()
         
         if not authenticated:
             # Show login form
-            auth_manager.login_form()
+            with page_context("login"):
+                auth_manager.login_form()
         else:
             # User is logged in
             user = auth_manager.get_current_user()
@@ -78,10 +86,14 @@ def main():
             user_role = user['role']
             
             # Create sidebar navigation with notification badge
-            unread_notifications = db.get_unread_notifications(user['user_id'])
-            display_notification_badge(len(unread_notifications))
+            with profile.section("Notification badge"):
+                unread_notifications = db.get_unread_notifications(user['user_id'])
+                display_notification_badge(len(unread_notifications))
+            
+            with profile.section("Sidebar"):
+                selected = create_sidebar_navigation(user_role, auth_manager)
             
-            selected = create_sidebar_navigation(user_role, auth_manager)
+            show_profile = profiling_requested(user)
             
             # Override with session state if available
             if st.session_state.selected_tab:
@@ -94,17 +106,22 @@ def main():
                 st.session_state.navigate_to = None
             
             # Route to appropriate dashboard based on role
-            if user_role == 'admin':
-                admin_dashboard = AdminDashboard(db)
-                handle_admin_navigation(admin_dashboard, selected, auth_manager)
+            route = f"{user_role}:{selected}"
+            with page_context(route), profile.page_section(route, sample=show_profile):
+                if user_role == 'admin':
+                    admin_dashboard = AdminDashboard(db)
+                    handle_admin_navigation(admin_dashboard, selected, auth_manager)
+                
+                elif user_role == 'owner':
+                    owner_dashboard = OwnerDashboard(db)
+                    handle_owner_navigation(owner_dashboard, selected, auth_manager)
+                
+                elif user_role == 'tenant':
+                    tenant_dashboard = TenantDashboard(db)
+                    handle_tenant_navigation(tenant_dashboard, selected, auth_manager)
             
-            elif user_role == 'owner':
-                owner_dashboard = OwnerDashboard(db)
-                handle_owner_navigation(owner_dashboard, selected, auth_manager)
-            
-            elif user_role == 'tenant':
-                tenant_dashboard = TenantDashboard(db)
-                handle_tenant_navigation(tenant_dashboard, selected, auth_manager)
+            if show_profile:
+                render_perf_panel(profile)
     
     except Exception as e:
         st.error(f"Application Error: {e}")
@@ -114,6 +131,9 @@ def main():
         # Fallback login form
         if st.button("Try Again"):
             st.experimental_rerun()
+    
+    finally:
+        profile.finish()
 
 
 def handle_admin_navigation(admin_dashboard, selected, auth_manager):
@@ -139,6 +159,9 @@ def handle_admin_navigation(admin_dashboard, selected, auth_manager):
     elif selected == "🗳️ Polls":
         admin_dashboard.poll_management()
     
+    elif selected == "🛡️ Security":
+        admin_dashboard.security_management()
+    
     elif selected == "👤 Profile":
         auth_manager.profile_management()
 
@@ -160,6 +183,9 @@ def handle_owner_navigation(owner_dashboard, selected, auth_manager):
     elif selected == "🗳️ Polls":
         owner_dashboard.show_polls()
     
+    elif selected == "🎫 Visitor Passes":
+        owner_dashboard.show_visitor_passes()
+    
     elif selected == "👤 Profile":
         auth_manager.profile_management()
 
@@ -181,6 +207,9 @@ def handle_tenant_navigation(tenant_dashboard, selected, auth_manager):
     elif selected == "🗳️ Polls":
         tenant_dashboard.show_polls()
     
+    elif selected == "🎫 Visitor Passes":
+        tenant_dashboard.show_visitor_passes()
+    
     elif selected == "👤 Profile":
         auth_manager.profile_management()
 
@@ -1,9 +1,13 @@
 import streamlit as st
 from database import Database
+from login_throttle import get_login_throttle, get_client_id
+from metrics import login_attempts
+from admin_dashboard import discard_visitor_export
 
 class AuthManager:
     def __init__(self):
         self.db = Database()
+        self.throttle = get_login_throttle()
     
     def login_form(self):
         """Display login form"""
@@ -17,14 +21,22 @@ class AuthManager:
             
             if submit:
                 if username and password:
-                    user = self.db.authenticate_user(username, password)
-                    if user:
-                        st.session_state.user = user
-                        st.session_state.logged_in = True
-                        st.success(f"Welcome, {user['name']}!")
-                        st.rerun()
+                    # Reject over-limit attempts before any DB lookup or bcrypt work
+                    if not self.throttle.check(username, get_client_id()):
+                        login_attempts.inc('throttled')
+                        st.error("Too many login attempts. Please wait a minute and try again.")
                     else:
-                        st.error("Invalid username or password")
+                        user = self.db.authenticate_user(username, password)
+                        if user:
+                            login_attempts.inc('success')
+                            self.throttle.record_success(username)
+                            st.session_state.user = user
+                            st.session_state.logged_in = True
+                            st.success(f"Welcome, {user['name']}!")
+                            st.rerun()
+                        else:
+                            login_attempts.inc('failure')
+                            st.error("Invalid username or password")
                 else:
                     st.error("Please enter both username and password")
         
@@ -33,6 +45,7 @@ class AuthManager:
     
     def logout(self):
         """Logout user"""
+        discard_visitor_export()
         for key in list(st.session_state.keys()):
             del st.session_state[key]
         st.rerun()
@@ -125,7 +138,9 @@ class AuthManager:
             if submit_password:
                 if current_password and new_password and confirm_new_password:
                     # Verify current password
-                    if self.db.authenticate_user(user['username'], current_password):
+                    if not self.throttle.check(user['username'], get_client_id()):
+                        st.error("Too many attempts. Please wait a minute and try again.")
+                    elif self.db.authenticate_user(user['username'], current_password):
                         if new_password == confirm_new_password:
                             if len(new_password) >= 6:
                                 self.db.change_password(user['user_id'], new_password)
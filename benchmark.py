@@ -0,0 +1,244 @@
+"""Latency benchmarks for every Database method and dashboard query
+
+Runs against generated datasets at several scales on a local Postgres,
+one database per scale (societysync_bench_<scale>), built with
+generate_data.py on first use:
+
+    python benchmark.py --scales 1k,100k --save-baseline bench_baseline.json
+    python benchmark.py --scales 1k,100k --compare bench_baseline.json
+
+With --compare the run exits non-zero when any case's p50 or p95 regresses
+by more than --threshold (relative) and --min-delta-ms (absolute).
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import statistics
+from datetime import datetime, timedelta
+
+import psycopg2
+from psycopg2.extensions import make_dsn, parse_dsn
+
+import generate_data
+from database import Database
+from query_catalog import DASHBOARD_QUERIES, load_samples
+
+
+SCALES = {
+    '1k': {'flats': 20, 'years': 1, 'visitors': 1_000},
+    '100k': {'flats': 160, 'years': 3, 'visitors': 100_000},
+    '10m': {'flats': 400, 'years': 5, 'visitors': 10_000_000},
+}
+
+
+def database_method_cases(samples):
+    """(name, callable(db), writes) for each public Database method"""
+    return [
+        ('Database.get_society_stats', lambda db: db.get_society_stats(), False),
+        ('Database.get_user_bills', lambda db: db.get_user_bills(samples['flat_number']), False),
+        ('Database.get_user_complaints', lambda db: db.get_user_complaints(samples['owner_user_id']), False),
+        ('Database.get_unread_notifications',
+         lambda db: db.get_unread_notifications(samples['owner_user_id']), False),
+        ('Database.get_poll_options', lambda db: db.get_poll_options(samples['poll_ids']), False),
+        ('Database.get_user_votes',
+         lambda db: db.get_user_votes(samples['owner_user_id'], samples['poll_ids']), False),
+        ('Database.get_visitor_history', lambda db: db.get_visitor_history(
+            samples['visit_date'] - timedelta(days=30), samples['visit_date']), False),
+        ('Database.get_visitor_history (flat)', lambda db: db.get_visitor_history(
+            samples['visit_date'] - timedelta(days=365), samples['visit_date'], samples['flat_number']), False),
+        ('Database.find_open_visitors', lambda db: db.find_open_visitors(samples['gate_identifiers']), False),
+        ('Database.get_user_passes', lambda db: db.get_user_passes(samples['owner_user_id']), False),
+        ('Database.find_visitor_pass', lambda db: db.find_visitor_pass(samples['pass_code']), False),
+        ('Database.generate_username', lambda db: db.generate_username('owner', 'Bench User'), False),
+        ('Database.authenticate_user', lambda db: db.authenticate_user(samples['username'], 'password123'), True),
+        ('Database.pay_bill', lambda db: db.pay_bill(samples['bill_id'], 'UPI'), True),
+        ('Database.create_complaint', lambda db: db.create_complaint(
+            samples['owner_user_id'], samples['flat_number'], 'Bench', 'Benchmark complaint', 'Other', 'low'), True),
+        ('Database.mark_notification_read',
+         lambda db: db.mark_notification_read(samples['notification_id'], samples['owner_user_id']), True),
+        ('Database.log_visitors', lambda db: db.log_visitors(
+            [(samples['flat_number'], f'Bench Visitor {i}', '9876543210', 'Delivery', None) for i in range(20)],
+            samples['owner_user_id']), True),
+        ('Database.check_out_visitors', lambda db: db.check_out_visitors(samples['open_visitor_ids']), True),
+        ('Database.create_visitor_pass', lambda db: db.create_visitor_pass(
+            samples['owner_user_id'], samples['flat_number'], 'Bench Guest', '9876543210', None, 'Guest',
+            samples['visit_date'], samples['visit_date']), True),
+        ('Database.redeem_visitor_pass',
+         lambda db: db.redeem_visitor_pass(samples['pass_code'], samples['owner_user_id']), True),
+        ('Database.change_password', lambda db: db.change_password(samples['owner_user_id'], 'password123'), True),
+        ('Database.create_user', lambda db: db.create_user(
+            'owner', 'Bench User', 'bench@example.com', '9876543210', samples['flat_number']), True),
+    ]
+
+
+def catalog_cases():
+    cases = []
+    for query in DASHBOARD_QUERIES:
+        def run(db, samples, query=query):
+            cursor = db.connection.cursor()
+            cursor.execute(query.sql, query.params(samples))
+            if cursor.description:
+                cursor.fetchall()
+            cursor.close()
+        cases.append((f"{query.source} [{query.name}]", run, query.writes))
+    return cases
+
+
+def time_case(db, func, writes, iterations, warmup):
+    """Run func repeatedly, rolling writes back so every iteration sees the same data"""
+    durations = []
+    for i in range(warmup + iterations):
+        if writes:
+            db.connection.autocommit = False
+        start = time.perf_counter()
+        try:
+            func(db)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            if writes:
+                db.connection.rollback()
+                db.connection.autocommit = True
+        if i >= warmup:
+            durations.append(elapsed)
+    durations.sort()
+    return {
+        'p50_ms': round(statistics.median(durations), 3),
+        'p95_ms': round(durations[min(len(durations) - 1, int(len(durations) * 0.95))], 3),
+        'mean_ms': round(statistics.fmean(durations), 3),
+        'max_ms': round(durations[-1], 3),
+        'iterations': iterations
+    }
+
+
+def scale_url(base_url, scale):
+    return make_dsn(base_url, dbname=f"societysync_bench_{scale}")
+
+
+def ensure_dataset(base_url, scale, rebuild):
+    """Create and populate the per-scale database unless it already holds data"""
+    url = scale_url(base_url, scale)
+    dbname = parse_dsn(url)['dbname']
+    admin = psycopg2.connect(base_url)
+    admin.autocommit = True
+    cursor = admin.cursor()
+    cursor.execute("SELECT 1 FROM pg_database WHERE datname = %s", (dbname,))
+    exists = cursor.fetchone() is not None
+    if not exists:
+        cursor.execute(f'CREATE DATABASE "{dbname}"')
+    cursor.close()
+    admin.close()
+
+    populated = False
+    if exists and not rebuild:
+        connection = psycopg2.connect(url)
+        cursor = connection.cursor()
+        cursor.execute("SELECT to_regclass('public.visitors') IS NOT NULL")
+        if cursor.fetchone()[0]:
+            cursor.execute("SELECT EXISTS (SELECT 1 FROM visitors)")
+            populated = cursor.fetchone()[0]
+        cursor.close()
+        connection.close()
+
+    if not populated:
+        params = SCALES[scale]
+        print(f"Building {scale} dataset in {dbname}...")
+        generate_data.main(['--database-url', url, '--reset', '--flats', str(params['flats']),
+                            '--years', str(params['years']), '--visitors', str(params['visitors'])])
+    return url
+
+
+def run_scale(url, iterations, warmup, only=None):
+    os.environ['DATABASE_URL'] = url
+    db = Database()
+    samples = load_samples(db.connection)
+    cursor = db.connection.cursor()
+    cursor.execute("SELECT username FROM users WHERE user_id = %s", (samples['owner_user_id'],))
+    samples['username'] = cursor.fetchone()[0]
+    cursor.close()
+
+    results = {}
+    cases = database_method_cases(samples)
+    cases += [(name, lambda db, run=run: run(db, samples), writes) for name, run, writes in catalog_cases()]
+    for name, func, writes in cases:
+        if only and only not in name:
+            continue
+        results[name] = time_case(db, func, writes, iterations, warmup)
+        print(f"  {name:<75} p50 {results[name]['p50_ms']:>9.2f} ms   p95 {results[name]['p95_ms']:>9.2f} ms")
+    db.close_connection()
+    return results
+
+
+def compare(results, baseline, threshold, min_delta_ms):
+    """Return a list of human-readable regressions against the baseline"""
+    regressions = []
+    for scale, cases in results.items():
+        for name, current in cases.items():
+            previous = baseline.get('results', {}).get(scale, {}).get(name)
+            if not previous:
+                continue
+            for metric in ('p50_ms', 'p95_ms'):
+                before, after = previous[metric], current[metric]
+                if after > before * (1 + threshold) and after - before > min_delta_ms:
+                    regressions.append(f"[{scale}] {name}: {metric} {before:.2f} -> {after:.2f} ms "
+                                       f"(+{(after / before - 1) * 100 if before else float('inf'):.0f}%)")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SocietySync queries against generated datasets")
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL'),
+                        help="URL of a local Postgres used to create the bench databases (default: $DATABASE_URL)")
+    parser.add_argument('--scales', default='1k,100k', help=f"comma separated, from {', '.join(SCALES)}")
+    parser.add_argument('--iterations', type=int, default=30)
+    parser.add_argument('--warmup', type=int, default=3)
+    parser.add_argument('--only', help="only run cases whose name contains this text")
+    parser.add_argument('--rebuild', action='store_true', help="regenerate the datasets")
+    parser.add_argument('--save-baseline', metavar='PATH', help="write results as a JSON baseline")
+    parser.add_argument('--compare', metavar='PATH', help="compare against a JSON baseline")
+    parser.add_argument('--threshold', type=float, default=0.25, help="allowed relative regression (default: 0.25)")
+    parser.add_argument('--min-delta-ms', type=float, default=1.0,
+                        help="ignore regressions smaller than this many ms (default: 1.0)")
+    parser.add_argument('--output', metavar='PATH', help="write this run's results as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.database_url:
+        raise SystemExit("Set DATABASE_URL or pass --database-url")
+
+    scales = [scale.strip() for scale in args.scales.split(',') if scale.strip()]
+    unknown = [scale for scale in scales if scale not in SCALES]
+    if unknown:
+        raise SystemExit(f"Unknown scale(s): {', '.join(unknown)}")
+
+    results = {}
+    for scale in scales:
+        url = ensure_dataset(args.database_url, scale, args.rebuild)
+        print(f"Benchmarking {scale}...")
+        results[scale] = run_scale(url, args.iterations, args.warmup, args.only)
+
+    report = {'created_at': datetime.now().isoformat(timespec='seconds'), 'results': results}
+    for path in (args.save_baseline, args.output):
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2, sort_keys=True)
+            print(f"Results written to {path}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold, args.min_delta_ms)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.compare}:")
+            for regression in regressions:
+                print(f"  {regression}")
+            sys.exit(1)
+        print(f"\nNo regressions against {args.compare}")
+
+
+if __name__ == "__main__":
+    main()
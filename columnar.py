@@ -0,0 +1,111 @@
+"""Columnar query results
+
+Fetches cursor results straight into Arrow record batches, skipping the
+per-row dicts and the pandas copy on the way to ``st.dataframe`` (which
+accepts a ``pyarrow.Table`` as-is). Also used for exports, since batches
+can be written out as they arrive.
+"""
+
+import typing
+from datetime import date, datetime
+from decimal import Decimal
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+
+FETCH_BATCH_ROWS = 10_000
+
+# Arrow types for the Python types used in models.py annotations
+ARROW_TYPES = {
+    int: pa.int64(),
+    str: pa.string(),
+    bool: pa.bool_(),
+    datetime: pa.timestamp('us'),
+    date: pa.date32(),
+    Decimal: pa.decimal128(12, 2),
+}
+
+
+def model_schema(model):
+    """Arrow schema matching a models.py row class, for writers that need one fixed up front"""
+    fields = []
+    for name, annotation in typing.get_type_hints(model).items():
+        # Optional[X] -> X; every column stays nullable, as the tables don't all declare NOT NULL
+        annotation = next((arg for arg in typing.get_args(annotation) if arg is not type(None)), annotation)
+        fields.append(pa.field(name, ARROW_TYPES[annotation]))
+    return pa.schema(fields)
+
+
+def _column_array(values, type=None):
+    if type is not None:
+        return pa.array(values, type=type)
+    try:
+        return pa.array(values)
+    except (pa.ArrowInvalid, pa.ArrowTypeError, TypeError):
+        # Types Arrow can't infer (bytea memoryviews, mixed values) are shown as text
+        return pa.array([None if value is None else str(value) for value in values], type=pa.string())
+
+
+def iter_record_batches(cursor, batch_size=FETCH_BATCH_ROWS, schema=None):
+    """Yield the cursor's remaining rows as Arrow record batches of up to batch_size rows
+
+    Types are inferred per batch unless a schema is given. Works with named
+    (server-side) cursors, whose description is only set after the first fetch.
+    """
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        if schema is not None:
+            arrays = [_column_array(list(values), field.type) for values, field in zip(zip(*rows), schema)]
+            yield pa.RecordBatch.from_arrays(arrays, schema=schema)
+        else:
+            names = [column[0] for column in cursor.description]
+            arrays = [_column_array(list(values)) for values in zip(*rows)]
+            yield pa.RecordBatch.from_arrays(arrays, names=names)
+
+
+def write_batches(batches, path, file_format, schema):
+    """Write record batches to a CSV or Parquet file as they arrive; returns the row count"""
+    if file_format == 'parquet':
+        writer = pq.ParquetWriter(path, schema, compression='zstd')
+    else:
+        writer = pa_csv.CSVWriter(path, schema)
+    rows = 0
+    with writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def fetch_arrow(cursor, batch_size=FETCH_BATCH_ROWS):
+    """All remaining rows of a tuple cursor as a pyarrow.Table"""
+    names = [column[0] for column in cursor.description]
+    tables = [pa.Table.from_batches([batch]) for batch in iter_record_batches(cursor, batch_size)]
+    if not tables:
+        return pa.table({name: pa.array([], type=pa.null()) for name in names})
+    # Batches infer types independently (e.g. an all-NULL first batch), so let Arrow unify them
+    return pa.concat_tables(tables, promote_options='permissive')
+
+
+def format_timestamps(column, fmt="%d-%m-%Y %H:%M", missing='N/A'):
+    """Arrow counterpart of utils.format_datetime for a whole column"""
+    if pa.types.is_null(column.type):
+        return pa.array([missing] * len(column), type=pa.string())
+    if pa.types.is_date(column.type):
+        column = pc.cast(column, pa.timestamp('s'))
+    return pc.fill_null(pc.strftime(column, format=fmt), missing)
+
+
+def title_case(column):
+    if pa.types.is_null(column.type):
+        return column
+    return pc.utf8_title(column)
+
+
+def flags(column, true_label, false_label):
+    return pc.if_else(pc.fill_null(column, False), true_label, false_label)
@@ -0,0 +1,262 @@
+"""SQL the dashboards run directly on ``db.connection``
+
+The pages execute these statements and query_catalog.py names them for
+benchmark.py, load_test.py, query_budget.py and explain_plans.py, so the
+tools always measure the SQL the pages actually run. Queries whose WHERE
+clause depends on page filters are built by a ``*_query`` function that
+returns ``(sql, params)``.
+"""
+
+from models import (
+    User, Bill, ResidentBill, Complaint, UserComplaint, Visitor, UserNotification,
+    SentNotification, Poll, AdminPoll
+)
+
+
+# ---------------------------------------------------------------- admin
+
+LATEST_COMPLAINTS = """
+    SELECT c.title, c.flat_number, c.priority, c.created_at, u.name
+    FROM complaints c
+    JOIN users u ON c.user_id = u.user_id
+    ORDER BY c.created_at DESC
+    LIMIT 5
+"""
+
+OWNER_OPTIONS = """
+    SELECT o.owner_id, u.name, o.flat_number
+    FROM owners o
+    JOIN users u ON o.user_id = u.user_id
+    ORDER BY o.flat_number
+"""
+
+USER_DETAILS_LIST = """
+    SELECT user_id, name, username, flat_number
+    FROM users
+    WHERE role != 'admin'
+    ORDER BY name
+"""
+
+USER_BY_ID = f"""
+    SELECT {User.columns()} FROM users WHERE user_id = %s
+"""
+
+OWNER_BY_USER = """
+    SELECT * FROM owners WHERE user_id = %s
+"""
+
+TENANT_BY_USER = """
+    SELECT t.*, u.name as owner_name
+    FROM tenants t
+    LEFT JOIN owners o ON t.owner_id = o.owner_id
+    LEFT JOIN users u ON o.user_id = u.user_id
+    WHERE t.user_id = %s
+"""
+
+PAYMENT_STATS = """
+    SELECT
+        COUNT(*) as total_bills,
+        COUNT(CASE WHEN payment_status = 'paid' THEN 1 END) as paid_bills,
+        COUNT(CASE WHEN payment_status = 'pending' THEN 1 END) as pending_bills,
+        COUNT(CASE WHEN payment_status = 'overdue' THEN 1 END) as overdue_bills,
+        SUM(amount) as total_amount,
+        SUM(CASE WHEN payment_status = 'paid' THEN amount ELSE 0 END) as collected_amount
+    FROM bills
+"""
+
+COMPLAINTS_BY_STATUS = """
+    SELECT status, COUNT(*) as count FROM complaints GROUP BY status
+"""
+
+COMPLAINTS_BY_PRIORITY = """
+    SELECT priority, COUNT(*) as count FROM complaints GROUP BY priority
+"""
+
+COMPLAINTS_BY_CATEGORY = """
+    SELECT category, COUNT(*) as count FROM complaints
+    GROUP BY category ORDER BY count DESC LIMIT 10
+"""
+
+VISITORS_INSIDE = f"""
+    SELECT {Visitor.columns()} FROM visitors
+    WHERE status = 'in'
+    ORDER BY entry_time DESC
+"""
+
+VISITORS_CHANGED_SINCE = f"""
+    SELECT {Visitor.columns()} FROM visitors
+    WHERE updated_at > %s
+    ORDER BY updated_at
+"""
+
+VISITOR_ROLLUP_STATE = """
+    SELECT watermark, refreshed_at FROM rollup_state WHERE name = 'visitors'
+"""
+
+VISITOR_HEATMAP = """
+    SELECT EXTRACT(ISODOW FROM hour)::int AS weekday, EXTRACT(HOUR FROM hour)::int AS hour_of_day,
+           SUM(visits) AS visits, SUM(exits) AS exits, SUM(stay_seconds) AS stay_seconds
+    FROM visitor_hourly
+    WHERE hour >= %s
+    GROUP BY 1, 2
+"""
+
+VISITOR_TOP_FLATS = """
+    SELECT flat_number, SUM(visits) AS visits
+    FROM visitor_flat_daily
+    WHERE day >= %s
+    GROUP BY flat_number
+    ORDER BY visits DESC
+    LIMIT 15
+"""
+
+VISITOR_FREQUENT_VEHICLES = """
+    SELECT vehicle_number, flat_number, SUM(visits) AS visits, COUNT(*) AS days_seen
+    FROM visitor_vehicle_daily
+    WHERE day >= %s
+    GROUP BY vehicle_number, flat_number
+    ORDER BY visits DESC
+    LIMIT 15
+"""
+
+SENT_NOTIFICATIONS = f"""
+    SELECT {SentNotification.columns('n')}
+    FROM notifications n
+    JOIN users u ON n.created_by = u.user_id
+    LEFT JOIN notification_reads nr ON n.notification_id = nr.notification_id
+    GROUP BY n.notification_id, u.name
+    ORDER BY n.created_at DESC
+"""
+
+ADMIN_ACTIVE_POLLS = f"""
+    SELECT {AdminPoll.columns('p')}
+    FROM polls p
+    JOIN users u ON p.created_by = u.user_id
+    WHERE p.status = 'active'
+    ORDER BY p.created_at DESC
+"""
+
+ALL_POLLS = f"""
+    SELECT {Poll.columns()} FROM polls ORDER BY created_at DESC
+"""
+
+
+def users_query(role=None, search=None):
+    """Non-admin users, optionally of one role and matching a name/flat search"""
+    sql = f"""
+        SELECT {User.columns()}
+        FROM users
+        WHERE role != 'admin'
+    """
+    params = []
+    if role:
+        sql += " AND role = %s"
+        params.append(role)
+    if search:
+        sql += " AND (name ILIKE %s OR flat_number ILIKE %s)"
+        params.extend([f"%{search}%", f"%{search}%"])
+    sql += " ORDER BY created_at DESC"
+    return sql, params
+
+
+def bills_query(status=None, bill_type=None, flat=None):
+    """Bills with the resident of the flat, filtered like the admin bills page"""
+    sql = f"""
+        SELECT {ResidentBill.columns('b')}
+        FROM bills b
+        LEFT JOIN users u ON b.flat_number = u.flat_number
+        WHERE 1=1
+    """
+    params = []
+    if status:
+        sql += " AND b.payment_status = %s"
+        params.append(status)
+    if bill_type:
+        sql += " AND b.bill_type = %s"
+        params.append(bill_type)
+    if flat:
+        sql += " AND b.flat_number ILIKE %s"
+        params.append(f"%{flat}%")
+    sql += " ORDER BY b.created_at DESC"
+    return sql, params
+
+
+def complaints_query(status=None, priority=None, flat=None):
+    """Complaints with the complainant's name, filtered like the admin complaints page"""
+    sql = f"""
+        SELECT {UserComplaint.columns('c')}
+        FROM complaints c
+        JOIN users u ON c.user_id = u.user_id
+        WHERE 1=1
+    """
+    params = []
+    if status:
+        sql += " AND c.status = %s"
+        params.append(status)
+    if priority:
+        sql += " AND c.priority = %s"
+        params.append(priority)
+    if flat:
+        sql += " AND c.flat_number ILIKE %s"
+        params.append(f"%{flat}%")
+    sql += " ORDER BY c.created_at DESC"
+    return sql, params
+
+
+# ---------------------------------------------------------------- owner / tenant
+
+PENDING_BILL_COUNT = """
+    SELECT COUNT(*) as count FROM bills WHERE flat_number = %s AND payment_status = 'pending'
+"""
+
+OPEN_COMPLAINT_COUNT = """
+    SELECT COUNT(*) as count FROM complaints WHERE flat_number = %s AND status IN ('open', 'in_progress')
+"""
+
+UNREAD_NOTIFICATION_COUNT = """
+    SELECT COUNT(*) as count
+    FROM notifications n
+    LEFT JOIN notification_reads nr ON n.notification_id = nr.notification_id
+        AND nr.user_id = %s
+    WHERE nr.notification_id IS NULL
+"""
+
+ACTIVE_POLL_COUNT = """
+    SELECT COUNT(*) as count FROM polls WHERE status = 'active'
+"""
+
+RECENT_BILLS = f"""
+    SELECT {Bill.columns()} FROM bills WHERE flat_number = %s ORDER BY created_at DESC LIMIT %s
+"""
+
+RECENT_USER_COMPLAINTS = f"""
+    SELECT {Complaint.columns()} FROM complaints WHERE user_id = %s ORDER BY created_at DESC LIMIT %s
+"""
+
+USER_NOTIFICATIONS = f"""
+    SELECT {UserNotification.columns('n')}
+    FROM notifications n
+    LEFT JOIN notification_reads nr ON n.notification_id = nr.notification_id
+        AND nr.user_id = %s
+    ORDER BY n.created_at DESC
+    LIMIT 20
+"""
+
+ACTIVE_POLLS = f"""
+    SELECT {Poll.columns()} FROM polls WHERE status = 'active' ORDER BY created_at DESC
+"""
+
+CLOSED_POLLS = f"""
+    SELECT {Poll.columns()} FROM polls WHERE status = 'closed' ORDER BY created_at DESC LIMIT 10
+"""
+
+RENT_PAID = """
+    SELECT COALESCE(SUM(amount), 0) as total_paid
+    FROM bills
+    WHERE flat_number = %s AND payment_status = 'paid' AND bill_type = 'Rent'
+"""
+
+MARK_OVERDUE_BILLS = """
+    UPDATE bills SET payment_status = 'overdue'
+    WHERE payment_status = 'pending' AND due_date < CURRENT_DATE
+"""
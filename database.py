@@ -1,10 +1,47 @@
 import psycopg2
 import os
-from psycopg2.extras import RealDictCursor
+from psycopg2.extras import RealDictCursor, execute_values
 import bcrypt
-from datetime import datetime, date
+from datetime import datetime, date, timedelta
 import secrets
 import string
+import time
+import re
+from query_stats import InstrumentedConnection
+from metrics import track_connection, bcrypt_latency
+from models import Bill, Complaint, Notification, Visitor, VisitorPass, fetch_all, fetch_one
+from visitor_partitions import ensure_upcoming_partitions
+from columnar import fetch_arrow, iter_record_batches, model_schema, write_batches
+
+# Vehicle numbers are typed with and without spaces or dashes at the gate; lookups
+# compare this normalized form, which idx_visitors_inside_vehicle indexes
+VEHICLE_KEY_SQL = "upper(regexp_replace(vehicle_number, '[^A-Za-z0-9]', '', 'g'))"
+
+# Rows per visitor history page
+VISITOR_PAGE_SIZE = 100
+
+# Visitor pass codes: no 0/O or 1/I so they can be read out over the phone
+PASS_CODE_ALPHABET = "ABCDEFGHJKLMNPQRSTUVWXYZ23456789"
+PASS_CODE_LENGTH = 6
+
+
+def hash_password(password):
+    start = time.perf_counter()
+    password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+    bcrypt_latency.observe((time.perf_counter() - start) * 1000, 'hash')
+    return password_hash
+
+
+def check_password(password, password_hash):
+    start = time.perf_counter()
+    matches = bcrypt.checkpw(password.encode('utf-8'), password_hash.encode('utf-8'))
+    bcrypt_latency.observe((time.perf_counter() - start) * 1000, 'verify')
+    return matches
+
+
+def normalize_pass_code(code):
+    """Pass codes as stored: upper case, without the spaces or dashes people type"""
+    return re.sub(r'[^A-Za-z0-9]', '', code or '').upper()
 
 
 class Database:
@@ -19,8 +56,9 @@ class Database:
             if not db_url:
                 raise ValueError("DATABASE_URL environment variable is not set")
             
-            self.connection = psycopg2.connect(db_url)
+            self.connection = psycopg2.connect(db_url, connection_factory=InstrumentedConnection)
             self.connection.autocommit = True
+            track_connection(self.connection)
             self.create_tables()
         except Exception as e:
             print(f"Database connection error: {e}")
@@ -105,18 +143,88 @@ class Database:
             )
         """)
         
+        self.create_visitors_table(cursor)
+        
         cursor.execute("""
-            CREATE TABLE IF NOT EXISTS visitors (
-                visitor_id SERIAL PRIMARY KEY,
+            CREATE TABLE IF NOT EXISTS visitor_passes (
+                pass_id SERIAL PRIMARY KEY,
+                code VARCHAR(12) NOT NULL,
                 flat_number VARCHAR(10) NOT NULL,
+                created_by INTEGER REFERENCES users(user_id) ON DELETE CASCADE,
                 visitor_name VARCHAR(100) NOT NULL,
                 visitor_phone VARCHAR(15),
-                purpose VARCHAR(200),
-                entry_time TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                exit_time TIMESTAMP,
                 vehicle_number VARCHAR(20),
-                logged_by INTEGER REFERENCES users(user_id),
-                status VARCHAR(20) DEFAULT 'in' CHECK (status IN ('in', 'out'))
+                purpose VARCHAR(200),
+                valid_from DATE NOT NULL DEFAULT CURRENT_DATE,
+                valid_until DATE NOT NULL,
+                max_uses INTEGER NOT NULL DEFAULT 1 CHECK (max_uses > 0),
+                uses INTEGER NOT NULL DEFAULT 0,
+                status VARCHAR(20) DEFAULT 'active' CHECK (status IN ('active', 'used', 'revoked')),
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # Active codes are unique (and what the gate looks up); used and revoked codes may recur
+        cursor.execute("""
+            DO $$
+            BEGIN
+                IF to_regclass('idx_visitor_passes_active_code') IS NULL THEN
+                    CREATE UNIQUE INDEX idx_visitor_passes_active_code ON visitor_passes (code) WHERE status = 'active';
+                END IF;
+                IF to_regclass('idx_visitor_passes_code') IS NULL THEN
+                    CREATE INDEX idx_visitor_passes_code ON visitor_passes (code);
+                END IF;
+                IF to_regclass('idx_visitor_passes_created_by') IS NULL THEN
+                    CREATE INDEX idx_visitor_passes_created_by ON visitor_passes (created_by, created_at DESC);
+                END IF;
+            END $$
+        """)
+        
+        # Visitor analytics rollups, rebuilt per day from visitors by visitor_rollups.py
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS visitor_hourly (
+                hour TIMESTAMP PRIMARY KEY,
+                visits INTEGER NOT NULL,
+                exits INTEGER NOT NULL,
+                stay_seconds BIGINT NOT NULL
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS visitor_flat_daily (
+                day DATE NOT NULL,
+                flat_number VARCHAR(10) NOT NULL,
+                visits INTEGER NOT NULL,
+                PRIMARY KEY (day, flat_number)
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS visitor_vehicle_daily (
+                day DATE NOT NULL,
+                vehicle_number VARCHAR(20) NOT NULL,
+                flat_number VARCHAR(10) NOT NULL,
+                visits INTEGER NOT NULL,
+                PRIMARY KEY (day, vehicle_number, flat_number)
+            )
+        """)
+        
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS rollup_state (
+                name VARCHAR(50) PRIMARY KEY,
+                watermark TIMESTAMP,
+                refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        
+        # One row per visitor_checkout.py run
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS visitor_checkout_runs (
+                run_id SERIAL PRIMARY KEY,
+                started_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP,
+                cutoff TIMESTAMP NOT NULL,
+                checked_out INTEGER NOT NULL DEFAULT 0
             )
         """)
         
@@ -176,6 +284,65 @@ class Database:
         self.create_default_admin()
         cursor.close()
     
+    def create_visitors_table(self, cursor):
+        """Create visitors (range partitioned by month on entry_time), its indexes and upcoming partitions
+        
+        Indexes created on the parent cascade to every partition. Databases
+        whose visitors table predates partitioning keep working unpartitioned
+        until converted with ``python visitor_partitions.py migrate``.
+        """
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS visitors (
+                visitor_id SERIAL,
+                flat_number VARCHAR(10) NOT NULL,
+                visitor_name VARCHAR(100) NOT NULL,
+                visitor_phone VARCHAR(15),
+                purpose VARCHAR(200),
+                entry_time TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                exit_time TIMESTAMP,
+                vehicle_number VARCHAR(20),
+                logged_by INTEGER REFERENCES users(user_id),
+                status VARCHAR(20) DEFAULT 'in' CHECK (status IN ('in', 'out')),
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (visitor_id, entry_time)
+            ) PARTITION BY RANGE (entry_time)
+        """)
+        
+        # Databases created before updated_at existed get it without a table rewrite
+        # (older rows stay NULL). Checked first so reruns don't take ALTER/CREATE INDEX locks.
+        cursor.execute(f"""
+            DO $$
+            BEGIN
+                IF NOT EXISTS (SELECT 1 FROM information_schema.columns
+                               WHERE table_name = 'visitors' AND column_name = 'updated_at') THEN
+                    ALTER TABLE visitors ADD COLUMN updated_at TIMESTAMP;
+                    ALTER TABLE visitors ALTER COLUMN updated_at SET DEFAULT CURRENT_TIMESTAMP;
+                END IF;
+                IF to_regclass('idx_visitors_updated_at') IS NULL THEN
+                    CREATE INDEX idx_visitors_updated_at ON visitors (updated_at);
+                END IF;
+                IF to_regclass('idx_visitors_inside') IS NULL THEN
+                    CREATE INDEX idx_visitors_inside ON visitors (entry_time DESC) WHERE status = 'in';
+                END IF;
+                IF to_regclass('idx_visitors_inside_vehicle') IS NULL THEN
+                    CREATE INDEX idx_visitors_inside_vehicle ON visitors (({VEHICLE_KEY_SQL})) WHERE status = 'in';
+                END IF;
+                IF to_regclass('idx_visitors_inside_phone') IS NULL THEN
+                    CREATE INDEX idx_visitors_inside_phone ON visitors (visitor_phone) WHERE status = 'in';
+                END IF;
+                -- Rows arrive in entry_time order, so a BRIN index narrows date ranges to a
+                -- few block ranges at a fraction of a btree's size
+                IF to_regclass('idx_visitors_entry_time_brin') IS NULL THEN
+                    CREATE INDEX idx_visitors_entry_time_brin ON visitors USING brin (entry_time);
+                END IF;
+                IF to_regclass('idx_visitors_flat_entry') IS NULL THEN
+                    CREATE INDEX idx_visitors_flat_entry ON visitors (flat_number, entry_time DESC);
+                END IF;
+            END $$
+        """)
+        
+        ensure_upcoming_partitions(cursor)
+    
     def create_default_admin(self):
         cursor = self.connection.cursor()
         cursor.execute("SELECT * FROM users WHERE role = 'admin' LIMIT 1")
@@ -184,7 +351,7 @@ class Database:
             return
         
         password = "admin123"
-        password_hash = bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        password_hash = hash_password(password)
         
         cursor.execute("""
             INSERT INTO users (username, password_hash, role, name, email, flat_number)
@@ -225,7 +392,7 @@ class Database:
         user = cursor.fetchone()
         cursor.close()
         
-        if user and bcrypt.checkpw(password.encode('utf-8'), user['password_hash'].encode('utf-8')):
+        if user and check_password(password, user['password_hash']):
             self.update_last_login(user['user_id'])
             return dict(user)
         
@@ -240,7 +407,7 @@ class Database:
     
     def change_password(self, user_id, new_password):
         cursor = self.connection.cursor()
-        password_hash = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        password_hash = hash_password(new_password)
         
         cursor.execute("""
             UPDATE users SET password_hash = %s, password_changed = TRUE 
@@ -255,7 +422,7 @@ class Database:
         
         username = self.generate_username(role, name)
         initial_password = self.generate_password()
-        password_hash = bcrypt.hashpw(initial_password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+        password_hash = hash_password(initial_password)
         
         cursor.execute("""
             INSERT INTO users (username, password_hash, role, flat_number, name, email, phone, initial_password)
@@ -319,15 +486,15 @@ class Database:
         return stats
     
     def get_user_bills(self, flat_number):
-        cursor = self.connection.cursor(cursor_factory=RealDictCursor)
+        cursor = self.connection.cursor()
         
-        cursor.execute("""
-            SELECT * FROM bills 
+        cursor.execute(f"""
+            SELECT {Bill.columns()} FROM bills 
             WHERE flat_number = %s 
             ORDER BY created_at DESC
         """, (flat_number,))
         
-        bills = cursor.fetchall()
+        bills = fetch_all(cursor, Bill)
         cursor.close()
         return bills
     
@@ -344,15 +511,15 @@ class Database:
         return True
     
     def get_user_complaints(self, user_id):
-        cursor = self.connection.cursor(cursor_factory=RealDictCursor)
+        cursor = self.connection.cursor()
         
-        cursor.execute("""
-            SELECT * FROM complaints 
+        cursor.execute(f"""
+            SELECT {Complaint.columns()} FROM complaints 
             WHERE user_id = %s 
             ORDER BY created_at DESC
         """, (user_id,))
         
-        complaints = cursor.fetchall()
+        complaints = fetch_all(cursor, Complaint)
         cursor.close()
         return complaints
     
@@ -370,20 +537,261 @@ class Database:
         return complaint_id
     
     def get_unread_notifications(self, user_id):
-        cursor = self.connection.cursor(cursor_factory=RealDictCursor)
+        cursor = self.connection.cursor()
         
-        cursor.execute("""
-            SELECT n.* FROM notifications n
+        cursor.execute(f"""
+            SELECT {Notification.columns('n')} FROM notifications n
             LEFT JOIN notification_reads nr ON n.notification_id = nr.notification_id 
                 AND nr.user_id = %s
             WHERE nr.notification_id IS NULL
             ORDER BY n.created_at DESC
         """, (user_id,))
         
-        notifications = cursor.fetchall()
+        notifications = fetch_all(cursor, Notification)
         cursor.close()
         return notifications
+
+    def get_poll_options(self, poll_ids):
+        """Options for several polls in one query, as {poll_id: [option, ...]} in option order"""
+        options = {poll_id: [] for poll_id in poll_ids}
+        if not options:
+            return options
+        cursor = self.connection.cursor(cursor_factory=RealDictCursor)
+
+        cursor.execute("""
+            SELECT poll_id, option_id, option_text, vote_count
+            FROM poll_options
+            WHERE poll_id = ANY(%s)
+            ORDER BY poll_id, option_id
+        """, (list(options),))
+
+        for option in cursor.fetchall():
+            options[option['poll_id']].append(option)
+        cursor.close()
+        return options
+
+    def get_user_votes(self, user_id, poll_ids):
+        """The option text a user voted for, as {poll_id: option_text} for the polls they voted in"""
+        if not poll_ids:
+            return {}
+        cursor = self.connection.cursor(cursor_factory=RealDictCursor)
+
+        cursor.execute("""
+            SELECT v.poll_id, po.option_text
+            FROM votes v
+            JOIN poll_options po ON v.option_id = po.option_id
+            WHERE v.user_id = %s AND v.poll_id = ANY(%s)
+        """, (user_id, list(poll_ids)))
+
+        votes = {vote['poll_id']: vote['option_text'] for vote in cursor.fetchall()}
+        cursor.close()
+        return votes
+
+    def log_visitors(self, entries, logged_by):
+        """Insert visitor entries in one statement
+        
+        entries are (flat_number, visitor_name, visitor_phone, purpose, vehicle_number)
+        tuples; returns the new visitor_ids in the same order.
+        """
+        if not entries:
+            return []
+        cursor = self.connection.cursor()
+        
+        rows = execute_values(cursor, """
+            INSERT INTO visitors (flat_number, visitor_name, visitor_phone, purpose, vehicle_number, logged_by)
+            VALUES %s
+            RETURNING visitor_id
+        """, [(*entry, logged_by) for entry in entries], page_size=len(entries), fetch=True)
+        
+        cursor.close()
+        return [row[0] for row in rows]
+    
+    def find_open_visitors(self, identifiers):
+        """Visitors still inside whose vehicle number or phone matches any of identifiers"""
+        vehicles = [re.sub(r'[^A-Za-z0-9]', '', value).upper() for value in identifiers]
+        phones = [value.strip() for value in identifiers] + [re.sub(r'[^0-9]', '', value) for value in identifiers]
+        vehicles, phones = [v for v in vehicles if v], [p for p in phones if p]
+        if not vehicles and not phones:
+            return []
+        cursor = self.connection.cursor()
+        
+        # Two ORed conditions each served by a partial index on the open entries (BitmapOr)
+        cursor.execute(f"""
+            SELECT {Visitor.columns()} FROM visitors
+            WHERE status = 'in'
+              AND ({VEHICLE_KEY_SQL} = ANY(%s) OR visitor_phone = ANY(%s))
+            ORDER BY entry_time DESC
+        """, (vehicles, phones))
+        
+        visitors = fetch_all(cursor, Visitor)
+        cursor.close()
+        return visitors
     
+    def check_out_visitors(self, visitor_ids):
+        """Mark several visitors as exited in one statement; returns how many were still inside"""
+        if not visitor_ids:
+            return 0
+        cursor = self.connection.cursor()
+        
+        cursor.execute("""
+            UPDATE visitors
+            SET status = 'out', exit_time = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+            WHERE visitor_id = ANY(%s) AND status = 'in'
+        """, (list(visitor_ids),))
+        
+        count = cursor.rowcount
+        cursor.close()
+        return count
+
+    def create_visitor_pass(self, user_id, flat_number, visitor_name, visitor_phone, vehicle_number,
+                            purpose, valid_from, valid_until, max_uses=1):
+        """Create a pre-approved visitor pass and return its code"""
+        cursor = self.connection.cursor()
+        
+        code = None
+        while code is None:
+            candidate = ''.join(secrets.choice(PASS_CODE_ALPHABET) for _ in range(PASS_CODE_LENGTH))
+            cursor.execute("""
+                INSERT INTO visitor_passes (code, flat_number, created_by, visitor_name, visitor_phone,
+                                            vehicle_number, purpose, valid_from, valid_until, max_uses)
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (code) WHERE status = 'active' DO NOTHING
+                RETURNING code
+            """, (candidate, flat_number, user_id, visitor_name, visitor_phone or None,
+                  vehicle_number or None, purpose or None, valid_from, valid_until, max_uses))
+            row = cursor.fetchone()
+            code = row[0] if row else None
+        
+        cursor.close()
+        return code
+    
+    def get_user_passes(self, user_id, limit=50):
+        cursor = self.connection.cursor()
+        
+        cursor.execute(f"""
+            SELECT {VisitorPass.columns()} FROM visitor_passes
+            WHERE created_by = %s
+            ORDER BY created_at DESC
+            LIMIT %s
+        """, (user_id, limit))
+        
+        passes = fetch_all(cursor, VisitorPass)
+        cursor.close()
+        return passes
+    
+    def revoke_visitor_pass(self, pass_id, user_id):
+        cursor = self.connection.cursor()
+        
+        cursor.execute("""
+            UPDATE visitor_passes SET status = 'revoked'
+            WHERE pass_id = %s AND created_by = %s AND status = 'active'
+        """, (pass_id, user_id))
+        
+        revoked = cursor.rowcount == 1
+        cursor.close()
+        return revoked
+    
+    def find_visitor_pass(self, code):
+        """The pass a code refers to: the active one if any, else the most recent with that code"""
+        cursor = self.connection.cursor()
+        
+        cursor.execute(f"""
+            SELECT {VisitorPass.columns()} FROM visitor_passes
+            WHERE code = %s
+            ORDER BY status = 'active' DESC, pass_id DESC
+            LIMIT 1
+        """, (normalize_pass_code(code),))
+        
+        visitor_pass = fetch_one(cursor, VisitorPass)
+        cursor.close()
+        return visitor_pass
+    
+    def redeem_visitor_pass(self, code, logged_by):
+        """Use one entry of a valid pass and log the visitor, in one statement
+        
+        Returns the new visitor_id, or None if the code isn't active and
+        valid today.
+        """
+        cursor = self.connection.cursor()
+        
+        cursor.execute("""
+            WITH redeemed AS (
+                UPDATE visitor_passes
+                SET uses = uses + 1,
+                    status = CASE WHEN uses + 1 >= max_uses THEN 'used' ELSE status END
+                WHERE code = %s AND status = 'active'
+                  AND CURRENT_DATE BETWEEN valid_from AND valid_until
+                RETURNING flat_number, visitor_name, visitor_phone, purpose, vehicle_number
+            )
+            INSERT INTO visitors (flat_number, visitor_name, visitor_phone, purpose, vehicle_number, logged_by)
+            SELECT flat_number, visitor_name, visitor_phone, COALESCE(purpose, 'Pre-approved pass'),
+                   vehicle_number, %s
+            FROM redeemed
+            RETURNING visitor_id
+        """, (normalize_pass_code(code), logged_by))
+        
+        row = cursor.fetchone()
+        cursor.close()
+        return row[0] if row else None
+    
+    def visitor_history_filter(self, start, end, flat_number=None):
+        """WHERE clause and params for visitors who entered between two dates (inclusive)"""
+        # A range on entry_time itself lets Postgres prune partitions and use the BRIN index
+        where = "entry_time >= %s AND entry_time < %s"
+        params = [start, end + timedelta(days=1)]
+        if flat_number:
+            where += " AND flat_number = %s"
+            params.append(flat_number)
+        return where, params
+    
+    def get_visitor_history(self, start, end, flat_number=None, before=None, limit=VISITOR_PAGE_SIZE):
+        """One page of visitor history, newest first, as a pyarrow.Table
+        
+        Pages are keyset paginated: before is the (entry_time, visitor_id) of
+        the last row of the previous page. Returns (table, has_more).
+        """
+        where, params = self.visitor_history_filter(start, end, flat_number)
+        if before:
+            # The plain entry_time bound is what the indexes can use; the row comparison breaks ties
+            where += " AND entry_time <= %s AND (entry_time, visitor_id) < (%s, %s)"
+            params += [before[0], before[0], before[1]]
+        cursor = self.connection.cursor()
+        
+        cursor.execute(f"""
+            SELECT {Visitor.columns()} FROM visitors
+            WHERE {where}
+            ORDER BY entry_time DESC, visitor_id DESC
+            LIMIT %s
+        """, params + [limit + 1])
+        
+        table = fetch_arrow(cursor)
+        cursor.close()
+        return table.slice(0, limit), table.num_rows > limit
+    
+    def export_visitor_history(self, path, file_format, start, end, flat_number=None):
+        """Stream visitor history to a CSV or Parquet file through a server-side cursor
+        
+        Rows are fetched and written in FETCH_BATCH_ROWS batches, so memory
+        stays flat however large the range. Returns the number of rows written.
+        """
+        where, params = self.visitor_history_filter(start, end, flat_number)
+        schema = model_schema(Visitor)
+        # Named cursors only live inside a transaction
+        self.connection.autocommit = False
+        try:
+            cursor = self.connection.cursor(name='visitor_history_export')
+            cursor.execute(f"""
+                SELECT {Visitor.columns()} FROM visitors
+                WHERE {where}
+                ORDER BY entry_time, visitor_id
+            """, params)
+            rows = write_batches(iter_record_batches(cursor, schema=schema), path, file_format, schema)
+            cursor.close()
+        finally:
+            self.connection.rollback()
+            self.connection.autocommit = True
+        return rows
+
     def mark_notification_read(self, notification_id, user_id):
         cursor = self.connection.cursor()
         
@@ -0,0 +1,268 @@
+"""EXPLAIN plan capture and regression checks for the hot queries
+
+Collects every statement the Database methods issue (by running them on a
+recording connection) plus the inline dashboard SQL from query_catalog.py,
+runs ``EXPLAIN (ANALYZE, BUFFERS)`` on each against a generated dataset and
+stores the normalized plan trees:
+
+    python explain_plans.py --scale 100k --save plans.json
+    python explain_plans.py --scale 100k --compare plans.json
+
+Flags sequential scans on large tables, row estimates that miss the actual
+count by more than --misestimate-factor, and (with --compare) plan shapes
+that changed since the saved run. Every statement runs in a transaction
+that is rolled back, so writes leave the data untouched.
+"""
+
+import os
+import sys
+import json
+import argparse
+from datetime import datetime
+
+import psycopg2
+import psycopg2.extensions
+
+import benchmark
+from database import Database
+from query_catalog import DASHBOARD_QUERIES, load_samples
+from query_stats import fingerprint
+
+
+# Plan node fields kept in the normalized tree; costs, timings and buffers vary run to run
+PLAN_SHAPE_KEYS = ('Node Type', 'Relation Name', 'Index Name', 'Join Type', 'Strategy',
+                   'Scan Direction', 'Parent Relationship')
+
+
+class RecordingConnection(psycopg2.extensions.connection):
+    """Connection whose cursors keep the bound SQL of every statement they execute"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.recorded = []
+
+    def cursor(self, *args, **kwargs):
+        base = kwargs.pop('cursor_factory', None) or psycopg2.extensions.cursor
+
+        class RecordingCursor(base):
+            def execute(cursor, query, vars=None):
+                self.recorded.append(cursor.mogrify(query, vars).decode('utf-8'))
+                return super().execute(query, vars)
+
+        return super().cursor(*args, cursor_factory=RecordingCursor, **kwargs)
+
+
+def collect_statements(url, samples):
+    """(name, source, sql) for each distinct statement, with parameters bound
+
+    Also returns {name: error} for the Database methods that raised; the
+    statements they issued before failing are still collected.
+    """
+    statements = []
+    failures = {}
+    seen = set()
+
+    def add(name, source, sql):
+        key = fingerprint(sql)
+        if key not in seen:
+            seen.add(key)
+            statements.append((name, source, sql))
+
+    db = Database()
+    db.connection.close()
+    db.connection = psycopg2.connect(url, connection_factory=RecordingConnection)
+    for name, func, _ in benchmark.database_method_cases(samples):
+        db.connection.recorded.clear()
+        try:
+            func(db)
+        except Exception as e:
+            failures[name] = str(e).strip() or type(e).__name__
+        finally:
+            db.connection.rollback()
+        for i, sql in enumerate(db.connection.recorded, 1):
+            add(f"{name} #{i}" if len(db.connection.recorded) > 1 else name, 'database.py', sql)
+
+    cursor = db.connection.cursor()
+    for query in DASHBOARD_QUERIES:
+        add(query.name, query.source, cursor.mogrify(query.sql, query.params(samples)).decode('utf-8'))
+    cursor.close()
+    db.connection.close()
+    return statements, failures
+
+
+def normalize(node):
+    """Plan tree reduced to its shape, so two runs compare equal unless the plan changed"""
+    shape = {key: node[key] for key in PLAN_SHAPE_KEYS if key in node}
+    children = [normalize(child) for child in node.get('Plans', [])]
+    if children:
+        shape['Plans'] = children
+    return shape
+
+
+def plan_findings(node, table_rows, large_table_rows, misestimate_factor, min_rows):
+    """Seq scans on large tables and row misestimates anywhere in the tree"""
+    findings = []
+    relation = node.get('Relation Name')
+    if node['Node Type'] == 'Seq Scan' and table_rows.get(relation, 0) >= large_table_rows:
+        findings.append(f"Seq Scan on {relation} (~{table_rows[relation]:,} rows)")
+
+    loops = node.get('Actual Loops') or 1
+    estimated = node.get('Plan Rows', 0) * loops
+    actual = node.get('Actual Rows', 0) * loops
+    if max(estimated, actual) >= min_rows:
+        ratio = max(estimated, actual) / max(min(estimated, actual), 1)
+        if ratio >= misestimate_factor:
+            target = f" on {relation}" if relation else ""
+            findings.append(f"{node['Node Type']}{target}: estimated {estimated:,} rows, actual {actual:,}")
+
+    for child in node.get('Plans', []):
+        findings.extend(plan_findings(child, table_rows, large_table_rows, misestimate_factor, min_rows))
+    return findings
+
+
+def table_row_estimates(connection):
+    cursor = connection.cursor()
+    cursor.execute("""
+        SELECT c.relname, GREATEST(c.reltuples, 0)::bigint
+        FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE c.relkind IN ('r', 'p') AND n.nspname = 'public'
+    """)
+    rows = dict(cursor.fetchall())
+    cursor.close()
+    return rows
+
+
+def explain(connection, sql):
+    cursor = connection.cursor()
+    try:
+        cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")
+        result = cursor.fetchone()[0]
+    finally:
+        cursor.close()
+        connection.rollback()
+    if isinstance(result, str):
+        result = json.loads(result)
+    return result[0]
+
+
+def capture(url, args):
+    os.environ['DATABASE_URL'] = url
+    connection = psycopg2.connect(url)
+    samples = load_samples(connection)
+    cursor = connection.cursor()
+    cursor.execute("SELECT username FROM users WHERE user_id = %s", (samples['owner_user_id'],))
+    samples['username'] = cursor.fetchone()[0]
+    cursor.close()
+    connection.commit()
+
+    table_rows = table_row_estimates(connection)
+    plans = {}
+    statements, method_failures = collect_statements(url, samples)
+    # {name: {'source', 'error'}} for methods that raised and statements EXPLAIN rejected
+    failures = {}
+    for name, error in method_failures.items():
+        if args.only and args.only not in name:
+            continue
+        failures[name] = {'source': 'database.py', 'error': f"call failed: {error}"}
+        print(f"  {name:<60} call failed: {error}")
+    for name, source, sql in statements:
+        if args.only and args.only not in name:
+            continue
+        try:
+            result = explain(connection, sql)
+        except psycopg2.Error as e:
+            failures[name] = {'source': source, 'error': f"EXPLAIN failed: {str(e).strip()}"}
+            print(f"  {name:<60} {failures[name]['error']}")
+            continue
+        plan = result['Plan']
+        findings = plan_findings(plan, table_rows, args.large_table_rows, args.misestimate_factor, args.min_rows)
+        plans[name] = {
+            'source': source,
+            'fingerprint': fingerprint(sql),
+            'execution_ms': round(result.get('Execution Time', 0.0), 3),
+            'shared_hit': plan.get('Shared Hit Blocks', 0),
+            'shared_read': plan.get('Shared Read Blocks', 0),
+            'plan': normalize(plan),
+            'findings': findings
+        }
+        flag = f"  {len(findings)} finding(s)" if findings else ""
+        print(f"  {name:<60} {plans[name]['execution_ms']:>9.2f} ms{flag}")
+    connection.close()
+    return plans, failures
+
+
+def compare(plans, baseline):
+    """Names of statements whose normalized plan differs from the baseline"""
+    changed = []
+    for name, current in plans.items():
+        previous = baseline.get('plans', {}).get(name)
+        if previous and previous['plan'] != current['plan']:
+            changed.append(name)
+    return changed
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Capture and check EXPLAIN ANALYZE plans for SocietySync queries")
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL'), help="default: $DATABASE_URL")
+    parser.add_argument('--scale', choices=sorted(benchmark.SCALES),
+                        help="run against benchmark.py's generated database for this scale")
+    parser.add_argument('--only', help="only plan statements whose name contains this text")
+    parser.add_argument('--large-table-rows', type=int, default=10_000,
+                        help="flag seq scans on tables with at least this many rows (default: 10000)")
+    parser.add_argument('--misestimate-factor', type=float, default=10,
+                        help="flag nodes whose estimate is off by this factor (default: 10)")
+    parser.add_argument('--min-rows', type=int, default=100,
+                        help="ignore misestimates where both counts are below this (default: 100)")
+    parser.add_argument('--save', metavar='PATH', help="write the normalized plans as JSON")
+    parser.add_argument('--compare', metavar='PATH', help="compare plan shapes against a saved run")
+    parser.add_argument('--strict', action='store_true',
+                        help="also exit non-zero on seq scan / estimate findings and failed statements")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.database_url:
+        raise SystemExit("Set DATABASE_URL or pass --database-url")
+    url = args.database_url
+    if args.scale:
+        url = benchmark.ensure_dataset(args.database_url, args.scale, rebuild=False)
+
+    plans, failures = capture(url, args)
+    report = {'created_at': datetime.now().isoformat(timespec='seconds'), 'plans': plans, 'failures': failures}
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+        print(f"Plans written to {args.save}")
+
+    flagged = {name: plan['findings'] for name, plan in plans.items() if plan['findings']}
+    if flagged:
+        print(f"\n{len(flagged)} statement(s) with findings:")
+        for name, findings in flagged.items():
+            print(f"\n{name} ({plans[name]['source']})")
+            for finding in findings:
+                print(f"  - {finding}")
+
+    if failures:
+        print(f"\n{len(failures)} statement(s) could not be planned:")
+        for name, failure in failures.items():
+            print(f"  {name} ({failure['source']}): {failure['error']}")
+
+    changed = []
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        changed = compare(plans, baseline)
+        if changed:
+            print(f"\n{len(changed)} plan change(s) against {args.compare}:")
+            for name in changed:
+                print(f"  {name} ({plans[name]['source']})")
+        else:
+            print(f"\nNo plan changes against {args.compare}")
+
+    if changed or (args.strict and (flagged or failures)):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
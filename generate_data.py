@@ -0,0 +1,392 @@
+"""Synthetic data generator for large SocietySync societies
+
+Builds a society of configurable size and bulk-loads it with COPY:
+
+    python generate_data.py --flats 400 --years 5 --visitors 5000000 --reset
+
+All generated residents share the password ``password123`` (hashed once).
+The database is taken from --database-url or the DATABASE_URL environment
+variable; tables are created through Database() if they do not exist yet.
+"""
+
+import os
+import io
+import csv
+import time
+import random
+import argparse
+from datetime import date, datetime, timedelta
+
+from database import Database, hash_password
+from visitor_partitions import ensure_partitions
+from visitor_rollups import refresh_visitor_rollups
+
+
+TABLES = ['votes', 'poll_options', 'polls', 'notification_reads', 'notifications', 'visitors',
+          'complaints', 'bills', 'tenants', 'owners', 'users',
+          'visitor_passes', 'visitor_hourly', 'visitor_flat_daily', 'visitor_vehicle_daily', 'rollup_state',
+          'visitor_checkout_runs']
+
+# Sequences to move past the explicitly assigned ids after loading
+SEQUENCES = {
+    'users': ('users_user_id_seq', 'user_id'),
+    'owners': ('owners_owner_id_seq', 'owner_id'),
+    'tenants': ('tenants_tenant_id_seq', 'tenant_id'),
+    'bills': ('bills_bill_id_seq', 'bill_id'),
+    'complaints': ('complaints_complaint_id_seq', 'complaint_id'),
+    'visitors': ('visitors_visitor_id_seq', 'visitor_id'),
+    'notifications': ('notifications_notification_id_seq', 'notification_id'),
+    'notification_reads': ('notification_reads_read_id_seq', 'read_id'),
+    'polls': ('polls_poll_id_seq', 'poll_id'),
+    'poll_options': ('poll_options_option_id_seq', 'option_id'),
+    'votes': ('votes_vote_id_seq', 'vote_id'),
+}
+
+FIRST_NAMES = ['Aarav', 'Vivaan', 'Aditya', 'Vihaan', 'Arjun', 'Sai', 'Reyansh', 'Krishna', 'Ishaan', 'Rohan',
+               'Ananya', 'Diya', 'Priya', 'Isha', 'Kavya', 'Meera', 'Saanvi', 'Aditi', 'Neha', 'Pooja']
+LAST_NAMES = ['Sharma', 'Verma', 'Patel', 'Shukla', 'Iyer', 'Nair', 'Reddy', 'Gupta', 'Mehta', 'Joshi',
+              'Kulkarni', 'Desai', 'Rao', 'Singh', 'Das', 'Bose', 'Menon', 'Pillai', 'Chopra', 'Kapoor']
+COMPLAINT_CATEGORIES = ['Maintenance', 'Plumbing', 'Electrical', 'Security', 'Noise', 'Parking',
+                        'Cleanliness', 'Elevator', 'Water Supply', 'Other']
+VISIT_PURPOSES = ['Delivery', 'Guest', 'Maid', 'Cook', 'Plumber', 'Electrician', 'Cab', 'Courier', 'Relative']
+PAYMENT_METHODS = ['Online Banking', 'UPI', 'Credit Card', 'Debit Card', 'Cash']
+# Relative visitor arrivals per hour of day, peaking in the evening
+HOURLY_WEIGHTS = [1, 1, 1, 1, 1, 2, 4, 8, 10, 9, 8, 8, 9, 8, 7, 7, 9, 12, 16, 18, 15, 10, 5, 2]
+
+
+def flat_numbers(count):
+    """A101-style flat numbers over as many 10-floor, 4-unit blocks as needed"""
+    flats = []
+    block = 0
+    while len(flats) < count:
+        letters = ''
+        n = block
+        while True:
+            letters = chr(ord('A') + n % 26) + letters
+            n = n // 26 - 1
+            if n < 0:
+                break
+        for floor in range(1, 11):
+            for unit in range(1, 5):
+                flats.append(f"{letters}{floor:02d}{unit}")
+        block += 1
+    return flats[:count]
+
+
+def random_name(rng):
+    return f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+
+
+def random_phone(rng):
+    return f"{rng.choice('6789')}{rng.randrange(10 ** 8, 10 ** 9)}"
+
+
+def random_vehicle(rng):
+    return f"MH{rng.randrange(1, 50):02d}{chr(65 + rng.randrange(26))}{chr(65 + rng.randrange(26))}{rng.randrange(1000, 10000)}"
+
+
+def copy_rows(cursor, table, columns, rows, batch_size):
+    """Stream rows into a table with COPY in fixed-size CSV batches"""
+    sql = f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)"
+    total = 0
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= batch_size:
+            buffer.seek(0)
+            cursor.copy_expert(sql, buffer)
+            total += pending
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            pending = 0
+    if pending:
+        buffer.seek(0)
+        cursor.copy_expert(sql, buffer)
+        total += pending
+    return total
+
+
+class SocietyGenerator:
+    def __init__(self, db, args):
+        self.db = db
+        self.args = args
+        self.rng = random.Random(args.seed)
+        self.today = date.today()
+        self.start_date = self.today - timedelta(days=365 * args.years)
+        self.flats = flat_numbers(args.flats)
+        self.password_hash = hash_password('password123')
+        self.next_ids = {}
+        self.residents = []  # (user_id, flat_number)
+
+    def next_id(self, table):
+        if table not in self.next_ids:
+            sequence, column = SEQUENCES[table]
+            cursor = self.db.connection.cursor()
+            cursor.execute(f"SELECT COALESCE(MAX({column}), 0) + 1 FROM {table}")
+            self.next_ids[table] = cursor.fetchone()[0]
+            cursor.close()
+        value = self.next_ids[table]
+        self.next_ids[table] += 1
+        return value
+
+    def load(self, table, columns, rows):
+        start = time.perf_counter()
+        cursor = self.db.connection.cursor()
+        count = copy_rows(cursor, table, columns, rows, self.args.batch_size)
+        cursor.close()
+        print(f"  {table}: {count:,} rows in {time.perf_counter() - start:.1f}s")
+        return count
+
+    def admin_id(self):
+        cursor = self.db.connection.cursor()
+        cursor.execute("SELECT user_id FROM users WHERE role = 'admin' ORDER BY user_id LIMIT 1")
+        admin_id = cursor.fetchone()[0]
+        cursor.close()
+        return admin_id
+
+    def generate(self):
+        self.admin = self.admin_id()
+        self.generate_residents()
+        self.load('bills', ['bill_id', 'flat_number', 'bill_type', 'amount', 'due_date', 'payment_status',
+                            'payment_date', 'payment_method', 'created_at', 'created_by'], self.bill_rows())
+        self.load('complaints', ['complaint_id', 'user_id', 'flat_number', 'title', 'description', 'category',
+                                 'priority', 'status', 'admin_response', 'created_at', 'updated_at',
+                                 'resolved_at'], self.complaint_rows())
+        cursor = self.db.connection.cursor()
+        ensure_partitions(cursor, self.start_date, self.today)
+        cursor.close()
+        self.load('visitors', ['visitor_id', 'flat_number', 'visitor_name', 'visitor_phone', 'purpose',
+                               'entry_time', 'exit_time', 'vehicle_number', 'logged_by', 'status',
+                               'updated_at'],
+                  self.visitor_rows())
+        self.generate_notifications()
+        self.generate_polls()
+        self.finish()
+
+    def generate_residents(self):
+        users, owners, tenants = [], [], []
+        for flat in self.flats:
+            owner_user_id = self.next_id('users')
+            owner_id = self.next_id('owners')
+            joined = self.start_date + timedelta(days=self.rng.randrange(0, 60))
+            users.append((owner_user_id, f"owner_{flat.lower()}_{owner_user_id}", self.password_hash, 'owner',
+                          flat, random_name(self.rng), f"owner{owner_user_id}@example.com",
+                          random_phone(self.rng), datetime.combine(joined, datetime.min.time()), True))
+            owners.append((owner_id, owner_user_id, flat, joined, random_phone(self.rng)))
+            self.residents.append((owner_user_id, flat))
+
+            if self.rng.random() < self.args.tenant_ratio:
+                tenant_user_id = self.next_id('users')
+                lease_start = self.today - timedelta(days=self.rng.randrange(30, 700))
+                lease_end = lease_start + timedelta(days=self.rng.choice([335, 365, 730]))
+                rent = self.rng.randrange(15, 60) * 1000
+                users.append((tenant_user_id, f"tenant_{flat.lower()}_{tenant_user_id}", self.password_hash,
+                              'tenant', flat, random_name(self.rng), f"tenant{tenant_user_id}@example.com",
+                              random_phone(self.rng), datetime.combine(lease_start, datetime.min.time()), True))
+                tenants.append((self.next_id('tenants'), tenant_user_id, owner_id, flat, rent,
+                                lease_start, lease_end, rent * 3))
+                self.residents.append((tenant_user_id, flat))
+
+        self.load('users', ['user_id', 'username', 'password_hash', 'role', 'flat_number', 'name', 'email',
+                            'phone', 'created_at', 'password_changed'], users)
+        self.load('owners', ['owner_id', 'user_id', 'flat_number', 'ownership_start_date',
+                             'emergency_contact'], owners)
+        self.load('tenants', ['tenant_id', 'user_id', 'owner_id', 'flat_number', 'rent_amount',
+                              'lease_start_date', 'lease_end_date', 'security_deposit'], tenants)
+
+    def months(self):
+        month = date(self.start_date.year, self.start_date.month, 1)
+        while month <= self.today:
+            yield month
+            month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+    def bill_rows(self):
+        # Each flat has a steady payment habit: most pay on time, a few are chronic defaulters
+        reliability = {flat: min(0.99, self.rng.betavariate(8, 1.5)) for flat in self.flats}
+        maintenance = {flat: self.rng.choice([2500, 3000, 3500, 4500]) for flat in self.flats}
+        for month in self.months():
+            created_at = datetime.combine(month, datetime.min.time()) + timedelta(hours=9)
+            due_date = month + timedelta(days=14)
+            for flat in self.flats:
+                for bill_type, amount in (('Maintenance', maintenance[flat]),
+                                          ('Electricity', round(self.rng.uniform(800, 4500), 2)),
+                                          ('Water', round(self.rng.uniform(200, 900), 2))):
+                    roll = self.rng.random()
+                    if roll < reliability[flat]:
+                        payment_date = due_date - timedelta(days=self.rng.randrange(0, 14))
+                    elif roll < reliability[flat] + (1 - reliability[flat]) * 0.8:
+                        payment_date = due_date + timedelta(days=self.rng.randrange(1, 45))
+                    else:
+                        payment_date = None
+
+                    if payment_date is not None and payment_date <= self.today:
+                        status, method = 'paid', self.rng.choice(PAYMENT_METHODS)
+                    else:
+                        payment_date = None
+                        status, method = ('overdue' if due_date < self.today else 'pending'), None
+                    yield (self.next_id('bills'), flat, bill_type, amount, due_date, status,
+                           payment_date, method, created_at, self.admin)
+
+    def complaint_rows(self):
+        days = (self.today - self.start_date).days
+        total = int(len(self.residents) * self.args.years * self.args.complaints_per_year)
+        for _ in range(total):
+            user_id, flat = self.rng.choice(self.residents)
+            created_at = datetime.combine(self.start_date, datetime.min.time()) + timedelta(
+                seconds=self.rng.randrange(days * 86400))
+            age_days = (datetime.now() - created_at).days
+            if age_days > 30:
+                status = self.rng.choices(['resolved', 'closed', 'in_progress'], [70, 25, 5])[0]
+            else:
+                status = self.rng.choices(['open', 'in_progress', 'resolved'], [50, 30, 20])[0]
+            resolved_at = created_at + timedelta(hours=self.rng.randrange(2, 240)) if status in ('resolved', 'closed') else None
+            category = self.rng.choice(COMPLAINT_CATEGORIES)
+            yield (self.next_id('complaints'), user_id, flat, f"{category} issue in {flat}",
+                   f"Reported {category.lower()} problem. " * self.rng.randrange(1, 6), category,
+                   self.rng.choices(['low', 'medium', 'high', 'urgent'], [30, 45, 20, 5])[0], status,
+                   "Resolved by maintenance team" if resolved_at else None, created_at,
+                   resolved_at or created_at, resolved_at)
+
+    def visitor_rows(self):
+        """Visitors in entry_time order, so visitor_id correlates with time as it does in production"""
+        days = (self.today - self.start_date).days + 1
+        per_day = self.args.visitors / days
+        hours = list(range(24))
+        now = datetime.now()
+        # Every flat has a handful of regular visitors (maid, cook, relatives) with fixed vehicles
+        regulars = {flat: [(random_name(self.rng), random_phone(self.rng),
+                            random_vehicle(self.rng) if self.rng.random() < 0.4 else None)
+                           for _ in range(self.rng.randrange(2, 6))] for flat in self.flats}
+        produced = 0
+        for day in range(days):
+            day_start = datetime.combine(self.start_date + timedelta(days=day), datetime.min.time())
+            count = int(per_day * (day + 1)) - int(per_day * day)
+            entries = sorted(day_start + timedelta(hours=self.rng.choices(hours, HOURLY_WEIGHTS)[0],
+                                                   seconds=self.rng.randrange(3600)) for _ in range(count))
+            for entry_time in entries:
+                if entry_time > now:
+                    continue
+                flat = self.rng.choice(self.flats)
+                if self.rng.random() < 0.6:
+                    name, phone, vehicle = self.rng.choice(regulars[flat])
+                else:
+                    name, phone = random_name(self.rng), random_phone(self.rng)
+                    vehicle = random_vehicle(self.rng) if self.rng.random() < 0.25 else None
+                stay = timedelta(minutes=min(720, self.rng.lognormvariate(3.4, 0.9)))
+                exit_time = entry_time + stay
+                if exit_time > now or self.rng.random() < self.args.missed_exit_ratio:
+                    exit_time, status = None, 'in'
+                else:
+                    status = 'out'
+                produced += 1
+                yield (self.next_id('visitors'), flat, name, phone, self.rng.choice(VISIT_PURPOSES),
+                       entry_time, exit_time, vehicle, self.admin, status, exit_time or entry_time)
+                if produced >= self.args.visitors:
+                    return
+
+    def generate_notifications(self):
+        notifications = []
+        weeks = self.args.years * 52
+        for week in range(weeks):
+            notification_id = self.next_id('notifications')
+            created_at = datetime.combine(self.start_date, datetime.min.time()) + timedelta(
+                weeks=week, hours=self.rng.randrange(8, 20))
+            notifications.append((notification_id, f"Society update #{week + 1}",
+                                  "Please note the upcoming maintenance schedule and society events.",
+                                  self.admin, created_at, self.rng.choices(['low', 'normal', 'high'], [20, 65, 15])[0]))
+        self.load('notifications', ['notification_id', 'title', 'message', 'created_by', 'created_at',
+                                    'priority'], notifications)
+
+        def read_rows():
+            for notification_id, _, _, _, created_at, _ in notifications:
+                for user_id, _ in self.residents:
+                    if self.rng.random() < self.args.read_ratio:
+                        yield (self.next_id('notification_reads'), notification_id, user_id,
+                               created_at + timedelta(hours=self.rng.randrange(1, 96)))
+        self.load('notification_reads', ['read_id', 'notification_id', 'user_id', 'read_at'], read_rows())
+
+    def generate_polls(self):
+        polls, options, votes = [], [], []
+        months = list(self.months())
+        for i, month in enumerate(months):
+            poll_id = self.next_id('polls')
+            active = i >= len(months) - 2
+            created_at = datetime.combine(month, datetime.min.time()) + timedelta(days=2, hours=10)
+            polls.append((poll_id, f"Society poll {month.strftime('%b %Y')}", "Vote for your preferred option.",
+                          self.admin, created_at, month + timedelta(days=20), 'active' if active else 'closed'))
+            poll_options = [self.next_id('poll_options') for _ in range(self.rng.randrange(2, 5))]
+            counts = dict.fromkeys(poll_options, 0)
+            for user_id, _ in self.residents:
+                if self.rng.random() < self.args.vote_ratio:
+                    option_id = self.rng.choice(poll_options)
+                    counts[option_id] += 1
+                    votes.append((self.next_id('votes'), poll_id, option_id, user_id,
+                                  created_at + timedelta(hours=self.rng.randrange(1, 400))))
+            for n, option_id in enumerate(poll_options, 1):
+                options.append((option_id, poll_id, f"Option {n}", counts[option_id]))
+
+        self.load('polls', ['poll_id', 'title', 'description', 'created_by', 'created_at', 'end_date',
+                            'status'], polls)
+        self.load('poll_options', ['option_id', 'poll_id', 'option_text', 'vote_count'], options)
+        self.load('votes', ['vote_id', 'poll_id', 'option_id', 'user_id', 'voted_at'], votes)
+
+    def finish(self):
+        cursor = self.db.connection.cursor()
+        for table, (sequence, column) in SEQUENCES.items():
+            cursor.execute(f"SELECT setval('{sequence}', GREATEST((SELECT COALESCE(MAX({column}), 0) FROM {table}), 1))")
+        print("  analyzing tables...")
+        cursor.execute("ANALYZE")
+        cursor.close()
+        print("  building visitor rollups...")
+        refresh_visitor_rollups(self.db.connection, rebuild=True)
+
+
+def reset_database(db):
+    cursor = db.connection.cursor()
+    cursor.execute(f"TRUNCATE {', '.join(TABLES)} RESTART IDENTITY CASCADE")
+    cursor.close()
+    db.create_default_admin()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Generate a synthetic SocietySync society and bulk-load it with COPY")
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL'),
+                        help="Postgres URL (default: $DATABASE_URL)")
+    parser.add_argument('--flats', type=int, default=400, help="number of flats (default: 400)")
+    parser.add_argument('--years', type=int, default=3, help="years of history (default: 3)")
+    parser.add_argument('--visitors', type=int, default=1_000_000, help="visitor entries (default: 1,000,000)")
+    parser.add_argument('--tenant-ratio', type=float, default=0.3, help="share of flats let to tenants")
+    parser.add_argument('--complaints-per-year', type=float, default=2.0, help="complaints per resident per year")
+    parser.add_argument('--read-ratio', type=float, default=0.7, help="share of residents reading each notification")
+    parser.add_argument('--vote-ratio', type=float, default=0.4, help="share of residents voting in each poll")
+    parser.add_argument('--missed-exit-ratio', type=float, default=0.002,
+                        help="share of visitors whose exit is never recorded")
+    parser.add_argument('--batch-size', type=int, default=50_000, help="rows per COPY batch")
+    parser.add_argument('--seed', type=int, default=42, help="random seed for reproducible datasets")
+    parser.add_argument('--reset', action='store_true', help="truncate all SocietySync tables first")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.database_url:
+        raise SystemExit("Set DATABASE_URL or pass --database-url")
+    os.environ['DATABASE_URL'] = args.database_url
+
+    db = Database()
+    if args.reset:
+        print("Truncating existing data...")
+        reset_database(db)
+
+    start = time.perf_counter()
+    print(f"Generating {args.flats:,} flats, {args.years} years, {args.visitors:,} visitors (seed {args.seed})")
+    SocietyGenerator(db, args).generate()
+    print(f"Done in {time.perf_counter() - start:.1f}s")
+    db.close_connection()
+
+
+if __name__ == "__main__":
+    main()
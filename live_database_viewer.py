@@ -1,13 +1,34 @@
 # live_database_viewer.py
 
+import json
+import time
+import threading
+from collections import deque
+from datetime import datetime
+
 import streamlit as st
-import pandas as pd
 import psycopg2
-from psycopg2.extras import RealDictCursor
-from streamlit_autorefresh import st_autorefresh
+import pyarrow as pa
+from columnar import fetch_arrow, iter_record_batches
 
-# Auto-refresh every 5 seconds
-st_autorefresh(interval=5000, key="db_refresh")
+# The table is checked for changes every 5 seconds, backing off to once a minute while idle
+REFRESH_SECONDS = 5
+MAX_REFRESH_SECONDS = 60
+# Table and column lists are cached this long, or until a DDL statement runs here
+CATALOG_TTL_SECONDS = 300
+DDL_COMMANDS = ("CREATE", "ALTER", "DROP", "TRUNCATE", "COMMENT", "GRANT", "REVOKE")
+# Rows per page of the table browser
+PAGE_SIZE = 100
+# Custom queries keep at most this many rows / bytes of results, fetched in batches from a server-side cursor
+QUERY_ROW_CAP = 10_000
+QUERY_BUFFER_BYTES = 64 * 1024 * 1024
+QUERY_FETCH_ROWS = 1_000
+QUERY_TIMEOUT_SECONDS = 30
+# Finished queries kept in the session's history
+QUERY_HISTORY_SIZE = 50
+EXPLAIN_MODE = "Explain (ANALYZE, BUFFERS)"
+# Errors DECLARE CURSOR raises for statements it can't wrap (DML, DDL, EXPLAIN, data-modifying WITH)
+DECLARE_ERRORS = (psycopg2.errors.SyntaxError, psycopg2.errors.FeatureNotSupported)
 
 # ---------------------------- #
 # PostgreSQL Database Settings #
@@ -21,52 +42,133 @@ DB_PASSWORD = "durgeshvs1610"
 # ---------------------------- #
 # Connect to Database          #
 # ---------------------------- #
-@st.cache_resource
-def get_connection():
+def connect(**options):
     return psycopg2.connect(
         host=DB_HOST,
         port=DB_PORT,
         database=DB_NAME,
         user=DB_USER,
-        password=DB_PASSWORD
+        password=DB_PASSWORD,
+        **options
     )
 
+@st.cache_resource
+def get_connection():
+    connection = connect()
+    # Each statement commits on its own: the viewer never sits idle in a transaction,
+    # and pg_stat_* counters aren't frozen at the transaction's first read
+    connection.autocommit = True
+    return connection
+
 conn = get_connection()
 
 # ---------------------------- #
 # Get All Tables in Database   #
 # ---------------------------- #
+@st.cache_data(ttl=CATALOG_TTL_SECONDS, show_spinner=False)
 def get_tables():
+    """{table name: estimated row count} for the public schema, partitions folded into their parent
+
+    The estimate is pg_class.reltuples as of the last VACUUM/ANALYZE, summed
+    over the partitions, or None for a table never analyzed.
+    """
     with conn.cursor() as cursor:
         cursor.execute("""
-            SELECT table_name
-            FROM information_schema.tables
-            WHERE table_schema='public'
-            ORDER BY table_name;
+            SELECT c.relname,
+                   (SELECT CASE WHEN MAX(p.reltuples) < 0 THEN NULL
+                                ELSE SUM(GREATEST(p.reltuples, 0))::bigint END
+                    FROM pg_partition_tree(c.oid) t
+                    JOIN pg_class p ON p.oid = t.relid
+                    WHERE t.isleaf)
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = 'public' AND c.relkind IN ('r', 'p') AND NOT c.relispartition
+            ORDER BY c.relname;
         """)
-        return [row[0] for row in cursor.fetchall()]
+        return dict(cursor.fetchall())
 
 # ---------------------------- #
 # Get Columns of a Table       #
 # ---------------------------- #
+@st.cache_data(ttl=CATALOG_TTL_SECONDS, show_spinner=False)
 def get_columns(table_name):
     with conn.cursor() as cursor:
-        cursor.execute(f"""
-            SELECT column_name
-            FROM information_schema.columns
-            WHERE table_name = '{table_name}'
-            ORDER BY ordinal_position;
-        """)
+        cursor.execute("""
+            SELECT attname
+            FROM pg_attribute
+            WHERE attrelid = %s::regclass AND attnum > 0 AND NOT attisdropped
+            ORDER BY attnum;
+        """, (table_name,))
         return [row[0] for row in cursor.fetchall()]
 
+def clear_catalog_cache():
+    get_tables.clear()
+    get_columns.clear()
+    get_primary_key.clear()
+    st.session_state.viewer = {}
+
+def count_rows(table_name):
+    with conn.cursor() as cursor:
+        cursor.execute(f"SELECT COUNT(*) FROM {table_name};")
+        return cursor.fetchone()[0]
+
 # ---------------------------- #
 # Fetch Table Data             #
 # ---------------------------- #
-def fetch_table_data(table_name):
-    with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-        cursor.execute(f"SELECT * FROM {table_name} ORDER BY 1 DESC LIMIT 100;")
-        data = cursor.fetchall()
-    return pd.DataFrame(data)
+def fetch_table_page(table_name, primary_key, before=None, limit=PAGE_SIZE):
+    """One page of rows, newest key first, and whether older rows remain
+
+    Pages on the primary key: the next page starts below the last key shown
+    (a range scan on the key's index, however deep the page). Tables without
+    a primary key only show their latest rows by the first column.
+    """
+    with conn.cursor() as cursor:
+        if not primary_key:
+            cursor.execute(f"SELECT * FROM {table_name} ORDER BY 1 DESC LIMIT %s;", (limit,))
+            return fetch_arrow(cursor), False
+
+        keys = ", ".join(primary_key)
+        order = ", ".join(f"{column} DESC" for column in primary_key)
+        where = f"WHERE ({keys}) < %s" if before else ""
+        params = (before, limit + 1) if before else (limit + 1,)
+        cursor.execute(f"SELECT * FROM {table_name} {where} ORDER BY {order} LIMIT %s;", params)
+        page = fetch_arrow(cursor)
+        return page.slice(0, limit), page.num_rows > limit
+
+def last_key(page, primary_key):
+    return tuple(page.column(column)[page.num_rows - 1].as_py() for column in primary_key)
+
+# ---------------------------- #
+# Detect Table Changes         #
+# ---------------------------- #
+@st.cache_data(ttl=CATALOG_TTL_SECONDS, show_spinner=False)
+def get_primary_key(table_name):
+    """Primary key columns of a table in key order, empty without one"""
+    with conn.cursor() as cursor:
+        cursor.execute("""
+            SELECT a.attname
+            FROM pg_index i
+            CROSS JOIN LATERAL unnest(i.indkey::int2[]) WITH ORDINALITY AS k(attnum, position)
+            JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+            WHERE i.indrelid = %s::regclass AND i.indisprimary
+            ORDER BY k.position;
+        """, (table_name,))
+        return [row[0] for row in cursor.fetchall()]
+
+def table_signature(table_name, primary_key):
+    """Highest key plus the write counters of the table and its partitions
+
+    Two index-only lookups; it changes whenever a row is inserted, updated
+    or deleted (the counters lag by up to a second, the key doesn't).
+    """
+    max_key = f"(SELECT MAX({primary_key[0]}) FROM {table_name})" if primary_key else "NULL"
+    with conn.cursor() as cursor:
+        cursor.execute(f"""
+            SELECT {max_key}, SUM(n_tup_ins), SUM(n_tup_upd), SUM(n_tup_del)
+            FROM pg_stat_user_tables
+            WHERE relid IN (SELECT relid FROM pg_partition_tree(%s::regclass));
+        """, (table_name,))
+        return cursor.fetchone()
 
 # ---------------------------- #
 # Streamlit UI                 #
@@ -75,17 +177,86 @@ st.set_page_config(page_title="Live Database Viewer", layout="wide")
 st.title("🖥️ Live Database Viewer")
 
 tables = get_tables()
-selected_table = st.selectbox("Select Table", tables)
+selected_table = st.selectbox("Select Table", list(tables))
+
+def turn_page(state, before):
+    """Step to the page below before, or back one page when before is None"""
+    if before is None:
+        state['pages'].pop()
+    else:
+        state['pages'].append(before)
+    state.update(data=None, next_check=0.0)
+
+@st.fragment(run_every=REFRESH_SECONDS)
+def table_panel(table_name):
+    """A page of a table's rows, re-read only when its signature changes"""
+    state = st.session_state.viewer
+    if state.get('table') != table_name:
+        state.clear()
+        state.update(table=table_name, primary_key=get_primary_key(table_name), signature=None,
+                     data=None, has_more=False, pages=[], interval=REFRESH_SECONDS, next_check=0.0,
+                     changed_at=None)
+
+    # pages holds the key each older page starts below; empty on the newest page
+    pages = state['pages']
+    now = time.monotonic()
+    if now >= state['next_check']:
+        signature = table_signature(table_name, state['primary_key'])
+        if state['data'] is None or signature != state['signature']:
+            state['data'], state['has_more'] = fetch_table_page(table_name, state['primary_key'],
+                                                               pages[-1] if pages else None)
+            state['signature'] = signature
+            state['changed_at'] = datetime.now()
+            state['interval'] = REFRESH_SECONDS
+        else:
+            state['interval'] = min(state['interval'] * 2, MAX_REFRESH_SECONDS)
+        state['next_check'] = now + state['interval']
+
+    data = state['data']
+    if data.num_rows > 0:
+        st.dataframe(data, use_container_width=True)
+        if state['primary_key']:
+            shown = f"Page {len(pages) + 1}: {data.num_rows} rows by {', '.join(state['primary_key'])}, newest first"
+        else:
+            shown = f"Showing latest {data.num_rows} rows (no primary key to page on)"
+        st.info(f"{shown}. Last changed {state['changed_at']:%H:%M:%S}; "
+                f"checking for changes every {state['interval']} seconds.")
+    else:
+        st.warning("Table is empty." if not pages else "No older rows.")
+
+    # Callbacks run before the panel reruns, so the new page is fetched straight away
+    newer_col, older_col, _ = st.columns([1, 1, 4])
+    newer_col.button("◀ Newer", disabled=not pages, on_click=turn_page, args=(state, None),
+                     use_container_width=True)
+    older_col.button("Older ▶", disabled=not state['has_more'], on_click=turn_page,
+                     args=(state, last_key(data, state['primary_key']) if state['has_more'] else None),
+                     use_container_width=True)
+
+if "viewer" not in st.session_state:
+    st.session_state.viewer = {}
+if "exact_counts" not in st.session_state:
+    st.session_state.exact_counts = {}
 
 if selected_table:
     st.subheader(f"Table: {selected_table}")
-    data = fetch_table_data(selected_table)
-    
-    if not data.empty:
-        st.dataframe(data, use_container_width=True)
-        st.info(f"Showing latest {len(data)} rows. Auto-refresh every 5 seconds.")
+
+    count_col, exact_col, refresh_col = st.columns([3, 1, 1])
+    estimate = tables[selected_table]
+    exact = st.session_state.exact_counts.get(selected_table)
+    if exact:
+        count_col.caption(f"{exact[0]:,} rows (exact count at {exact[1]:%H:%M:%S})")
+    elif estimate is None:
+        count_col.caption("Row count unknown: the table hasn't been analyzed yet")
     else:
-        st.warning("Table is empty.")
+        count_col.caption(f"≈ {estimate:,} rows (planner estimate)")
+    if exact_col.button("Count exactly", help="Runs COUNT(*), which scans the whole table"):
+        st.session_state.exact_counts[selected_table] = (count_rows(selected_table), datetime.now())
+        st.rerun()
+    if refresh_col.button("Reload catalog", help=f"Tables and columns are cached for {CATALOG_TTL_SECONDS} seconds"):
+        clear_catalog_cache()
+        st.rerun()
+
+    table_panel(selected_table)
     
     columns = get_columns(selected_table)
     col1 = columns[0] if len(columns) >= 1 else None
@@ -98,7 +269,8 @@ if selected_table:
     if col1 and col2:
         versatile_queries = {
             "Show all rows": f"SELECT * FROM {selected_table} LIMIT 100;",
-            "Count rows": f"SELECT COUNT(*) FROM {selected_table};",
+            "Estimated row count": f"SELECT reltuples::bigint FROM pg_class WHERE oid = '{selected_table}'::regclass;",
+            "Exact row count (scans the table)": f"SELECT COUNT(*) FROM {selected_table};",
             "Last 10 entries": f"SELECT * FROM {selected_table} ORDER BY {col1} DESC LIMIT 10;",
             f"Select first two columns ({col1}, {col2})": f"SELECT {col1}, {col2} FROM {selected_table} LIMIT 50;",
             f"Order by first column ({col1}) asc": f"SELECT * FROM {selected_table} ORDER BY {col1} ASC LIMIT 50;",
@@ -112,10 +284,238 @@ if selected_table:
 # ---------------------------- #
 # Run Custom SQL Query          #
 # ---------------------------- #
+class QueryJob:
+    """A custom query running on its own connection in a background thread
+
+    Every statement is first tried on a named (server-side) cursor, whatever
+    comments or parentheses it starts with, and read in batches of
+    QUERY_FETCH_ROWS, so only the rows kept ever reach the viewer; reading
+    stops at the row cap or QUERY_BUFFER_BYTES, and the cursor is closed
+    with the rest of the result unread. Statements DECLARE refuses run on a
+    plain cursor instead. The connection has a
+    statement_timeout, and cancel() stops a running statement server-side.
+
+    With explain set, the statement runs under EXPLAIN (ANALYZE, BUFFERS)
+    instead and is rolled back, leaving the JSON plan in plan.
+    """
+
+    def __init__(self, query, row_cap=QUERY_ROW_CAP, timeout_seconds=QUERY_TIMEOUT_SECONDS, explain=False):
+        self.query = query
+        self.row_cap = row_cap
+        self.timeout_seconds = timeout_seconds
+        self.explain = explain
+        self.plan = None
+        self.rowcount = None
+        self.duration = None
+        self.batches = []
+        self.rows = 0
+        self.bytes = 0
+        self.truncated = False
+        self.status = 'running'
+        self.message = None
+        self.error = None
+        self.cancelled = False
+        self.connection = None
+        self.started = time.monotonic()
+        self.finished = None
+        # Set once the page has reacted to the finished query (catalog cache, table refresh)
+        self.applied = False
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.monotonic()) - self.started
+
+    def cancel(self):
+        self.cancelled = True
+        if self.connection is not None:
+            self.connection.cancel()
+
+    def read(self, cursor):
+        for batch in iter_record_batches(cursor, QUERY_FETCH_ROWS):
+            if self.rows + batch.num_rows > self.row_cap:
+                batch = batch.slice(0, self.row_cap - self.rows)
+                self.truncated = True
+            self.batches.append(batch)
+            self.rows += batch.num_rows
+            self.bytes += batch.nbytes
+            if self.truncated or self.bytes >= QUERY_BUFFER_BYTES or self.cancelled:
+                self.truncated = self.truncated or self.bytes >= QUERY_BUFFER_BYTES
+                break
+
+    def execute(self, named):
+        self.batches, self.rows, self.bytes, self.truncated = [], 0, 0, False
+        cursor = self.connection.cursor(name='viewer_query') if named else self.connection.cursor()
+        with cursor:
+            cursor.execute(self.query)
+            if named or cursor.description:
+                self.read(cursor)
+            else:
+                self.rowcount = cursor.rowcount
+            self.message = None if named else cursor.statusmessage
+
+    def explain_analyze(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {self.query}")
+            result = cursor.fetchone()[0]
+        if isinstance(result, str):
+            result = json.loads(result)
+        self.plan = result[0]
+
+    def run(self):
+        start = None
+        try:
+            self.connection = connect(options=f"-c statement_timeout={int(self.timeout_seconds * 1000)}")
+            if self.cancelled:
+                raise psycopg2.extensions.QueryCanceledError("canceling statement due to user request")
+            start = time.monotonic()
+            if self.explain:
+                # ANALYZE really executes the statement; roll back whatever it changed
+                self.explain_analyze()
+                self.connection.rollback()
+                self.status = 'done'
+                return
+            try:
+                self.execute(named=True)
+            except DECLARE_ERRORS:
+                # Not a query DECLARE CURSOR can wrap (nothing ran); a genuine syntax error
+                # is simply reported again by the plain cursor
+                self.connection.rollback()
+                self.execute(named=False)
+            self.connection.commit()
+            self.status = 'done'
+        except psycopg2.extensions.QueryCanceledError as e:
+            self.status = 'cancelled' if self.cancelled else 'error'
+            self.error = e
+        except Exception as e:
+            self.status = 'error'
+            self.error = e
+        finally:
+            if self.connection is not None:
+                self.connection.close()
+            self.finished = time.monotonic()
+            if start is not None:
+                self.duration = self.finished - start
+
+    def result(self):
+        if not self.batches:
+            return None
+        tables = [pa.Table.from_batches([batch]) for batch in self.batches]
+        return pa.concat_tables(tables, promote_options='permissive')
+
+    def history_entry(self):
+        if self.plan:
+            rows = f"{plan_actual_rows(self.plan['Plan']):,}"
+        elif self.batches:
+            rows = f"{self.rows:,}" + ("+" if self.truncated else "")
+        else:
+            rows = "" if self.rowcount is None or self.rowcount < 0 else f"{self.rowcount:,}"
+        return {
+            'Ran at': datetime.now().strftime("%H:%M:%S"),
+            'Mode': "Explain" if self.explain else "Run",
+            'Status': self.status,
+            'Duration (ms)': round(self.duration * 1000, 1) if self.duration is not None else None,
+            'Rows': rows,
+            'Query': self.query.strip(),
+        }
+
+# ---------------------------- #
+# Query Plans                  #
+# ---------------------------- #
+def plan_actual_rows(node):
+    return int(node.get('Actual Rows', 0) * (node.get('Actual Loops') or 1))
+
+def plan_total_ms(node):
+    """Time spent in a node and below it, over all its loops"""
+    return node.get('Actual Total Time', 0) * (node.get('Actual Loops') or 1)
+
+def plan_rows(node, depth=0):
+    """One row per plan node, depth first, with the time spent in the node itself
+
+    Self time is the node's total less its children's; for nodes under a
+    Gather the loops are per worker, so the figures are approximate there.
+    """
+    children = node.get('Plans', [])
+    total = plan_total_ms(node)
+    label = node['Node Type']
+    if node.get('Index Name'):
+        label += f" using {node['Index Name']}"
+    if node.get('Relation Name'):
+        label += f" on {node['Relation Name']}"
+    rows = [{
+        'Node': "\u00a0\u00a0\u00a0" * depth + ("└ " if depth else "") + label,
+        'Self (ms)': round(max(total - sum(plan_total_ms(child) for child in children), 0.0), 3),
+        'Total (ms)': round(total, 3),
+        'Rows': plan_actual_rows(node),
+        'Estimated Rows': node.get('Plan Rows'),
+        'Loops': node.get('Actual Loops'),
+        'Shared Hit': node.get('Shared Hit Blocks'),
+        'Shared Read': node.get('Shared Read Blocks'),
+        'Filter': node.get('Filter') or node.get('Index Cond') or node.get('Hash Cond') or node.get('Join Filter'),
+    }]
+    for child in children:
+        rows.extend(plan_rows(child, depth + 1))
+    return rows
+
+def show_plan(plan):
+    execution_ms = plan.get('Execution Time', 0)
+    metric_cols = st.columns(3)
+    metric_cols[0].metric("Planning", f"{plan.get('Planning Time', 0):.2f} ms")
+    metric_cols[1].metric("Execution", f"{execution_ms:.2f} ms")
+    metric_cols[2].metric("Rows", f"{plan_actual_rows(plan['Plan']):,}")
+
+    st.dataframe(
+        plan_rows(plan['Plan']),
+        use_container_width=True,
+        hide_index=True,
+        column_config={
+            'Self (ms)': st.column_config.ProgressColumn(
+                'Self (ms)', format="%.3f", min_value=0, max_value=max(execution_ms, 0.001)),
+        },
+    )
+    with st.expander("Raw plan (JSON)"):
+        st.json(plan, expanded=False)
+
+@st.fragment(run_every=1)
+def query_progress(job):
+    """Shown only while a query runs; reruns the page once it finishes"""
+    if job.status != 'running':
+        st.rerun()
+    st.info(f"Running for {job.elapsed:.0f}s, {job.rows:,} rows fetched so far...")
+    if st.button("Cancel Query", disabled=job.cancelled):
+        job.cancel()
+
+def show_query_result(job):
+    if job.status == 'cancelled':
+        st.warning(f"Query cancelled after {job.elapsed:.1f}s.")
+    elif job.status == 'error':
+        st.error(f"Error: {job.error}")
+    else:
+        st.success(f"Query executed successfully in {job.elapsed:.2f}s"
+                   + (f" ({job.message})" if job.message else "") + ".")
+
+    if job.plan:
+        st.caption("The statement was executed to time it, then rolled back.")
+        show_plan(job.plan)
+        return
+
+    result = job.result()
+    if result is not None and result.num_rows > 0:
+        st.subheader("Query Results")
+        st.dataframe(result, use_container_width=True)
+        if job.truncated:
+            st.caption(f"Showing the first {result.num_rows:,} rows; the rest of the result was not fetched.")
+
 if "last_query" not in st.session_state:
     st.session_state.last_query = ""
-if "last_result" not in st.session_state:
-    st.session_state.last_result = pd.DataFrame()
+if "query_job" not in st.session_state:
+    st.session_state.query_job = None
+if "query_history" not in st.session_state:
+    st.session_state.query_history = deque(maxlen=QUERY_HISTORY_SIZE)
 
 with st.expander("Run Custom SQL Query"):
     st.write("💡 Basic Query Suggestions:")
@@ -123,31 +523,49 @@ with st.expander("Run Custom SQL Query"):
         st.code(q)
 
     query = st.text_area("Enter SQL Query", value=st.session_state.last_query, height=150)
-    
-    if st.button("Execute Query"):
+    mode = st.radio("Mode", ["Run", EXPLAIN_MODE], horizontal=True,
+                    help="Explain runs the statement inside a transaction that is rolled back "
+                         "and shows the plan tree with the time spent in each node")
+    cap_col, timeout_col = st.columns(2)
+    row_cap = cap_col.number_input("Row limit", min_value=1, max_value=100_000, value=QUERY_ROW_CAP, step=1_000)
+    timeout_seconds = timeout_col.number_input("Timeout (seconds)", min_value=1, max_value=600,
+                                               value=QUERY_TIMEOUT_SECONDS)
+
+    job = st.session_state.query_job
+    running = job is not None and job.status == 'running'
+    if st.button("Execute Query", disabled=running):
         if not query.strip():
             st.warning("Please enter a query to execute.")
         else:
-            try:
-                with conn.cursor(cursor_factory=RealDictCursor) as cursor:
-                    cursor.execute(query)
-                    # Commit if query modifies data
-                    if query.strip().lower().startswith(("insert", "update", "delete", "create", "alter", "drop")):
-                        conn.commit()
-                    # Fetch results for SELECT
-                    if cursor.description:
-                        result = cursor.fetchall()
-                        df_result = pd.DataFrame(result)
-                        st.session_state.last_result = df_result
-                    else:
-                        st.session_state.last_result = pd.DataFrame()
-                st.session_state.last_query = query
-                st.success("Query executed successfully!")
-            except Exception as e:
-                conn.rollback()
-                st.error(f"Error: {e}")
-
-    # Show last results persistently
-    if not st.session_state.last_result.empty:
-        st.subheader("Query Results")
-        st.dataframe(st.session_state.last_result, use_container_width=True)
+            st.session_state.last_query = query
+            st.session_state.query_job = job = QueryJob(query, row_cap, timeout_seconds,
+                                                                explain=mode == EXPLAIN_MODE).start()
+            running = True
+
+    if running:
+        query_progress(job)
+    elif job is not None:
+        if not job.applied:
+            job.applied = True
+            if job.message and job.message.startswith(DDL_COMMANDS):
+                clear_catalog_cache()
+            # The query may have changed the table on screen; check on the next refresh
+            st.session_state.viewer['next_check'] = 0.0
+            st.session_state.query_history.appendleft(job.history_entry())
+        show_query_result(job)
+
+# ---------------------------- #
+# Query History                #
+# ---------------------------- #
+def load_history_query(index):
+    st.session_state.last_query = st.session_state.query_history[index]['Query']
+
+if st.session_state.query_history:
+    with st.expander(f"Query History ({len(st.session_state.query_history)})"):
+        history = list(st.session_state.query_history)
+        st.dataframe(history, use_container_width=True, hide_index=True,
+                     column_config={'Query': st.column_config.TextColumn(width="large")})
+        pick_col, load_col = st.columns([4, 1])
+        picked = pick_col.selectbox("Query", range(len(history)), label_visibility="collapsed",
+                                    format_func=lambda i: f"{history[i]['Ran at']}  {' '.join(history[i]['Query'].split())[:100]}")
+        load_col.button("Load into editor", on_click=load_history_query, args=(picked,), use_container_width=True)
@@ -0,0 +1,256 @@
+"""Concurrent-session load harness for the SocietySync data layer
+
+Replays resident and admin session scripts (login, dashboard, bills, pay,
+complaints, polls, admin bill and visitor views) from a thread pool,
+against a database populated by generate_data.py:
+
+    python load_test.py --residents 300 --admins 10 --duration 120
+
+Reports throughput, per-action latency percentiles and the Postgres
+connection count sampled from pg_stat_activity while the run is going.
+"""
+
+import os
+import time
+import random
+import argparse
+import threading
+import statistics
+from datetime import date, timedelta
+from concurrent.futures import ThreadPoolExecutor
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from database import Database
+from query_catalog import DASHBOARD_QUERIES
+
+
+CATALOG = {query.name: query for query in DASHBOARD_QUERIES}
+RESIDENT_PASSWORD = 'password123'
+
+
+class Recorder:
+    """Collects per-action latencies and errors from every simulated user"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latencies = {}
+        self.errors = {}
+
+    def record(self, action, duration_ms, error=None):
+        with self.lock:
+            if error is None:
+                self.latencies.setdefault(action, []).append(duration_ms)
+            else:
+                self.errors[action] = self.errors.get(action, 0) + 1
+
+
+class ConnectionMonitor(threading.Thread):
+    """Samples server-side connection counts until stopped"""
+
+    def __init__(self, db_url, interval=1.0):
+        super().__init__(daemon=True)
+        self.db_url = db_url
+        self.interval = interval
+        self.samples = []
+        self.stopped = threading.Event()
+
+    def run(self):
+        connection = psycopg2.connect(self.db_url)
+        connection.autocommit = True
+        cursor = connection.cursor()
+        while not self.stopped.is_set():
+            cursor.execute("""
+                SELECT COUNT(*), COUNT(*) FILTER (WHERE state = 'active')
+                FROM pg_stat_activity WHERE datname = current_database()
+            """)
+            self.samples.append(cursor.fetchone())
+            self.stopped.wait(self.interval)
+        cursor.close()
+        connection.close()
+
+
+class SimulatedSession:
+    """One user's session, reconnecting per action when mimicking Streamlit reruns"""
+
+    def __init__(self, profile, recorder, per_action_connect):
+        self.profile = profile
+        self.recorder = recorder
+        self.per_action_connect = per_action_connect
+        self.db = None
+        self.rng = random.Random(profile['user_id'])
+
+    def database(self):
+        # The app builds a new Database() on every rerun, so per-action mode is the realistic default
+        if self.db is None or self.per_action_connect:
+            if self.db is not None:
+                self.db.close_connection()
+            self.db = Database()
+        return self.db
+
+    def timed(self, action, func):
+        start = time.perf_counter()
+        try:
+            func(self.database())
+        except Exception as e:
+            self.recorder.record(action, None, error=e)
+            return
+        self.recorder.record(action, (time.perf_counter() - start) * 1000)
+
+    def query(self, db, name, samples=None):
+        entry = CATALOG[name]
+        cursor = db.connection.cursor(cursor_factory=RealDictCursor)
+        cursor.execute(entry.sql, entry.params(samples or self.profile))
+        rows = cursor.fetchall() if cursor.description else []
+        cursor.close()
+        return rows
+
+    # Resident actions -------------------------------------------------------
+
+    def login(self, db):
+        db.authenticate_user(self.profile['username'], self.profile['password'])
+
+    def resident_dashboard(self, db):
+        db.get_unread_notifications(self.profile['user_id'])
+        for name in ('resident.pending_bill_count', 'resident.open_complaint_count',
+                     'resident.unread_notification_count', 'resident.active_poll_count',
+                     'resident.recent_bills', 'resident.recent_complaints'):
+            self.query(db, name)
+
+    def bills(self, db):
+        self.query(db, 'resident.check_overdue_bills')
+        return db.get_user_bills(self.profile['flat_number'])
+
+    def pay(self, db):
+        pending = [bill for bill in self.bills(db) if bill.payment_status in ('pending', 'overdue')]
+        if pending:
+            db.pay_bill(self.rng.choice(pending).bill_id, 'UPI')
+
+    def complaints(self, db):
+        db.get_user_complaints(self.profile['user_id'])
+        if self.rng.random() < 0.2:
+            db.create_complaint(self.profile['user_id'], self.profile['flat_number'], 'Load test',
+                                'Generated by load_test.py', 'Other', 'low')
+
+    def polls(self, db):
+        for name in ('resident.active_polls', 'resident.closed_polls'):
+            poll_ids = [poll['poll_id'] for poll in self.query(db, name)]
+            db.get_poll_options(poll_ids)
+            db.get_user_votes(self.profile['user_id'], poll_ids)
+
+    # Admin actions ----------------------------------------------------------
+
+    def admin_dashboard(self, db):
+        db.get_society_stats()
+        self.query(db, 'admin.recent_complaints')
+
+    def admin_bills(self, db):
+        self.query(db, 'admin.view_bills_pending')
+        self.query(db, 'admin.payment_tracking')
+
+    def admin_visitors(self, db):
+        self.query(db, 'admin.current_visitors')
+        today = date.today()
+        db.get_visitor_history(today - timedelta(days=6), today)
+
+    def script(self):
+        if self.profile['role'] == 'admin':
+            return [('login', self.login), ('admin_dashboard', self.admin_dashboard),
+                    ('admin_bills', self.admin_bills), ('admin_visitors', self.admin_visitors),
+                    ('admin_dashboard', self.admin_dashboard)]
+        return [('login', self.login), ('resident_dashboard', self.resident_dashboard),
+                ('bills', self.bills), ('pay', self.pay), ('complaints', self.complaints),
+                ('polls', self.polls), ('resident_dashboard', self.resident_dashboard)]
+
+    def run(self, deadline, think_time):
+        try:
+            while time.monotonic() < deadline:
+                for action, func in self.script():
+                    if time.monotonic() >= deadline:
+                        break
+                    self.timed(action, func)
+                    time.sleep(self.rng.uniform(0, think_time * 2))
+        finally:
+            if self.db is not None:
+                self.db.close_connection()
+
+
+def load_profiles(residents, admins):
+    db = Database()
+    cursor = db.connection.cursor(cursor_factory=RealDictCursor)
+    cursor.execute("""
+        SELECT user_id, username, role, flat_number FROM users
+        WHERE role IN ('owner', 'tenant') ORDER BY random() LIMIT %s
+    """, (residents,))
+    profiles = [dict(row, owner_user_id=row['user_id'], password=RESIDENT_PASSWORD) for row in cursor.fetchall()]
+    cursor.execute("SELECT user_id, username, role, flat_number FROM users WHERE role = 'admin' LIMIT 1")
+    admin = cursor.fetchone()
+    cursor.close()
+    db.close_connection()
+    if residents and len(profiles) < residents:
+        print(f"Only {len(profiles)} residents available, generate a bigger dataset for more")
+    profiles += [dict(admin, owner_user_id=admin['user_id'], password='admin123') for _ in range(admins)]
+    return profiles
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def report(recorder, monitor, elapsed):
+    total = sum(len(latencies) for latencies in recorder.latencies.values())
+    errors = sum(recorder.errors.values())
+    print(f"\n{total:,} actions in {elapsed:.1f}s = {total / elapsed:.1f} actions/s ({errors} errors)\n")
+    print(f"{'action':<22}{'count':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}{'errors':>8}")
+    for action in sorted(set(recorder.latencies) | set(recorder.errors)):
+        latencies = sorted(recorder.latencies.get(action, [])) or [0.0]
+        print(f"{action:<22}{len(recorder.latencies.get(action, [])):>8}"
+              f"{statistics.median(latencies):>10.1f}{percentile(latencies, 0.95):>10.1f}"
+              f"{percentile(latencies, 0.99):>10.1f}{latencies[-1]:>10.1f}{recorder.errors.get(action, 0):>8}")
+    if monitor.samples:
+        totals = [sample[0] for sample in monitor.samples]
+        active = [sample[1] for sample in monitor.samples]
+        print(f"\nPostgres connections: max {max(totals)}, avg {statistics.fmean(totals):.1f}; "
+              f"active max {max(active)}, avg {statistics.fmean(active):.1f}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Simulate concurrent SocietySync sessions against the data layer")
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL'), help="default: $DATABASE_URL")
+    parser.add_argument('--residents', type=int, default=100, help="simulated owners/tenants (default: 100)")
+    parser.add_argument('--admins', type=int, default=5, help="simulated admins (default: 5)")
+    parser.add_argument('--duration', type=float, default=60, help="seconds to run (default: 60)")
+    parser.add_argument('--think-time', type=float, default=1.0, help="mean seconds between actions (default: 1.0)")
+    parser.add_argument('--persistent-connections', action='store_true',
+                        help="keep one connection per session instead of reconnecting per action like the app")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.database_url:
+        raise SystemExit("Set DATABASE_URL or pass --database-url")
+    os.environ['DATABASE_URL'] = args.database_url
+
+    profiles = load_profiles(args.residents, args.admins)
+    recorder = Recorder()
+    monitor = ConnectionMonitor(args.database_url)
+    monitor.start()
+
+    print(f"Running {len(profiles)} sessions for {args.duration:.0f}s...")
+    start = time.monotonic()
+    deadline = start + args.duration
+    with ThreadPoolExecutor(max_workers=len(profiles)) as pool:
+        for profile in profiles:
+            session = SimulatedSession(profile, recorder, not args.persistent_connections)
+            pool.submit(session.run, deadline, args.think_time)
+    elapsed = time.monotonic() - start
+
+    monitor.stopped.set()
+    monitor.join()
+    report(recorder, monitor, elapsed)
+
+
+if __name__ == "__main__":
+    main()
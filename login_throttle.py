@@ -0,0 +1,225 @@
+import os
+import time
+import threading
+
+import psycopg2
+import streamlit as st
+
+
+# Bucket settings: burst size and seconds needed to earn back one attempt
+USER_BURST = int(os.getenv('LOGIN_THROTTLE_USER_BURST', '5'))
+USER_REFILL_SECONDS = float(os.getenv('LOGIN_THROTTLE_USER_REFILL_SECONDS', '60'))
+CLIENT_BURST = int(os.getenv('LOGIN_THROTTLE_CLIENT_BURST', '20'))
+CLIENT_REFILL_SECONDS = float(os.getenv('LOGIN_THROTTLE_CLIENT_REFILL_SECONDS', '6'))
+MAX_MEMORY_BUCKETS = 10000
+# Shared buckets untouched for this long have refilled to full burst and are deleted
+FULL_REFILL_SECONDS = max(USER_BURST * USER_REFILL_SECONDS, CLIENT_BURST * CLIENT_REFILL_SECONDS)
+PRUNE_EVERY = 500
+# Reverse proxies in front of the app that append to X-Forwarded-For; 0 ignores the header
+TRUSTED_PROXY_HOPS = int(os.getenv('LOGIN_THROTTLE_TRUSTED_PROXY_HOPS', '0'))
+
+
+class MemoryBucketStore:
+    """Token buckets held in this process only"""
+
+    name = "in-process"
+
+    def __init__(self):
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def take(self, key, burst, refill_seconds):
+        """Take one token from the bucket, returns (allowed, tokens_left)"""
+        now = time.monotonic()
+        with self.lock:
+            bucket = self.buckets.get(key)
+            if bucket is None:
+                if len(self.buckets) >= MAX_MEMORY_BUCKETS:
+                    self.prune()
+                bucket = {'tokens': float(burst), 'updated': now, 'blocked': 0, 'last_seen': time.time()}
+                self.buckets[key] = bucket
+
+            bucket['tokens'] = min(float(burst), bucket['tokens'] + (now - bucket['updated']) / refill_seconds)
+            bucket['updated'] = now
+            bucket['last_seen'] = time.time()
+
+            if bucket['tokens'] >= 1:
+                bucket['tokens'] -= 1
+                return True, bucket['tokens']
+
+            bucket['blocked'] += 1
+            return False, bucket['tokens']
+
+    def prune(self):
+        """Drop the least recently seen half so username spraying cannot grow memory"""
+        oldest = sorted(self.buckets, key=lambda k: self.buckets[k]['last_seen'])
+        for key in oldest[:len(oldest) // 2]:
+            del self.buckets[key]
+
+    def reset(self, key):
+        with self.lock:
+            self.buckets.pop(key, None)
+
+    def snapshot(self):
+        """Current bucket state for the admin page"""
+        with self.lock:
+            return [
+                {
+                    'bucket_key': key,
+                    'tokens': round(bucket['tokens'], 2),
+                    'blocked_count': bucket['blocked'],
+                    'last_seen': time.strftime("%d-%m-%Y %H:%M:%S", time.localtime(bucket['last_seen']))
+                }
+                for key, bucket in self.buckets.items()
+            ]
+
+
+class PostgresBucketStore:
+    """Token buckets shared by every app process through a Postgres table"""
+
+    name = "postgres"
+
+    def __init__(self, db_url):
+        self.connection = psycopg2.connect(db_url)
+        self.connection.autocommit = True
+        self.takes = 0
+        self.lock = threading.Lock()
+        self.create_table()
+
+    def create_table(self):
+        cursor = self.connection.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS login_throttle (
+                bucket_key VARCHAR(200) PRIMARY KEY,
+                tokens DOUBLE PRECISION NOT NULL,
+                updated_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+                last_allowed BOOLEAN DEFAULT TRUE,
+                blocked_count INTEGER DEFAULT 0
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_login_throttle_updated ON login_throttle (updated_at)")
+        cursor.close()
+
+    def take(self, key, burst, refill_seconds):
+        """Refill and take a token in a single atomic upsert"""
+        cursor = self.connection.cursor()
+        # Refill is computed against the locked row, so concurrent takes cannot overdraw
+        refilled = ("LEAST(%(burst)s::float8, login_throttle.tokens + "
+                    "EXTRACT(EPOCH FROM clock_timestamp() - login_throttle.updated_at) / %(refill)s)")
+        cursor.execute(f"""
+            INSERT INTO login_throttle (bucket_key, tokens, updated_at, last_allowed)
+            VALUES (%(key)s, %(burst)s::float8 - 1, clock_timestamp(), TRUE)
+            ON CONFLICT (bucket_key) DO UPDATE SET
+                tokens = CASE WHEN {refilled} >= 1 THEN {refilled} - 1 ELSE {refilled} END,
+                last_allowed = {refilled} >= 1,
+                blocked_count = login_throttle.blocked_count + CASE WHEN {refilled} >= 1 THEN 0 ELSE 1 END,
+                updated_at = clock_timestamp()
+            RETURNING last_allowed, tokens
+        """, {'key': key, 'burst': burst, 'refill': refill_seconds})
+        allowed, tokens = cursor.fetchone()
+        cursor.close()
+
+        with self.lock:
+            self.takes += 1
+            due = self.takes % PRUNE_EVERY == 0
+        if due:
+            self.prune()
+        return allowed, tokens
+
+    def prune(self):
+        """Delete buckets that have refilled to full burst so username spraying cannot grow the table"""
+        cursor = self.connection.cursor()
+        cursor.execute("""
+            DELETE FROM login_throttle
+            WHERE updated_at < clock_timestamp() - make_interval(secs => %s)
+        """, (FULL_REFILL_SECONDS,))
+        deleted = cursor.rowcount
+        cursor.close()
+        return deleted
+
+    def reset(self, key):
+        cursor = self.connection.cursor()
+        cursor.execute("DELETE FROM login_throttle WHERE bucket_key = %s", (key,))
+        cursor.close()
+
+    def snapshot(self):
+        cursor = self.connection.cursor()
+        cursor.execute("""
+            SELECT bucket_key, tokens, blocked_count, updated_at
+            FROM login_throttle
+            ORDER BY updated_at DESC
+            LIMIT 500
+        """)
+        rows = cursor.fetchall()
+        cursor.close()
+        return [
+            {
+                'bucket_key': row[0],
+                'tokens': round(row[1], 2),
+                'blocked_count': row[2],
+                'last_seen': row[3].strftime("%d-%m-%Y %H:%M:%S")
+            }
+            for row in rows
+        ]
+
+
+class LoginThrottle:
+    """Per-username and per-client token buckets checked before any password work"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def check(self, username, client_id):
+        """Return True if this login attempt may go on to authenticate_user"""
+        # Client bucket first so a sprayer rotating usernames is still stopped
+        client_allowed, _ = self.store.take(f"client:{client_id}", CLIENT_BURST, CLIENT_REFILL_SECONDS)
+        if not client_allowed:
+            return False
+
+        user_allowed, _ = self.store.take(f"user:{username.lower()}", USER_BURST, USER_REFILL_SECONDS)
+        return user_allowed
+
+    def record_success(self, username):
+        """A correct password clears the username bucket"""
+        self.store.reset(f"user:{username.lower()}")
+
+    def snapshot(self):
+        return self.store.snapshot()
+
+    def settings(self):
+        return {
+            'backend': self.store.name,
+            'user_burst': USER_BURST,
+            'user_refill_seconds': USER_REFILL_SECONDS,
+            'client_burst': CLIENT_BURST,
+            'client_refill_seconds': CLIENT_REFILL_SECONDS
+        }
+
+
+@st.cache_resource
+def get_login_throttle():
+    """Process-wide throttle, shared across Streamlit sessions"""
+    if os.getenv('LOGIN_THROTTLE_BACKEND', 'memory').lower() == 'postgres':
+        return LoginThrottle(PostgresBucketStore(os.getenv('DATABASE_URL')))
+    return LoginThrottle(MemoryBucketStore())
+
+
+def get_client_id():
+    """Identifier for the client behind the current session
+
+    The peer address by default. X-Forwarded-For is client controlled, so it
+    is only read behind TRUSTED_PROXY_HOPS proxies, taking the entry the
+    outermost trusted proxy appended (counted from the right); anything
+    further left could be forged.
+    """
+    try:
+        if TRUSTED_PROXY_HOPS > 0:
+            forwarded = st.context.headers.get('X-Forwarded-For')
+            hops = [hop.strip() for hop in forwarded.split(',')] if forwarded else []
+            if len(hops) >= TRUSTED_PROXY_HOPS and hops[-TRUSTED_PROXY_HOPS]:
+                return hops[-TRUSTED_PROXY_HOPS]
+        if st.context.ip_address:
+            return st.context.ip_address
+    except Exception:
+        pass
+    return "unknown"
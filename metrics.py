@@ -0,0 +1,271 @@
+import os
+import time
+import hashlib
+import weakref
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import psycopg2
+import streamlit as st
+
+from query_stats import query_stats, LATENCY_BUCKETS_MS
+
+
+# Export settings: a sidecar HTTP port, a text file rewritten periodically, or both
+METRICS_PORT = os.getenv('METRICS_PORT')
+# The endpoint has no authentication and exposes SQL, so it only listens locally unless told otherwise
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_FILE = os.getenv('METRICS_FILE')
+METRICS_FILE_INTERVAL = float(os.getenv('METRICS_FILE_INTERVAL', '15'))
+
+BCRYPT_BUCKETS_MS = (25, 50, 100, 200, 300, 500, 1000, 2000)
+
+
+class Counter:
+    """Monotonic counter with optional label values"""
+
+    def __init__(self, name, help_text, label_names=()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.values = {}
+        self.lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self.lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self.lock:
+            for label_values, value in sorted(self.values.items()):
+                lines.append(f"{self.name}{_labels(self.label_names, label_values)} {value}")
+        return lines
+
+
+class Histogram:
+    """Latency histogram in milliseconds, exported in seconds"""
+
+    def __init__(self, name, help_text, label_names=(), buckets_ms=LATENCY_BUCKETS_MS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = label_names
+        self.buckets_ms = buckets_ms
+        self.series = {}
+        self.lock = threading.Lock()
+
+    def observe(self, duration_ms, *label_values):
+        with self.lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = {'buckets': [0] * (len(self.buckets_ms) + 1), 'sum_ms': 0.0}
+                self.series[label_values] = series
+            series['buckets'][_bucket_index(self.buckets_ms, duration_ms)] += 1
+            series['sum_ms'] += duration_ms
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self.lock:
+            for label_values, series in sorted(self.series.items()):
+                lines.extend(_histogram_lines(self.name, self.label_names, label_values,
+                                              self.buckets_ms, series['buckets'], series['sum_ms']))
+        return lines
+
+
+def _bucket_index(buckets_ms, duration_ms):
+    for i, bound in enumerate(buckets_ms):
+        if duration_ms <= bound:
+            return i
+    return len(buckets_ms)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _histogram_lines(name, label_names, label_values, buckets_ms, buckets, sum_ms):
+    lines = []
+    cumulative = 0
+    for bound, count in zip(buckets_ms, buckets):
+        cumulative += count
+        le = f'le="{bound / 1000:g}"'
+        lines.append(f"{name}_bucket{_labels(label_names, label_values, le)} {cumulative}")
+    cumulative += buckets[-1]
+    le = 'le="+Inf"'
+    lines.append(f"{name}_bucket{_labels(label_names, label_values, le)} {cumulative}")
+    lines.append(f"{name}_sum{_labels(label_names, label_values)} {sum_ms / 1000:.6f}")
+    lines.append(f"{name}_count{_labels(label_names, label_values)} {cumulative}")
+    return lines
+
+
+page_render_latency = Histogram(
+    'societysync_page_render_seconds', 'Dashboard page render time per route', ('route',))
+login_attempts = Counter(
+    'societysync_login_attempts_total', 'Login attempts by outcome', ('outcome',))
+bcrypt_latency = Histogram(
+    'societysync_bcrypt_seconds', 'Time spent in bcrypt hash and verify', ('operation',),
+    buckets_ms=BCRYPT_BUCKETS_MS)
+cache_requests = Counter(
+    'societysync_cache_requests_total', 'Application cache lookups by cache and result', ('cache', 'result'))
+connections_opened = Counter(
+    'societysync_db_connections_opened_total', 'Database connections opened by the app')
+
+_open_connections = weakref.WeakSet()
+_open_connections_lock = threading.Lock()
+
+
+def track_connection(connection):
+    """Count a new app connection; it drops out of the gauge once closed or collected"""
+    connections_opened.inc()
+    with _open_connections_lock:
+        _open_connections.add(connection)
+
+
+def open_connection_count():
+    with _open_connections_lock:
+        return sum(1 for connection in _open_connections if not connection.closed)
+
+
+def query_id(fingerprint):
+    """Short stable label for a fingerprint; the text itself can be long and share prefixes"""
+    return hashlib.sha1(fingerprint.encode('utf-8')).hexdigest()[:16]
+
+
+def _query_latency_lines():
+    name = 'societysync_db_query_seconds'
+    info_name = 'societysync_db_query_info'
+    rows = query_stats.snapshot()
+    lines = [f"# HELP {name} Query latency per statement fingerprint (see {info_name} for the SQL)",
+             f"# TYPE {name} histogram"]
+    for row in rows:
+        lines.extend(_histogram_lines(name, ('query_id',), (query_id(row['fingerprint']),),
+                                      LATENCY_BUCKETS_MS, row['buckets'], row['total_ms']))
+    lines.extend([f"# HELP {info_name} Statement fingerprint (first 200 characters) for each query_id",
+                  f"# TYPE {info_name} gauge"])
+    for row in rows:
+        labels = _labels(('query_id', 'fingerprint'), (query_id(row['fingerprint']), row['fingerprint'][:200]))
+        lines.append(f"{info_name}{labels} 1")
+    return lines
+
+
+def _postgres_lines():
+    """Server-side connection usage and buffer cache hit ratio, skipped if the DB is unreachable"""
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        return []
+    try:
+        connection = psycopg2.connect(db_url, connect_timeout=3)
+        try:
+            cursor = connection.cursor()
+            cursor.execute("""
+                SELECT (SELECT COUNT(*) FROM pg_stat_activity WHERE datname = current_database()),
+                       current_setting('max_connections')::int,
+                       blks_hit, blks_read
+                FROM pg_stat_database WHERE datname = current_database()
+            """)
+            backends, max_connections, blks_hit, blks_read = cursor.fetchone()
+            cursor.close()
+        finally:
+            connection.close()
+    except Exception as e:
+        print(f"Metrics: could not read Postgres stats: {e}")
+        return []
+
+    hit_ratio = blks_hit / (blks_hit + blks_read) if (blks_hit + blks_read) else 1.0
+    return [
+        "# HELP societysync_pg_backends Server connections to this database",
+        "# TYPE societysync_pg_backends gauge",
+        f"societysync_pg_backends {backends}",
+        "# HELP societysync_pg_max_connections Server max_connections setting",
+        "# TYPE societysync_pg_max_connections gauge",
+        f"societysync_pg_max_connections {max_connections}",
+        "# HELP societysync_pg_buffer_cache_hit_ratio Shared buffer hit ratio for this database",
+        "# TYPE societysync_pg_buffer_cache_hit_ratio gauge",
+        f"societysync_pg_buffer_cache_hit_ratio {hit_ratio:.6f}",
+    ]
+
+
+def _cache_ratio_lines():
+    totals = {}
+    with cache_requests.lock:
+        for (cache, result), value in cache_requests.values.items():
+            hits, lookups = totals.get(cache, (0, 0))
+            totals[cache] = (hits + (value if result == 'hit' else 0), lookups + value)
+    lines = ["# HELP societysync_cache_hit_ratio Hit ratio per application cache",
+             "# TYPE societysync_cache_hit_ratio gauge"]
+    for cache, (hits, lookups) in sorted(totals.items()):
+        lines.append(f'societysync_cache_hit_ratio{{cache="{_escape(cache)}"}} {hits / lookups:.6f}')
+    return lines
+
+
+def render_metrics():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    lines.extend(page_render_latency.render())
+    lines.extend(_query_latency_lines())
+    lines.extend(login_attempts.render())
+    lines.extend(bcrypt_latency.render())
+    lines.extend(cache_requests.render())
+    lines.extend(_cache_ratio_lines())
+    lines.extend(connections_opened.render())
+    lines.extend([
+        "# HELP societysync_db_connections_open App connections currently open in this process",
+        "# TYPE societysync_db_connections_open gauge",
+        f"societysync_db_connections_open {open_connection_count()}",
+    ])
+    lines.extend(_postgres_lines())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render_metrics().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def write_metrics_file(path):
+    """Write atomically so a scraper never reads a half-written file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(render_metrics())
+    os.replace(tmp_path, path)
+
+
+def _file_writer_loop(path):
+    while True:
+        try:
+            write_metrics_file(path)
+        except Exception as e:
+            print(f"Metrics: could not write {path}: {e}")
+        time.sleep(METRICS_FILE_INTERVAL)
+
+
+@st.cache_resource
+def start_metrics_export():
+    """Start the sidecar HTTP handler and/or file writer once per process"""
+    started = []
+    if METRICS_PORT:
+        server = ThreadingHTTPServer((METRICS_HOST, int(METRICS_PORT)), MetricsHandler)
+        threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+        started.append(f"http://{METRICS_HOST}:{METRICS_PORT}/metrics")
+    if METRICS_FILE:
+        threading.Thread(target=_file_writer_loop, args=(METRICS_FILE,), name='metrics-file', daemon=True).start()
+        started.append(METRICS_FILE)
+    return started
@@ -0,0 +1,170 @@
+"""Typed rows for the main SocietySync tables
+
+Slotted dataclasses built from plain tuple cursors, so listings don't
+allocate a dict per row and queries select only the columns pages use
+(no ``password_hash``, ``profile_picture`` or ``created_by`` ids).
+Build the SELECT list with ``Model.columns(alias)`` and read rows with
+``fetch_all`` / ``fetch_one`` so column order always matches the fields.
+Fields that come from a join carry their SQL expression in the ``sql``
+metadata.
+"""
+
+from dataclasses import dataclass, field, fields
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Optional
+
+
+def joined(sql):
+    """Field populated from a joined or computed SQL expression"""
+    return field(metadata={'sql': sql})
+
+
+class Row:
+    __slots__ = ()
+
+    @classmethod
+    def columns(cls, alias=None):
+        """Comma separated SELECT list for this model, optionally prefixed by a table alias"""
+        prefix = f"{alias}." if alias else ""
+        return ", ".join(f"{f.metadata['sql']} AS {f.name}" if 'sql' in f.metadata else prefix + f.name
+                         for f in fields(cls))
+
+    @classmethod
+    def field_names(cls):
+        return [f.name for f in fields(cls)]
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.field_names()}
+
+
+def fetch_all(cursor, model):
+    """Rows of the last statement on a plain (tuple) cursor as model instances"""
+    return [model(*row) for row in cursor.fetchall()]
+
+
+def fetch_one(cursor, model):
+    row = cursor.fetchone()
+    return model(*row) if row else None
+
+
+@dataclass(slots=True, frozen=True)
+class User(Row):
+    user_id: int
+    username: str
+    role: str
+    flat_number: Optional[str]
+    name: str
+    email: Optional[str]
+    phone: Optional[str]
+    created_at: Optional[datetime]
+    last_login: Optional[datetime]
+    password_changed: bool
+    initial_password: Optional[str]
+
+
+@dataclass(slots=True, frozen=True)
+class Bill(Row):
+    bill_id: int
+    flat_number: str
+    bill_type: str
+    amount: Decimal
+    due_date: date
+    payment_status: str
+    payment_date: Optional[date]
+    payment_method: Optional[str]
+    created_at: Optional[datetime]
+
+
+@dataclass(slots=True, frozen=True)
+class ResidentBill(Bill):
+    resident_name: Optional[str] = joined('u.name')
+    resident_type: Optional[str] = joined('u.role')
+
+
+@dataclass(slots=True, frozen=True)
+class Complaint(Row):
+    complaint_id: int
+    user_id: int
+    flat_number: str
+    title: str
+    description: str
+    category: str
+    priority: str
+    status: str
+    admin_response: Optional[str]
+    created_at: Optional[datetime]
+    updated_at: Optional[datetime]
+    resolved_at: Optional[datetime]
+
+
+@dataclass(slots=True, frozen=True)
+class UserComplaint(Complaint):
+    user_name: str = joined('u.name')
+
+
+@dataclass(slots=True, frozen=True)
+class Visitor(Row):
+    visitor_id: int
+    flat_number: str
+    visitor_name: str
+    visitor_phone: Optional[str]
+    purpose: Optional[str]
+    entry_time: Optional[datetime]
+    exit_time: Optional[datetime]
+    vehicle_number: Optional[str]
+    status: str
+    updated_at: Optional[datetime]
+
+
+@dataclass(slots=True, frozen=True)
+class VisitorPass(Row):
+    pass_id: int
+    code: str
+    flat_number: str
+    visitor_name: str
+    visitor_phone: Optional[str]
+    vehicle_number: Optional[str]
+    purpose: Optional[str]
+    valid_from: date
+    valid_until: date
+    max_uses: int
+    uses: int
+    status: str
+    created_at: Optional[datetime]
+
+
+@dataclass(slots=True, frozen=True)
+class Notification(Row):
+    notification_id: int
+    title: str
+    message: str
+    priority: str
+    created_at: Optional[datetime]
+
+
+@dataclass(slots=True, frozen=True)
+class UserNotification(Notification):
+    read_at: Optional[datetime] = joined('nr.read_at')
+
+
+@dataclass(slots=True, frozen=True)
+class SentNotification(Notification):
+    created_by_name: str = joined('u.name')
+    read_count: int = joined('COUNT(nr.notification_id)')
+
+
+@dataclass(slots=True, frozen=True)
+class Poll(Row):
+    poll_id: int
+    title: str
+    description: Optional[str]
+    end_date: Optional[date]
+    status: str
+    created_at: Optional[datetime]
+
+
+@dataclass(slots=True, frozen=True)
+class AdminPoll(Poll):
+    created_by_name: str = joined('u.name')
+    vote_count: int = joined('(SELECT COUNT(*) FROM votes v WHERE v.poll_id = p.poll_id)')
@@ -0,0 +1,163 @@
+"""Per-page query budgets
+
+Renders every dashboard page headlessly with Streamlit's AppTest against a
+database populated by generate_data.py, counts the statements each render
+sends through InstrumentedConnection, and fails when a page goes over its
+budget:
+
+    python query_budget.py --database-url postgresql://localhost/societysync_bench_1k
+
+Budgets are statement counts per render and must not grow with the data, so
+a page that starts issuing one query per poll, bill or user blows past its
+budget on any realistic dataset. Failing pages are listed with the
+fingerprints they executed, most frequent first. Exits non-zero on any
+failure so it can gate CI.
+"""
+
+import os
+import sys
+import argparse
+from collections import Counter
+
+from psycopg2.extras import RealDictCursor
+from streamlit.testing.v1 import AppTest
+
+from database import Database
+from query_catalog import load_samples
+
+
+# (role, dashboard method) -> maximum statements per render
+PAGE_BUDGETS = {
+    ('admin', 'show_dashboard'): 8,
+    ('admin', 'manage_users'): 4,
+    ('admin', 'billing_management'): 2,
+    ('admin', 'complaint_management'): 4,
+    ('admin', 'visitor_management'): 7,
+    ('admin', 'notification_management'): 1,
+    ('admin', 'poll_management'): 3,
+    ('admin', 'security_management'): 0,
+    ('owner', 'show_dashboard'): 6,
+    ('owner', 'show_bills'): 2,
+    ('owner', 'show_complaints'): 1,
+    ('owner', 'show_notifications'): 2,
+    ('owner', 'show_polls'): 6,
+    ('owner', 'show_visitor_passes'): 1,
+    ('tenant', 'show_dashboard'): 7,
+    ('tenant', 'show_bills'): 2,
+    ('tenant', 'show_complaints'): 1,
+    ('tenant', 'show_notifications'): 2,
+    ('tenant', 'show_polls'): 6,
+    ('tenant', 'show_visitor_passes'): 1,
+    ('tenant', 'show_rental_agreement'): 2,
+}
+
+
+def render_page(role, method):
+    """Render one dashboard page, leaving its statement fingerprints in session state"""
+    import streamlit as st
+    from admin_dashboard import AdminDashboard
+    from owner_dashboard import OwnerDashboard
+    from tenant_dashboard import TenantDashboard
+    from query_stats import current_trace, page_context
+
+    dashboards = {'admin': AdminDashboard, 'owner': OwnerDashboard, 'tenant': TenantDashboard}
+    db = Database()
+    dashboard = dashboards[role](db)
+
+    trace = []
+    token = current_trace.set(trace)
+    try:
+        with page_context(f"{role}:{method}"):
+            getattr(dashboard, method)()
+    finally:
+        current_trace.reset(token)
+        db.close_connection()
+    st.session_state.query_trace = [key for key, _ in trace]
+
+
+def _page_script(role, method):
+    from query_budget import render_page
+    render_page(role, method)
+
+
+def load_users():
+    """Session user dicts for an admin, an owner and a tenant, shaped like AuthManager's"""
+    db = Database()
+    samples = load_samples(db.connection)
+    cursor = db.connection.cursor(cursor_factory=RealDictCursor)
+    users = {}
+    for role, where, params in (('admin', "role = 'admin'", ()),
+                                ('owner', "user_id = %s", (samples['owner_user_id'],)),
+                                ('tenant', "user_id = %s", (samples['tenant_user_id'],))):
+        cursor.execute(f"""
+            SELECT user_id, username, role, flat_number, name, email, phone,
+                   password_changed, initial_password
+            FROM users WHERE {where}
+            ORDER BY user_id LIMIT 1
+        """, params)
+        row = cursor.fetchone()
+        if row:
+            users[role] = dict(row)
+    cursor.close()
+    db.close_connection()
+    return users
+
+
+def check_page(role, method, user, timeout):
+    """Return (statement count, fingerprint counts, error) for one render"""
+    at = AppTest.from_function(_page_script, args=(role, method), default_timeout=timeout)
+    at.session_state['logged_in'] = True
+    at.session_state['user'] = user
+    at.run()
+    if at.exception:
+        return 0, Counter(), at.exception[0].message
+    fingerprints = Counter(at.session_state['query_trace'])
+    return sum(fingerprints.values()), fingerprints, None
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Fail when a dashboard page runs more statements than its budget")
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL'), help="default: $DATABASE_URL")
+    parser.add_argument('--only', help="only check pages whose 'role:method' contains this text")
+    parser.add_argument('--timeout', type=float, default=30, help="seconds allowed per render (default: 30)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.database_url:
+        raise SystemExit("Set DATABASE_URL or pass --database-url")
+    os.environ['DATABASE_URL'] = args.database_url
+
+    users = load_users()
+    failures = []
+    for (role, method), budget in PAGE_BUDGETS.items():
+        page = f"{role}:{method}"
+        if args.only and args.only not in page:
+            continue
+        if role not in users:
+            print(f"  {page:<36} skipped, no {role} user in this database")
+            continue
+
+        count, fingerprints, error = check_page(role, method, users[role], args.timeout)
+        if error:
+            print(f"  {page:<36} ERROR {error}")
+            failures.append((page, error, fingerprints))
+        elif count > budget:
+            print(f"  {page:<36} {count:>4} statements  OVER budget {budget}")
+            failures.append((page, f"{count} statements, budget {budget}", fingerprints))
+        else:
+            print(f"  {page:<36} {count:>4} statements  (budget {budget})")
+
+    if failures:
+        print(f"\n{len(failures)} page(s) failed:")
+        for page, reason, fingerprints in failures:
+            print(f"\n{page}: {reason}")
+            for key, count in fingerprints.most_common():
+                print(f"  {count:>5} x {key[:160]}")
+        sys.exit(1)
+    print("\nAll pages within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Named dashboard statements for the measuring tools
+
+Used by benchmark.py, load_test.py, query_budget.py and explain_plans.py to
+time and plan the statements that pages execute directly on
+``self.db.connection``. The SQL itself lives in dashboard_sql.py, which the
+pages run, so an entry can't drift from its page; ``source`` names the
+method that executes it. ``params`` receives the dict built by
+load_samples().
+"""
+
+from datetime import timedelta
+
+from psycopg2.extras import RealDictCursor
+
+import dashboard_sql as sql
+
+
+class CatalogQuery:
+    def __init__(self, name, source, sql, params=None, writes=False):
+        self.name = name
+        self.source = source
+        self.sql = sql
+        self.params = params or (lambda samples: ())
+        self.writes = writes
+
+
+def analytics_since(samples):
+    """Start of the analytics tab's default 90 day period"""
+    return (samples['visit_date'] - timedelta(days=89),)
+
+
+DASHBOARD_QUERIES = [
+    # admin_dashboard.py
+    CatalogQuery('admin.recent_complaints', 'AdminDashboard.show_dashboard', sql.LATEST_COMPLAINTS),
+    CatalogQuery('admin.owner_options', 'AdminDashboard.add_user_form', sql.OWNER_OPTIONS),
+    CatalogQuery('admin.view_users', 'AdminDashboard.view_users', sql.users_query(role='owner')[0],
+                 lambda s: sql.users_query(role='owner')[1]),
+    CatalogQuery('admin.user_details_list', 'AdminDashboard.user_details', sql.USER_DETAILS_LIST),
+    CatalogQuery('admin.user_details_user', 'AdminDashboard.user_details', sql.USER_BY_ID,
+                 lambda s: (s['owner_user_id'],)),
+    CatalogQuery('admin.user_details_owner', 'AdminDashboard.user_details', sql.OWNER_BY_USER,
+                 lambda s: (s['owner_user_id'],)),
+    CatalogQuery('admin.user_details_tenant', 'AdminDashboard.user_details', sql.TENANT_BY_USER,
+                 lambda s: (s['tenant_user_id'],)),
+    CatalogQuery('admin.view_bills_pending', 'AdminDashboard.view_bills', sql.bills_query(status='pending')[0],
+                 lambda s: sql.bills_query(status='pending')[1]),
+    CatalogQuery('admin.view_bills_flat', 'AdminDashboard.view_bills', sql.bills_query(flat='-')[0],
+                 lambda s: sql.bills_query(flat=s['flat_number'])[1]),
+    CatalogQuery('admin.payment_tracking', 'AdminDashboard.payment_tracking', sql.PAYMENT_STATS),
+    CatalogQuery('admin.view_all_complaints_open', 'AdminDashboard.view_all_complaints',
+                 sql.complaints_query(status='open')[0], lambda s: sql.complaints_query(status='open')[1]),
+    CatalogQuery('admin.complaints_by_status', 'AdminDashboard.complaint_analytics', sql.COMPLAINTS_BY_STATUS),
+    CatalogQuery('admin.complaints_by_priority', 'AdminDashboard.complaint_analytics', sql.COMPLAINTS_BY_PRIORITY),
+    CatalogQuery('admin.complaints_by_category', 'AdminDashboard.complaint_analytics', sql.COMPLAINTS_BY_CATEGORY),
+    CatalogQuery('admin.current_visitors', 'AdminDashboard.load_visitor_board', sql.VISITORS_INSIDE),
+    CatalogQuery('admin.current_visitors_delta', 'AdminDashboard.poll_visitor_board', sql.VISITORS_CHANGED_SINCE,
+                 lambda s: (s['visitor_changed_since'],)),
+    CatalogQuery('admin.visitor_rollup_state', 'AdminDashboard.visitor_analytics', sql.VISITOR_ROLLUP_STATE),
+    CatalogQuery('admin.visitor_heatmap', 'AdminDashboard.visitor_analytics', sql.VISITOR_HEATMAP, analytics_since),
+    CatalogQuery('admin.visitor_top_flats', 'AdminDashboard.visitor_analytics', sql.VISITOR_TOP_FLATS,
+                 analytics_since),
+    CatalogQuery('admin.visitor_frequent_vehicles', 'AdminDashboard.visitor_analytics',
+                 sql.VISITOR_FREQUENT_VEHICLES, analytics_since),
+    CatalogQuery('admin.notification_history', 'AdminDashboard.notification_history', sql.SENT_NOTIFICATIONS),
+    CatalogQuery('admin.active_polls', 'AdminDashboard.active_polls', sql.ADMIN_ACTIVE_POLLS),
+    CatalogQuery('admin.poll_results_list', 'AdminDashboard.poll_results', sql.ALL_POLLS),
+
+    # owner_dashboard.py / tenant_dashboard.py
+    CatalogQuery('resident.pending_bill_count', 'OwnerDashboard.get_owner_stats', sql.PENDING_BILL_COUNT,
+                 lambda s: (s['flat_number'],)),
+    CatalogQuery('resident.open_complaint_count', 'OwnerDashboard.get_owner_stats', sql.OPEN_COMPLAINT_COUNT,
+                 lambda s: (s['flat_number'],)),
+    CatalogQuery('resident.unread_notification_count', 'OwnerDashboard.get_owner_stats',
+                 sql.UNREAD_NOTIFICATION_COUNT, lambda s: (s['owner_user_id'],)),
+    CatalogQuery('resident.active_poll_count', 'OwnerDashboard.get_owner_stats', sql.ACTIVE_POLL_COUNT),
+    CatalogQuery('resident.recent_bills', 'OwnerDashboard.get_recent_bills', sql.RECENT_BILLS,
+                 lambda s: (s['flat_number'], 5)),
+    CatalogQuery('resident.recent_complaints', 'OwnerDashboard.get_recent_complaints', sql.RECENT_USER_COMPLAINTS,
+                 lambda s: (s['owner_user_id'], 5)),
+    CatalogQuery('resident.tenant_info', 'TenantDashboard.get_tenant_info', sql.TENANT_BY_USER,
+                 lambda s: (s['tenant_user_id'],)),
+    CatalogQuery('resident.all_notifications', 'OwnerDashboard.show_notifications', sql.USER_NOTIFICATIONS,
+                 lambda s: (s['owner_user_id'],)),
+    CatalogQuery('resident.active_polls', 'OwnerDashboard.show_polls', sql.ACTIVE_POLLS),
+    CatalogQuery('resident.closed_polls', 'OwnerDashboard.show_polls', sql.CLOSED_POLLS),
+    CatalogQuery('resident.rent_paid', 'TenantDashboard.show_rental_agreement', sql.RENT_PAID,
+                 lambda s: (s['flat_number'],)),
+    CatalogQuery('resident.check_overdue_bills', 'utils.check_overdue_bills', sql.MARK_OVERDUE_BILLS, writes=True),
+]
+
+
+def load_samples(connection):
+    """Pick representative ids from the loaded data to bind as query parameters"""
+    cursor = connection.cursor(cursor_factory=RealDictCursor)
+    cursor.execute("""
+        SELECT u.user_id AS owner_user_id, u.flat_number
+        FROM users u WHERE u.role = 'owner'
+        ORDER BY u.user_id LIMIT 1 OFFSET (SELECT COUNT(*) / 2 FROM users WHERE role = 'owner')
+    """)
+    samples = dict(cursor.fetchone() or {'owner_user_id': None, 'flat_number': 'A011'})
+
+    cursor.execute("SELECT user_id FROM users WHERE role = 'tenant' ORDER BY user_id LIMIT 1")
+    row = cursor.fetchone()
+    samples['tenant_user_id'] = row['user_id'] if row else samples['owner_user_id']
+
+    cursor.execute("SELECT poll_id FROM polls ORDER BY poll_id DESC LIMIT 10")
+    samples['poll_ids'] = [row['poll_id'] for row in cursor.fetchall()]
+    samples['poll_id'] = samples['poll_ids'][0] if samples['poll_ids'] else None
+
+    cursor.execute("SELECT bill_id FROM bills WHERE payment_status <> 'paid' ORDER BY bill_id DESC LIMIT 1")
+    row = cursor.fetchone()
+    samples['bill_id'] = row['bill_id'] if row else None
+
+    cursor.execute("SELECT notification_id FROM notifications ORDER BY notification_id DESC LIMIT 1")
+    row = cursor.fetchone()
+    samples['notification_id'] = row['notification_id'] if row else None
+
+    cursor.execute("SELECT COALESCE(MAX(entry_time)::date, CURRENT_DATE) AS visit_date FROM visitors")
+    samples['visit_date'] = cursor.fetchone()['visit_date']
+
+    cursor.execute("""
+        SELECT visitor_id, COALESCE(vehicle_number, visitor_phone) AS identifier FROM visitors
+        WHERE status = 'in' ORDER BY entry_time DESC LIMIT 10
+    """)
+    rows = cursor.fetchall()
+    samples['open_visitor_ids'] = [row['visitor_id'] for row in rows]
+    samples['gate_identifiers'] = [row['identifier'] for row in rows if row['identifier']][:3]
+
+    cursor.execute("SELECT code FROM visitor_passes WHERE status = 'active' ORDER BY pass_id DESC LIMIT 1")
+    row = cursor.fetchone()
+    samples['pass_code'] = row['code'] if row else 'NOPASS'
+
+    # A live board's watermark: a few minutes behind the latest visitor change
+    cursor.execute("""
+        SELECT COALESCE(MAX(updated_at), LOCALTIMESTAMP) - INTERVAL '5 minutes' AS changed_since FROM visitors
+    """)
+    samples['visitor_changed_since'] = cursor.fetchone()['changed_since']
+    cursor.close()
+    return samples
@@ -0,0 +1,205 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+
+import psycopg2.extensions
+
+
+# Statements slower than this are written to the slow-query log
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+SLOW_QUERY_LOG = os.getenv('SLOW_QUERY_LOG')
+
+# Upper bounds (ms) of the latency histogram buckets, the last bucket is open-ended
+LATENCY_BUCKETS_MS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+current_page = contextvars.ContextVar('current_page', default='unknown')
+# Optional list that also receives (fingerprint, duration_ms) for the current rerun
+current_trace = contextvars.ContextVar('current_trace', default=None)
+
+
+def _build_slow_query_logger():
+    logger = logging.getLogger('societysync.slow_query')
+    if not logger.handlers:
+        handler = logging.FileHandler(SLOW_QUERY_LOG) if SLOW_QUERY_LOG else logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(logging.WARNING)
+        logger.propagate = False
+    return logger
+
+
+slow_query_logger = _build_slow_query_logger()
+
+
+_COMMENT_RE = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_PARAM_RE = re.compile(r'%\(\w+\)s|%s')
+_IN_LIST_RE = re.compile(r'\(\s*\?(?:\s*,\s*\?)+\s*\)')
+_SPACE_RE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Normalize a statement so every call with different values groups together"""
+    if isinstance(sql, bytes):
+        sql = sql.decode('utf-8', 'replace')
+    elif not isinstance(sql, str):
+        sql = str(sql)
+    sql = _COMMENT_RE.sub(' ', sql)
+    sql = _STRING_RE.sub('?', sql)
+    sql = _PARAM_RE.sub('?', sql)
+    sql = _NUMBER_RE.sub('?', sql)
+    sql = _IN_LIST_RE.sub('(?)', sql)
+    return _SPACE_RE.sub(' ', sql).strip().rstrip(';')
+
+
+class QueryStats:
+    """In-memory per-fingerprint latency histograms"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.fingerprints = {}
+
+    def record(self, sql, duration_ms, rows, page):
+        key = fingerprint(sql)
+        with self.lock:
+            entry = self.fingerprints.get(key)
+            if entry is None:
+                entry = {
+                    'count': 0,
+                    'total_ms': 0.0,
+                    'max_ms': 0.0,
+                    'rows': 0,
+                    'buckets': [0] * (len(LATENCY_BUCKETS_MS) + 1),
+                    'pages': {}
+                }
+                self.fingerprints[key] = entry
+
+            entry['count'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            entry['rows'] += max(rows, 0)
+            entry['buckets'][_bucket_index(duration_ms)] += 1
+            entry['pages'][page] = entry['pages'].get(page, 0) + 1
+
+        trace = current_trace.get()
+        if trace is not None:
+            trace.append((key, duration_ms))
+
+        if duration_ms >= SLOW_QUERY_MS:
+            slow_query_logger.warning(json.dumps({
+                'event': 'slow_query',
+                'ts': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'page': page,
+                'duration_ms': round(duration_ms, 2),
+                'rows': rows,
+                'fingerprint': key
+            }))
+        return key
+
+    def snapshot(self):
+        """Copy of the current stats, slowest total time first"""
+        with self.lock:
+            rows = []
+            for key, entry in self.fingerprints.items():
+                rows.append({
+                    'fingerprint': key,
+                    'count': entry['count'],
+                    'total_ms': entry['total_ms'],
+                    'mean_ms': entry['total_ms'] / entry['count'],
+                    'p50_ms': _percentile(entry['buckets'], 0.50),
+                    'p95_ms': _percentile(entry['buckets'], 0.95),
+                    'max_ms': entry['max_ms'],
+                    'rows': entry['rows'],
+                    'buckets': list(entry['buckets']),
+                    'pages': dict(entry['pages'])
+                })
+        rows.sort(key=lambda row: row['total_ms'], reverse=True)
+        return rows
+
+    def reset(self):
+        with self.lock:
+            self.fingerprints.clear()
+
+
+def _bucket_index(duration_ms):
+    for i, bound in enumerate(LATENCY_BUCKETS_MS):
+        if duration_ms <= bound:
+            return i
+    return len(LATENCY_BUCKETS_MS)
+
+
+def _percentile(buckets, fraction):
+    """Estimate a percentile as the upper bound of the bucket that contains it"""
+    total = sum(buckets)
+    if total == 0:
+        return 0.0
+    target = total * fraction
+    seen = 0
+    for i, count in enumerate(buckets):
+        seen += count
+        if seen >= target:
+            return float(LATENCY_BUCKETS_MS[i]) if i < len(LATENCY_BUCKETS_MS) else float('inf')
+    return float('inf')
+
+
+query_stats = QueryStats()
+
+
+@contextmanager
+def page_context(page):
+    """Attribute every statement executed inside the block to the given page"""
+    token = current_page.set(page)
+    try:
+        yield
+    finally:
+        current_page.reset(token)
+
+
+_timed_cursor_classes = {}
+
+
+def _timed_cursor_class(base):
+    """Subclass of the requested cursor class (e.g. RealDictCursor) that times execute"""
+    cls = _timed_cursor_classes.get(base)
+    if cls is not None:
+        return cls
+
+    class TimedCursor(base):
+        def execute(self, query, vars=None):
+            start = time.perf_counter()
+            try:
+                return super().execute(query, vars)
+            finally:
+                duration_ms = (time.perf_counter() - start) * 1000
+                query_stats.record(query, duration_ms, self.rowcount, current_page.get())
+
+        def executemany(self, query, vars_list):
+            start = time.perf_counter()
+            try:
+                return super().executemany(query, vars_list)
+            finally:
+                duration_ms = (time.perf_counter() - start) * 1000
+                query_stats.record(query, duration_ms, self.rowcount, current_page.get())
+
+    TimedCursor.__name__ = f"Timed{base.__name__}"
+    _timed_cursor_classes[base] = TimedCursor
+    return TimedCursor
+
+
+class InstrumentedConnection(psycopg2.extensions.connection):
+    """Connection whose cursors record every statement in query_stats
+
+    Pass as ``connection_factory`` to ``psycopg2.connect``. Callers keep using
+    ``connection.cursor(cursor_factory=RealDictCursor)`` unchanged.
+    """
+
+    def cursor(self, *args, **kwargs):
+        base = kwargs.get('cursor_factory') or self.cursor_factory or psycopg2.extensions.cursor
+        kwargs['cursor_factory'] = _timed_cursor_class(base)
+        return super().cursor(*args, **kwargs)
@@ -0,0 +1,168 @@
+import os
+import io
+import time
+import random
+import pstats
+import cProfile
+import threading
+from contextlib import contextmanager
+
+import pandas as pd
+import streamlit as st
+
+from query_stats import current_trace
+from metrics import page_render_latency
+
+try:
+    from pyinstrument import Profiler as PyinstrumentProfiler
+except ImportError:
+    PyinstrumentProfiler = None
+
+
+# Fraction of profiled reruns that also run a call profiler around the page
+PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', '0.1'))
+# Number of slowest call profiles kept per page
+PROFILES_PER_PAGE = 3
+
+
+class RerunProfile:
+    """Wall time, query count and DB time for each section of one rerun"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.sections = []
+        self.queries = []
+        self.page = None
+        self.token = current_trace.set(self.queries)
+
+    @contextmanager
+    def section(self, name):
+        start = time.perf_counter()
+        first_query = len(self.queries)
+        try:
+            yield
+        finally:
+            queries = self.queries[first_query:]
+            self.sections.append({
+                'Section': name,
+                'Wall (ms)': round((time.perf_counter() - start) * 1000, 1),
+                'Queries': len(queries),
+                'DB (ms)': round(sum(duration for _, duration in queries), 1)
+            })
+
+    @contextmanager
+    def page_section(self, page, sample=False):
+        """Time the dashboard page, running a sampled call profiler if requested
+
+        page is the ``role:page`` route query_stats uses, and every call also
+        feeds the page render histogram exported by metrics under that route.
+        """
+        self.page = page
+        profiler = None
+        if sample and random.random() < PROFILE_SAMPLE_RATE:
+            if PyinstrumentProfiler:
+                profiler = PyinstrumentProfiler()
+                profiler.start()
+            else:
+                profiler = cProfile.Profile()
+                try:
+                    profiler.enable()
+                except ValueError:
+                    # Another profiler already owns this interpreter
+                    profiler = None
+
+        start = time.perf_counter()
+        try:
+            with self.section(f"Page: {page}"):
+                yield
+        finally:
+            page_render_latency.observe((time.perf_counter() - start) * 1000, page)
+            if profiler is not None:
+                if PyinstrumentProfiler:
+                    profiler.stop()
+                    output = profiler.output_text(unicode=True, color=False)
+                else:
+                    profiler.disable()
+                    stream = io.StringIO()
+                    pstats.Stats(profiler, stream=stream).sort_stats('cumulative').print_stats(30)
+                    output = stream.getvalue()
+                slow_page_profiles.add(page, (time.perf_counter() - start) * 1000, output)
+
+    def elapsed_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def finish(self):
+        """Stop collecting queries for this rerun, safe to call more than once"""
+        if self.token is not None:
+            current_trace.reset(self.token)
+            self.token = None
+
+
+class SlowPageProfiles:
+    """Process-wide store of the slowest sampled call profiles per page"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pages = {}
+
+    def add(self, page, wall_ms, output):
+        with self.lock:
+            profiles = self.pages.setdefault(page, [])
+            profiles.append({'wall_ms': wall_ms, 'captured_at': time.strftime("%d-%m-%Y %H:%M:%S"),
+                             'output': output})
+            profiles.sort(key=lambda profile: profile['wall_ms'], reverse=True)
+            del profiles[PROFILES_PER_PAGE:]
+
+    def get(self, page):
+        with self.lock:
+            return list(self.pages.get(page, []))
+
+
+slow_page_profiles = SlowPageProfiles()
+
+
+def profiling_requested(user):
+    """The panel is admin-only, switched on by the sidebar toggle or ?profile=1"""
+    if not user or user.get('role') != 'admin':
+        return False
+    if st.query_params.get('profile') == '1':
+        return True
+    return st.session_state.get('show_perf_panel', False)
+
+
+def render_perf_panel(profile):
+    """Show the per-rerun breakdown below the page"""
+    total_ms = profile.elapsed_ms()
+    db_ms = sum(duration for _, duration in profile.queries)
+
+    with st.expander("⏱️ Performance (this rerun)", expanded=False):
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("Wall Time", f"{total_ms:.0f} ms")
+        with col2:
+            st.metric("Queries", len(profile.queries))
+        with col3:
+            st.metric("DB Time", f"{db_ms:.0f} ms")
+
+        if profile.sections:
+            st.dataframe(pd.DataFrame(profile.sections), use_container_width=True, hide_index=True)
+
+        if profile.queries:
+            by_fingerprint = {}
+            for key, duration in profile.queries:
+                count, total = by_fingerprint.get(key, (0, 0.0))
+                by_fingerprint[key] = (count + 1, total + duration)
+            statements = pd.DataFrame(
+                [{'Statement': key, 'Calls': count, 'Total (ms)': round(total, 1)}
+                 for key, (count, total) in by_fingerprint.items()]
+            ).sort_values('Total (ms)', ascending=False)
+            st.write("**Statements**")
+            st.dataframe(statements, use_container_width=True, hide_index=True)
+
+        if profile.page:
+            profiles = slow_page_profiles.get(profile.page)
+            if profiles:
+                st.write(f"**Slowest sampled profiles for {profile.page}**")
+                for sampled in profiles:
+                    st.caption(f"{sampled['wall_ms']:.0f} ms at {sampled['captured_at']}")
+                    st.code(sampled['output'], language=None)
@@ -148,13 +148,19 @@ CREATE TABLE public.visitors (
     visitor_name character varying(100) NOT NULL,
     visitor_phone character varying(15),
     purpose character varying(200),
-    entry_time timestamp without time zone DEFAULT CURRENT_TIMESTAMP,
+    entry_time timestamp without time zone DEFAULT CURRENT_TIMESTAMP NOT NULL,
     exit_time timestamp without time zone,
     vehicle_number character varying(20),
     logged_by integer,
     status character varying(20) DEFAULT 'in',
-    CONSTRAINT visitors_status_check CHECK (status IN ('in', 'out'))
-);
+    updated_at timestamp without time zone DEFAULT CURRENT_TIMESTAMP,
+    CONSTRAINT visitors_status_check CHECK (status IN ('in', 'out')),
+    CONSTRAINT visitors_pkey PRIMARY KEY (visitor_id, entry_time)
+) PARTITION BY RANGE (entry_time);
+
+-- One partition per month; the app creates the current and upcoming months itself
+CREATE TABLE public.visitors_y2024m09 PARTITION OF public.visitors
+    FOR VALUES FROM ('2024-09-01') TO ('2024-10-01');
 
 CREATE SEQUENCE public.visitors_visitor_id_seq AS integer START WITH 1 INCREMENT BY 1 CACHE 1;
 ALTER SEQUENCE public.visitors_visitor_id_seq OWNED BY public.visitors.visitor_id;
@@ -179,7 +185,7 @@ ALTER TABLE ONLY public.poll_options ALTER COLUMN option_id SET DEFAULT nextval(
 ALTER TABLE ONLY public.polls ALTER COLUMN poll_id SET DEFAULT nextval('public.polls_poll_id_seq'::regclass);
 ALTER TABLE ONLY public.tenants ALTER COLUMN tenant_id SET DEFAULT nextval('public.tenants_tenant_id_seq'::regclass);
 ALTER TABLE ONLY public.users ALTER COLUMN user_id SET DEFAULT nextval('public.users_user_id_seq'::regclass);
-ALTER TABLE ONLY public.visitors ALTER COLUMN visitor_id SET DEFAULT nextval('public.visitors_visitor_id_seq'::regclass);
+ALTER TABLE public.visitors ALTER COLUMN visitor_id SET DEFAULT nextval('public.visitors_visitor_id_seq'::regclass);
 ALTER TABLE ONLY public.votes ALTER COLUMN vote_id SET DEFAULT nextval('public.votes_vote_id_seq'::regclass);
 
 ALTER TABLE ONLY public.bills ADD CONSTRAINT bills_pkey PRIMARY KEY (bill_id);
@@ -193,7 +199,6 @@ ALTER TABLE ONLY public.polls ADD CONSTRAINT polls_pkey PRIMARY KEY (poll_id);
 ALTER TABLE ONLY public.tenants ADD CONSTRAINT tenants_pkey PRIMARY KEY (tenant_id);
 ALTER TABLE ONLY public.users ADD CONSTRAINT users_pkey PRIMARY KEY (user_id);
 ALTER TABLE ONLY public.users ADD CONSTRAINT users_username_key UNIQUE (username);
-ALTER TABLE ONLY public.visitors ADD CONSTRAINT visitors_pkey PRIMARY KEY (visitor_id);
 ALTER TABLE ONLY public.votes ADD CONSTRAINT votes_pkey PRIMARY KEY (vote_id);
 ALTER TABLE ONLY public.votes ADD CONSTRAINT votes_poll_id_user_id_key UNIQUE (poll_id, user_id);
 
@@ -207,7 +212,7 @@ ALTER TABLE ONLY public.poll_options ADD CONSTRAINT poll_options_poll_id_fkey FO
 ALTER TABLE ONLY public.polls ADD CONSTRAINT polls_created_by_fkey FOREIGN KEY (created_by) REFERENCES public.users(user_id);
 ALTER TABLE ONLY public.tenants ADD CONSTRAINT tenants_owner_id_fkey FOREIGN KEY (owner_id) REFERENCES public.owners(owner_id);
 ALTER TABLE ONLY public.tenants ADD CONSTRAINT tenants_user_id_fkey FOREIGN KEY (user_id) REFERENCES public.users(user_id) ON DELETE CASCADE;
-ALTER TABLE ONLY public.visitors ADD CONSTRAINT visitors_logged_by_fkey FOREIGN KEY (logged_by) REFERENCES public.users(user_id);
+ALTER TABLE public.visitors ADD CONSTRAINT visitors_logged_by_fkey FOREIGN KEY (logged_by) REFERENCES public.users(user_id);
 ALTER TABLE ONLY public.votes ADD CONSTRAINT votes_option_id_fkey FOREIGN KEY (option_id) REFERENCES public.poll_options(option_id) ON DELETE CASCADE;
 ALTER TABLE ONLY public.votes ADD CONSTRAINT votes_poll_id_fkey FOREIGN KEY (poll_id) REFERENCES public.polls(poll_id) ON DELETE CASCADE;
 ALTER TABLE ONLY public.votes ADD CONSTRAINT votes_user_id_fkey FOREIGN KEY (user_id) REFERENCES public.users(user_id) ON DELETE CASCADE;
@@ -2,9 +2,12 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, date
 from psycopg2.extras import RealDictCursor
+from models import Bill, Complaint, UserNotification, Poll, fetch_all
+import dashboard_sql as sql
 from utils import (
     format_currency, format_date, format_datetime, create_data_table,
-    get_status_color, create_notification_display, create_poll_display
+    get_status_color, create_notification_display, create_poll_display,
+    create_visitor_pass_display, section_fragment, rerun_section
 )
 
 class TenantDashboard:
@@ -73,8 +76,8 @@ class TenantDashboard:
             
             if recent_bills:
                 for bill in recent_bills:
-                    status_color = get_status_color(bill['payment_status'])
-                    st.write(f"{status_color} {bill['bill_type']} - {format_currency(bill['amount'])} (Due: {format_date(bill['due_date'])})")
+                    status_color = get_status_color(bill.payment_status)
+                    st.write(f"{status_color} {bill.bill_type} - {format_currency(bill.amount)} (Due: {format_date(bill.due_date)})")
             else:
                 st.info("No recent bills")
         
@@ -84,8 +87,8 @@ class TenantDashboard:
             
             if recent_complaints:
                 for complaint in recent_complaints:
-                    status_color = get_status_color(complaint['status'])
-                    st.write(f"{status_color} {complaint['title']} - {complaint['status'].title()}")
+                    status_color = get_status_color(complaint.status)
+                    st.write(f"{status_color} {complaint.title} - {complaint.status.title()}")
             else:
                 st.info("No recent complaints")
         
@@ -111,13 +114,7 @@ class TenantDashboard:
     def get_tenant_info(self, user_id):
         """Get tenant-specific information"""
         cursor = self.db.connection.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("""
-            SELECT t.*, u.name as owner_name 
-            FROM tenants t
-            LEFT JOIN owners o ON t.owner_id = o.owner_id
-            LEFT JOIN users u ON o.user_id = u.user_id
-            WHERE t.user_id = %s
-        """, (user_id,))
+        cursor.execute(sql.TENANT_BY_USER, (user_id,))
         tenant_info = cursor.fetchone()
         cursor.close()
         return tenant_info
@@ -129,38 +126,20 @@ class TenantDashboard:
         stats = {}
         
         # Pending bills
-        cursor.execute("""
-            SELECT COUNT(*) as count 
-            FROM bills 
-            WHERE flat_number = %s AND payment_status = 'pending'
-        """, (flat_number,))
+        cursor.execute(sql.PENDING_BILL_COUNT, (flat_number,))
         stats['pending_bills'] = cursor.fetchone()['count']
         
         # Open complaints
-        cursor.execute("""
-            SELECT COUNT(*) as count 
-            FROM complaints 
-            WHERE flat_number = %s AND status IN ('open', 'in_progress')
-        """, (flat_number,))
+        cursor.execute(sql.OPEN_COMPLAINT_COUNT, (flat_number,))
         stats['open_complaints'] = cursor.fetchone()['count']
         
         # Unread notifications
         user_id = st.session_state.user['user_id']
-        cursor.execute("""
-            SELECT COUNT(*) as count
-            FROM notifications n
-            LEFT JOIN notification_reads nr ON n.notification_id = nr.notification_id 
-                AND nr.user_id = %s
-            WHERE nr.notification_id IS NULL
-        """, (user_id,))
+        cursor.execute(sql.UNREAD_NOTIFICATION_COUNT, (user_id,))
         stats['unread_notifications'] = cursor.fetchone()['count']
         
         # Active polls
-        cursor.execute("""
-            SELECT COUNT(*) as count 
-            FROM polls 
-            WHERE status = 'active'
-        """)
+        cursor.execute(sql.ACTIVE_POLL_COUNT)
         stats['active_polls'] = cursor.fetchone()['count']
         
         cursor.close()
@@ -168,30 +147,21 @@ class TenantDashboard:
     
     def get_recent_bills(self, flat_number, limit=5):
         """Get recent bills for the flat"""
-        cursor = self.db.connection.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("""
-            SELECT * FROM bills 
-            WHERE flat_number = %s 
-            ORDER BY created_at DESC 
-            LIMIT %s
-        """, (flat_number, limit))
-        bills = cursor.fetchall()
+        cursor = self.db.connection.cursor()
+        cursor.execute(sql.RECENT_BILLS, (flat_number, limit))
+        bills = fetch_all(cursor, Bill)
         cursor.close()
         return bills
     
     def get_recent_complaints(self, user_id, limit=5):
         """Get recent complaints by the user"""
-        cursor = self.db.connection.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("""
-            SELECT * FROM complaints 
-            WHERE user_id = %s 
-            ORDER BY created_at DESC 
-            LIMIT %s
-        """, (user_id, limit))
-        complaints = cursor.fetchall()
+        cursor = self.db.connection.cursor()
+        cursor.execute(sql.RECENT_USER_COMPLAINTS, (user_id, limit))
+        complaints = fetch_all(cursor, Complaint)
         cursor.close()
         return complaints
     
+    @section_fragment
     def show_bills(self):
         """Show bills management (same as owner)"""
         user = st.session_state.user
@@ -206,9 +176,9 @@ class TenantDashboard:
         
         if bills:
             # Summary metrics
-            total_pending = sum(float(bill['amount']) for bill in bills if bill['payment_status'] == 'pending')
-            total_overdue = sum(float(bill['amount']) for bill in bills if bill['payment_status'] == 'overdue')
-            total_paid = sum(float(bill['amount']) for bill in bills if bill['payment_status'] == 'paid')
+            total_pending = sum(float(bill.amount) for bill in bills if bill.payment_status == 'pending')
+            total_overdue = sum(float(bill.amount) for bill in bills if bill.payment_status == 'overdue')
+            total_paid = sum(float(bill.amount) for bill in bills if bill.payment_status == 'paid')
             
             col1, col2, col3 = st.columns(3)
             
@@ -233,41 +203,41 @@ class TenantDashboard:
             # Apply filters
             filtered_bills = bills
             if status_filter != "all":
-                filtered_bills = [bill for bill in filtered_bills if bill['payment_status'] == status_filter]
+                filtered_bills = [bill for bill in filtered_bills if bill.payment_status == status_filter]
             if bill_type_filter != "all":
-                filtered_bills = [bill for bill in filtered_bills if bill['bill_type'] == bill_type_filter]
+                filtered_bills = [bill for bill in filtered_bills if bill.bill_type == bill_type_filter]
             
             # Display bills
             if filtered_bills:
                 for bill in filtered_bills:
-                    with st.expander(f"{get_status_color(bill['payment_status'])} {bill['bill_type']} - {format_currency(bill['amount'])} (Due: {format_date(bill['due_date'])})"):
+                    with st.expander(f"{get_status_color(bill.payment_status)} {bill.bill_type} - {format_currency(bill.amount)} (Due: {format_date(bill.due_date)})"):
                         col1, col2 = st.columns([2, 1])
                         
                         with col1:
-                            st.write(f"**Bill ID:** {bill['bill_id']}")
-                            st.write(f"**Type:** {bill['bill_type']}")
-                            st.write(f"**Amount:** {format_currency(bill['amount'])}")
-                            st.write(f"**Due Date:** {format_date(bill['due_date'])}")
-                            st.write(f"**Status:** {bill['payment_status'].title()}")
-                            if bill['payment_date']:
-                                st.write(f"**Payment Date:** {format_date(bill['payment_date'])}")
-                                st.write(f"**Payment Method:** {bill['payment_method']}")
+                            st.write(f"**Bill ID:** {bill.bill_id}")
+                            st.write(f"**Type:** {bill.bill_type}")
+                            st.write(f"**Amount:** {format_currency(bill.amount)}")
+                            st.write(f"**Due Date:** {format_date(bill.due_date)}")
+                            st.write(f"**Status:** {bill.payment_status.title()}")
+                            if bill.payment_date:
+                                st.write(f"**Payment Date:** {format_date(bill.payment_date)}")
+                                st.write(f"**Payment Method:** {bill.payment_method}")
                         
                         with col2:
-                            if bill['payment_status'] in ['pending', 'overdue']:
+                            if bill.payment_status in ['pending', 'overdue']:
                                 st.subheader("💳 Pay Now")
                                 
                                 payment_method = st.selectbox(
                                     "Payment Method",
                                     ["Online Banking", "UPI", "Credit Card", "Debit Card", "Cash"],
-                                    key=f"payment_method_{bill['bill_id']}"
+                                    key=f"payment_method_{bill.bill_id}"
                                 )
                                 
-                                if st.button("Pay Bill", key=f"pay_{bill['bill_id']}"):
+                                if st.button("Pay Bill", key=f"pay_{bill.bill_id}"):
                                     try:
-                                        self.db.pay_bill(bill['bill_id'], payment_method)
+                                        self.db.pay_bill(bill.bill_id, payment_method)
                                         st.success("Payment successful!")
-                                        st.rerun()
+                                        rerun_section()
                                     except Exception as e:
                                         st.error(f"Payment failed: {e}")
             else:
@@ -349,31 +319,32 @@ class TenantDashboard:
             # Apply filter
             filtered_complaints = complaints
             if status_filter != "all":
-                filtered_complaints = [c for c in complaints if c['status'] == status_filter]
+                filtered_complaints = [c for c in complaints if c.status == status_filter]
             
             if filtered_complaints:
                 for complaint in filtered_complaints:
-                    with st.expander(f"{get_status_color(complaint['status'])} #{complaint['complaint_id']} - {complaint['title']} ({complaint['priority'].upper()})"):
+                    with st.expander(f"{get_status_color(complaint.status)} #{complaint.complaint_id} - {complaint.title} ({complaint.priority.upper()})"):
                         col1, col2 = st.columns([2, 1])
                         
                         with col1:
-                            st.write(f"**Category:** {complaint['category']}")
-                            st.write(f"**Description:** {complaint['description']}")
-                            if complaint['admin_response']:
-                                st.write(f"**Admin Response:** {complaint['admin_response']}")
+                            st.write(f"**Category:** {complaint.category}")
+                            st.write(f"**Description:** {complaint.description}")
+                            if complaint.admin_response:
+                                st.write(f"**Admin Response:** {complaint.admin_response}")
                         
                         with col2:
-                            st.write(f"**Status:** {complaint['status'].title()}")
-                            st.write(f"**Priority:** {complaint['priority'].title()}")
-                            st.write(f"**Created:** {format_datetime(complaint['created_at'])}")
-                            st.write(f"**Updated:** {format_datetime(complaint['updated_at'])}")
-                            if complaint['resolved_at']:
-                                st.write(f"**Resolved:** {format_datetime(complaint['resolved_at'])}")
+                            st.write(f"**Status:** {complaint.status.title()}")
+                            st.write(f"**Priority:** {complaint.priority.title()}")
+                            st.write(f"**Created:** {format_datetime(complaint.created_at)}")
+                            st.write(f"**Updated:** {format_datetime(complaint.updated_at)}")
+                            if complaint.resolved_at:
+                                st.write(f"**Resolved:** {format_datetime(complaint.resolved_at)}")
             else:
                 st.info("No complaints found with the selected filter")
         else:
             st.info("You haven't raised any complaints yet")
     
+    @section_fragment
     def show_notifications(self):
         """Show notifications (same as owner)"""
         user = st.session_state.user
@@ -388,81 +359,70 @@ class TenantDashboard:
             st.divider()
         
         # Get all notifications (read and unread)
-        cursor = self.db.connection.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("""
-            SELECT n.*, nr.read_at
-            FROM notifications n
-            LEFT JOIN notification_reads nr ON n.notification_id = nr.notification_id 
-                AND nr.user_id = %s
-            ORDER BY n.created_at DESC
-            LIMIT 20
-        """, (user['user_id'],))
-        all_notifications = cursor.fetchall()
+        cursor = self.db.connection.cursor()
+        cursor.execute(sql.USER_NOTIFICATIONS, (user['user_id'],))
+        all_notifications = fetch_all(cursor, UserNotification)
         cursor.close()
         
         if all_notifications:
             st.subheader("📜 All Notifications")
             
             for notification in all_notifications:
-                read_status = "✅ Read" if notification['read_at'] else "🔴 Unread"
+                read_status = "✅ Read" if notification.read_at else "🔴 Unread"
                 
-                with st.expander(f"{notification['title']} - {read_status} - {format_datetime(notification['created_at'])}"):
-                    st.write(notification['message'])
-                    if notification['read_at']:
-                        st.write(f"*Read on: {format_datetime(notification['read_at'])}*")
+                with st.expander(f"{notification.title} - {read_status} - {format_datetime(notification.created_at)}"):
+                    st.write(notification.message)
+                    if notification.read_at:
+                        st.write(f"*Read on: {format_datetime(notification.read_at)}*")
                     else:
-                        if st.button(f"Mark as Read", key=f"read_all_{notification['notification_id']}"):
-                            self.db.mark_notification_read(notification['notification_id'], user['user_id'])
+                        if st.button(f"Mark as Read", key=f"read_all_{notification.notification_id}"):
+                            self.db.mark_notification_read(notification.notification_id, user['user_id'])
                             st.success("Marked as read!")
-                            st.rerun()
+                            rerun_section()
         else:
             if not unread_notifications:
                 st.info("No notifications")
     
+    def show_visitor_passes(self):
+        """Pre-approved passes the gate admits by code"""
+        user = st.session_state.user
+        st.title("🎫 Visitor Passes")
+        st.write("Create a pass for an expected visitor and share its code; the gate admits them by the code alone.")
+        
+        create_visitor_pass_display(self.db, user)
+    
     def show_polls(self):
         """Show polls and voting (same as owner)"""
         user = st.session_state.user
         st.title("🗳️ Polls & Voting")
         
         # Get active polls
-        cursor = self.db.connection.cursor(cursor_factory=RealDictCursor)
-        cursor.execute("""
-            SELECT * FROM polls 
-            WHERE status = 'active'
-            ORDER BY created_at DESC
-        """)
-        active_polls = cursor.fetchall()
+        cursor = self.db.connection.cursor()
+        cursor.execute(sql.ACTIVE_POLLS)
+        active_polls = fetch_all(cursor, Poll)
         
         if active_polls:
             st.subheader("🗳️ Active Polls")
             create_poll_display(active_polls, self.db, user['user_id'])
         
         # Get closed polls with results
-        cursor.execute("""
-            SELECT * FROM polls 
-            WHERE status = 'closed'
-            ORDER BY created_at DESC
-            LIMIT 10
-        """)
-        closed_polls = cursor.fetchall()
+        cursor.execute(sql.CLOSED_POLLS)
+        closed_polls = fetch_all(cursor, Poll)
         
         if closed_polls:
             st.subheader("📊 Recent Poll Results")
             
+            poll_ids = [poll.poll_id for poll in closed_polls]
+            options_by_poll = self.db.get_poll_options(poll_ids)
+            user_votes = self.db.get_user_votes(user['user_id'], poll_ids)
+            
             for poll in closed_polls:
-                with st.expander(f"📊 {poll['title']} (Closed)"):
-                    st.write(poll['description'])
-                    st.write(f"**End Date:** {format_date(poll['end_date'])}")
+                with st.expander(f"📊 {poll.title} (Closed)"):
+                    st.write(poll.description)
+                    st.write(f"**End Date:** {format_date(poll.end_date)}")
                     
                     # Get results
-                    cursor.execute("""
-                        SELECT option_text, vote_count 
-                        FROM poll_options 
-                        WHERE poll_id = %s
-                        ORDER BY vote_count DESC
-                    """, (poll['poll_id'],))
-                    
-                    results = cursor.fetchall()
+                    results = sorted(options_by_poll[poll.poll_id], key=lambda opt: opt['vote_count'], reverse=True)
                     if results:
                         total_votes = sum(result['vote_count'] for result in results)
                         
@@ -475,16 +435,8 @@ class TenantDashboard:
                         st.write(f"**Total Votes:** {total_votes}")
                         
                         # Check if user voted
-                        cursor.execute("""
-                            SELECT po.option_text 
-                            FROM votes v
-                            JOIN poll_options po ON v.option_id = po.option_id
-                            WHERE v.poll_id = %s AND v.user_id = %s
-                        """, (poll['poll_id'], user['user_id']))
-                        
-                        user_vote = cursor.fetchone()
-                        if user_vote:
-                            st.info(f"✅ You voted for: {user_vote['option_text']}")
+                        if poll.poll_id in user_votes:
+                            st.info(f"✅ You voted for: {user_votes[poll.poll_id]}")
         
         if not active_polls and not closed_polls:
             st.info("No polls available")
@@ -521,11 +473,7 @@ class TenantDashboard:
                     
                     # Get total rent paid from bills
                     cursor = self.db.connection.cursor(cursor_factory=RealDictCursor)
-                    cursor.execute("""
-                        SELECT COALESCE(SUM(amount), 0) as total_paid
-                        FROM bills
-                        WHERE flat_number = %s AND payment_status = 'paid' AND bill_type = 'Rent'
-                    """, (user['flat_number'],))
+                    cursor.execute(sql.RENT_PAID, (user['flat_number'],))
                     result = cursor.fetchone()
                     total_rent_paid = float(result['total_paid']) if result else 0
                     cursor.close()
@@ -1,9 +1,52 @@
 import streamlit as st
+from streamlit.errors import StreamlitAPIException
 import plotly.express as px
 import plotly.graph_objects as go
+import plotly.io as pio
 import pandas as pd
+import numpy as np
 from datetime import datetime, date
+from collections import OrderedDict
 import hashlib
+import functools
+import json
+import os
+import threading
+from metrics import cache_requests
+from query_stats import current_page, page_context
+import dashboard_sql
+
+# Serialized figures kept by the shared chart cache (least recently used are dropped)
+CHART_CACHE_SIZE = int(os.getenv('CHART_CACHE_SIZE', '256'))
+
+def section_fragment(func=None, *, run_every=None):
+    """Render func as an st.fragment so its buttons rerun only that section
+    
+    Actions inside call ``rerun_section()``. The page the section
+    was first drawn on is passed along so fragment reruns, which run outside
+    app.main(), keep their queries attributed to it. ``run_every`` (seconds)
+    makes the section refresh itself on a timer.
+    """
+    if func is None:
+        return functools.partial(section_fragment, run_every=run_every)
+    
+    def fragment(page, *args, **kwargs):
+        with page_context(page):
+            return func(*args, **kwargs)
+    fragment.__qualname__ = func.__qualname__
+    fragment = st.fragment(fragment, run_every=run_every)
+    
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return fragment(current_page.get(), *args, **kwargs)
+    return wrapper
+
+def rerun_section():
+    """Rerun the enclosing section_fragment, or the whole app outside a fragment rerun"""
+    try:
+        st.rerun(scope="fragment")
+    except StreamlitAPIException:
+        st.rerun()
 
 def create_sidebar_navigation(user_role, auth_manager):
     """Create sidebar navigation based on user role"""
@@ -26,6 +69,7 @@ def create_sidebar_navigation(user_role, auth_manager):
             "🚶 Visitors",
             "📢 Notifications",
             "🗳️ Polls",
+            "🛡️ Security",
             "👤 Profile"
         ]
     else:  # owner or tenant
@@ -35,6 +79,7 @@ def create_sidebar_navigation(user_role, auth_manager):
             "📝 My Complaints",
             "📢 Notifications",
             "🗳️ Polls",
+            "🎫 Visitor Passes",
             "👤 Profile"
         ]
     
@@ -42,11 +87,50 @@ def create_sidebar_navigation(user_role, auth_manager):
     
     st.sidebar.divider()
     
+    if user_role == 'admin':
+        st.sidebar.toggle("⏱️ Performance panel", key="show_perf_panel")
+    
     if st.sidebar.button("🚪 Logout"):
         auth_manager.logout()
     
     return selected
 
+class ChartCache:
+    """Bounded LRU of Plotly figures as JSON, keyed by a hash of the chart's data and parameters"""
+    
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+    
+    @staticmethod
+    def key(kind, df, params):
+        payload = json.dumps([kind, params, [str(column) for column in df.columns],
+                              df.astype(str).values.tolist()])
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+    
+    def get_or_build(self, key, build):
+        with self.lock:
+            figure_json = self.entries.get(key)
+            if figure_json is not None:
+                self.entries.move_to_end(key)
+        if figure_json is not None:
+            cache_requests.inc('charts', 'hit')
+            return pio.from_json(figure_json)
+        
+        cache_requests.inc('charts', 'miss')
+        fig = build()
+        with self.lock:
+            self.entries[key] = fig.to_json()
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return fig
+
+@st.cache_resource
+def get_chart_cache():
+    """One chart cache per process, shared by every session"""
+    return ChartCache(CHART_CACHE_SIZE)
+
 def create_pie_chart(data, names, values, title):
     """Create pie chart using Plotly"""
     if data is None or len(data) == 0:
@@ -57,9 +141,13 @@ def create_pie_chart(data, names, values, title):
         if df.empty:
             return None
         
-        fig = px.pie(df, names=names, values=values, title=title)
-        fig.update_traces(textposition='inside', textinfo='percent+label')
-        return fig
+        def build():
+            fig = px.pie(df, names=names, values=values, title=title)
+            fig.update_traces(textposition='inside', textinfo='percent+label')
+            return fig
+        
+        cache = get_chart_cache()
+        return cache.get_or_build(cache.key('pie', df, [names, values, title]), build)
     except Exception as e:
         st.error(f"Error creating pie chart: {e}")
         return None
@@ -74,13 +162,41 @@ def create_bar_chart(data, x, y, title):
         if df.empty:
             return None
         
-        fig = px.bar(df, x=x, y=y, title=title)
-        fig.update_layout(showlegend=False)
-        return fig
+        def build():
+            fig = px.bar(df, x=x, y=y, title=title)
+            fig.update_layout(showlegend=False)
+            return fig
+        
+        cache = get_chart_cache()
+        return cache.get_or_build(cache.key('bar', df, [x, y, title]), build)
     except Exception as e:
         st.error(f"Error creating bar chart: {e}")
         return None
 
+def create_heatmap(data, x, y, z, title, y_labels=None):
+    """Create heatmap of z summed over x and y, rows optionally relabelled via y_labels"""
+    if data is None or len(data) == 0:
+        return None
+    
+    try:
+        df = pd.DataFrame(data)
+        if df.empty:
+            return None
+        
+        def build():
+            matrix = df.pivot_table(index=y, columns=x, values=z, aggfunc='sum', fill_value=0)
+            if y_labels:
+                matrix.index = [y_labels.get(value, value) for value in matrix.index]
+            fig = px.imshow(matrix, aspect='auto', title=title, color_continuous_scale='Blues',
+                            labels=dict(x=x, y=y, color=z))
+            return fig
+        
+        cache = get_chart_cache()
+        return cache.get_or_build(cache.key('heatmap', df, [x, y, z, title, y_labels]), build)
+    except Exception as e:
+        st.error(f"Error creating heatmap: {e}")
+        return None
+
 def display_notification_badge(unread_count):
     """Display notification badge"""
     if unread_count > 0:
@@ -119,6 +235,19 @@ def format_datetime(datetime_obj):
     except AttributeError:
         return "N/A"
 
+def format_currency_column(series, missing='N/A'):
+    """Vectorized format_currency: each distinct amount is formatted once"""
+    codes, uniques = pd.factorize(series, use_na_sentinel=True)
+    labels = np.array([format_currency(value) for value in uniques] + [missing], dtype=object)
+    return pd.Series(labels[codes], index=series.index)
+
+def format_datetime_column(series, fmt="%d-%m-%Y %H:%M", missing='N/A'):
+    """Vectorized format_datetime / format_date for a column of dates or timestamps"""
+    return pd.to_datetime(series, errors='coerce').dt.strftime(fmt).fillna(missing)
+
+def format_date_column(series, missing='N/A'):
+    return format_datetime_column(series, "%d-%m-%Y", missing)
+
 def get_status_color(status):
     """Get color for status display"""
     status_colors = {
@@ -141,23 +270,23 @@ def create_data_table(data, columns=None):
         return
         
     try:
-        df = pd.DataFrame(data)
+        df = data.copy() if isinstance(data, pd.DataFrame) else pd.DataFrame(data)
         if df.empty:
             st.info("No data available")
             return
         
         # Format specific columns
         if 'amount' in df.columns:
-            df['amount'] = df['amount'].apply(lambda x: format_currency(x) if x is not None else 'N/A')
+            df['amount'] = format_currency_column(df['amount'])
         
         if 'created_at' in df.columns:
-            df['created_at'] = df['created_at'].apply(lambda x: format_datetime(x) if x is not None else 'N/A')
+            df['created_at'] = format_datetime_column(df['created_at'])
         
         if 'due_date' in df.columns:
-            df['due_date'] = df['due_date'].apply(lambda x: format_date(x) if x is not None else 'N/A')
+            df['due_date'] = format_date_column(df['due_date'])
         
         if 'payment_date' in df.columns:
-            df['payment_date'] = df['payment_date'].apply(lambda x: format_date(x) if x is not None else 'N/A')
+            df['payment_date'] = format_date_column(df['payment_date'])
         
         if columns:
             st.dataframe(df[columns], use_container_width=True)
@@ -198,11 +327,7 @@ def check_overdue_bills(db):
     """Check and update overdue bills"""
     try:
         cursor = db.connection.cursor()
-        cursor.execute("""
-            UPDATE bills 
-            SET payment_status = 'overdue' 
-            WHERE payment_status = 'pending' AND due_date < CURRENT_DATE
-        """)
+        cursor.execute(dashboard_sql.MARK_OVERDUE_BILLS)
         cursor.close()
     except Exception as e:
         st.error(f"Error checking overdue bills: {e}")
@@ -214,23 +339,25 @@ def create_notification_display(notifications, db, user_id):
         return
     
     for notification in notifications:
-        with st.expander(f"📢 {notification['title']} - {format_datetime(notification['created_at'])}"):
-            st.write(notification['message'])
+        with st.expander(f"📢 {notification.title} - {format_datetime(notification.created_at)}"):
+            st.write(notification.message)
             
             col1, col2 = st.columns([3, 1])
             with col2:
-                if st.button(f"Mark as Read", key=f"read_{notification['notification_id']}"):
-                    db.mark_notification_read(notification['notification_id'], user_id)
+                if st.button(f"Mark as Read", key=f"read_{notification.notification_id}"):
+                    db.mark_notification_read(notification.notification_id, user_id)
                     st.success("Marked as read!")
-                    st.rerun()
+                    rerun_section()
 
 def generate_unique_key(prefix, obj, index=None):
     """
     Generate a unique key for Streamlit elements
     prefix: string prefix for the key
-    obj: dictionary containing the data
+    obj: dictionary or row model containing the data
     index: optional index to ensure uniqueness
     """
+    if hasattr(obj, 'as_dict'):
+        obj = obj.as_dict()
     key_parts = [prefix]
     
     # Include unique identifiers from the object
@@ -255,67 +382,54 @@ def generate_unique_key(prefix, obj, index=None):
     
     return "_".join(key_parts)
 
+@section_fragment
 def create_poll_display(polls, db, user_id):
     """Display polls with voting interface"""
     if not polls or len(polls) == 0:
         st.info("No active polls")
         return
     
+    poll_ids = [poll.poll_id for poll in polls]
+    options_by_poll = db.get_poll_options(poll_ids)
+    user_votes = db.get_user_votes(user_id, poll_ids)
+    
     for poll in polls:
-        st.subheader(f"🗳️ {poll['title']}")
-        st.write(poll['description'])
+        st.subheader(f"🗳️ {poll.title}")
+        st.write(poll.description)
         
-        # Check if user has already voted
         cursor = db.connection.cursor()
-        cursor.execute("""
-            SELECT * FROM votes WHERE poll_id = %s AND user_id = %s
-        """, (poll['poll_id'], user_id))
+        options = options_by_poll.get(poll.poll_id, [])
         
-        has_voted = cursor.fetchone() is not None
-        
-        if has_voted:
+        if poll.poll_id in user_votes:
             st.info("✅ You have already voted in this poll")
             
             # Show results
-            cursor.execute("""
-                SELECT option_text, vote_count 
-                FROM poll_options 
-                WHERE poll_id = %s
-                ORDER BY vote_count DESC
-            """, (poll['poll_id'],))
-            
-            results = cursor.fetchall()
+            results = sorted(options, key=lambda opt: opt['vote_count'], reverse=True)
             if results and len(results) > 0:
-                results_df = pd.DataFrame(results, columns=['Option', 'Votes'])
+                results_df = pd.DataFrame([(opt['option_text'], opt['vote_count']) for opt in results],
+                                          columns=['Option', 'Votes'])
                 fig = create_bar_chart(results_df, 'Option', 'Votes', "Poll Results")
                 if fig:
                     st.plotly_chart(fig, use_container_width=True)
         else:
             # Show voting options
-            cursor.execute("""
-                SELECT option_id, option_text 
-                FROM poll_options 
-                WHERE poll_id = %s
-            """, (poll['poll_id'],))
-            
-            options = cursor.fetchall()
             if options and len(options) > 0:
-                option_texts = [opt[1] for opt in options]
+                option_texts = [opt['option_text'] for opt in options]
                 selected_option = st.radio(
                     "Select your choice:",
                     option_texts,
-                    key=f"poll_{poll['poll_id']}"
+                    key=f"poll_{poll.poll_id}"
                 )
                 
-                if st.button(f"Vote", key=f"vote_{poll['poll_id']}"):
+                if st.button(f"Vote", key=f"vote_{poll.poll_id}"):
                     # Find selected option_id
-                    selected_option_id = next(opt[0] for opt in options if opt[1] == selected_option)
+                    selected_option_id = next(opt['option_id'] for opt in options if opt['option_text'] == selected_option)
                     
                     # Record vote
                     cursor.execute("""
                         INSERT INTO votes (poll_id, option_id, user_id)
                         VALUES (%s, %s, %s)
-                    """, (poll['poll_id'], selected_option_id, user_id))
+                    """, (poll.poll_id, selected_option_id, user_id))
                     
                     # Update vote count
                     cursor.execute("""
@@ -325,7 +439,74 @@ def create_poll_display(polls, db, user_id):
                     """, (selected_option_id,))
                     
                     st.success("Vote recorded successfully!")
-                    st.rerun()
+                    rerun_section()
         
         cursor.close()
-        st.divider()
\ No newline at end of file
+        st.divider()
+
+def visitor_pass_status(visitor_pass, today=None):
+    """'valid', 'not yet valid', 'expired', 'used' or 'revoked' for a VisitorPass"""
+    today = today or date.today()
+    if visitor_pass.status != 'active':
+        return visitor_pass.status
+    if today < visitor_pass.valid_from:
+        return 'not yet valid'
+    if today > visitor_pass.valid_until:
+        return 'expired'
+    return 'valid'
+
+@section_fragment
+def create_visitor_pass_display(db, user):
+    """Pass creation form and the resident's recent passes with revoke buttons"""
+    with st.form("visitor_pass_form", clear_on_submit=True):
+        col1, col2 = st.columns(2)
+        
+        with col1:
+            visitor_name = st.text_input("Visitor Name")
+            visitor_phone = st.text_input("Visitor Phone (Optional)")
+            vehicle_number = st.text_input("Vehicle Number (Optional)")
+        
+        with col2:
+            purpose = st.text_input("Purpose (Optional)")
+            valid_dates = st.date_input("Valid Dates", value=(date.today(), date.today()))
+            max_uses = st.number_input("Entries Allowed", min_value=1, max_value=60, value=1)
+        
+        submit = st.form_submit_button("Create Pass")
+    
+    if submit:
+        if not isinstance(valid_dates, (tuple, list)):
+            valid_dates = (valid_dates,)
+        if not visitor_name:
+            st.error("Please enter the visitor's name")
+        elif visitor_phone and not validate_phone(visitor_phone):
+            st.error("Please enter a valid 10-digit phone number")
+        else:
+            code = db.create_visitor_pass(user['user_id'], user['flat_number'], visitor_name, visitor_phone,
+                                          vehicle_number.upper(), purpose, valid_dates[0], valid_dates[-1],
+                                          int(max_uses))
+            st.success(f"Pass created. Share this code with {visitor_name}: **{code}**")
+    
+    passes = db.get_user_passes(user['user_id'])
+    if not passes:
+        st.info("You haven't created any visitor passes yet")
+        return
+    
+    st.subheader("🎫 My Passes")
+    for visitor_pass in passes:
+        status = visitor_pass_status(visitor_pass)
+        with st.expander(f"{visitor_pass.code} - {visitor_pass.visitor_name} ({status})"):
+            col1, col2 = st.columns([2, 1])
+            
+            with col1:
+                st.write(f"**Valid:** {format_date(visitor_pass.valid_from)} to {format_date(visitor_pass.valid_until)}")
+                st.write(f"**Entries Used:** {visitor_pass.uses} of {visitor_pass.max_uses}")
+                if visitor_pass.vehicle_number:
+                    st.write(f"**Vehicle:** {visitor_pass.vehicle_number}")
+                if visitor_pass.purpose:
+                    st.write(f"**Purpose:** {visitor_pass.purpose}")
+            
+            with col2:
+                if visitor_pass.status == 'active':
+                    if st.button("Revoke", key=f"revoke_pass_{visitor_pass.pass_id}"):
+                        db.revoke_visitor_pass(visitor_pass.pass_id, user['user_id'])
+                        rerun_section()
@@ -0,0 +1,148 @@
+"""Automatic check-out of visitors whose exit was never recorded
+
+A visitor row stays at ``status = 'in'`` until the gate marks the exit, so
+every missed exit would sit on the live board, in the Current Visitors
+metric and in idx_visitors_inside forever. This job closes out entries older
+than a window (12 hours by default) with an inferred exit_time of
+``entry_time + assumed stay``, capped at the cutoff:
+
+    python visitor_checkout.py                    # one run
+    python visitor_checkout.py --every 900        # keep running every 15 minutes
+    python visitor_checkout.py --window-hours 24 --dry-run
+
+Rows are updated in batches of BATCH_SIZE, oldest first, one short
+transaction each, skipping rows a gate is checking out at the same moment.
+Each run is recorded in visitor_checkout_runs with its cutoff and the number
+of visitors it checked out, updated as every batch commits. updated_at is
+bumped like a manual exit, so the live board drops the rows on its next poll
+and visitor_rollups.py picks up the changed days.
+"""
+
+import os
+import time
+import argparse
+from datetime import timedelta
+
+
+STALE_AFTER = timedelta(hours=float(os.getenv('VISITOR_STALE_AFTER_HOURS', '12')))
+ASSUMED_STAY = timedelta(minutes=float(os.getenv('VISITOR_ASSUMED_STAY_MINUTES', '120')))
+BATCH_SIZE = int(os.getenv('VISITOR_CHECKOUT_BATCH', '500'))
+
+# Oldest stale rows first, read through idx_visitors_inside
+CHECKOUT_BATCH_SQL = """
+    WITH stale AS (
+        SELECT visitor_id, entry_time
+        FROM visitors
+        WHERE status = 'in' AND entry_time < %(cutoff)s
+        ORDER BY entry_time
+        LIMIT %(batch_size)s
+        FOR UPDATE SKIP LOCKED
+    )
+    UPDATE visitors v
+    SET status = 'out',
+        exit_time = LEAST(v.entry_time + %(assumed_stay)s, %(cutoff)s),
+        updated_at = LOCALTIMESTAMP
+    FROM stale
+    WHERE v.visitor_id = stale.visitor_id AND v.entry_time = stale.entry_time
+"""
+
+
+def count_stale_visitors(cursor, stale_after=STALE_AFTER):
+    cursor.execute("SELECT COUNT(*) FROM visitors WHERE status = 'in' AND entry_time < LOCALTIMESTAMP - %s",
+                   (stale_after,))
+    return cursor.fetchone()[0]
+
+
+def check_out_stale_visitors(connection, stale_after=STALE_AFTER, assumed_stay=ASSUMED_STAY,
+                             batch_size=BATCH_SIZE, pause=0.0):
+    """Check out every visitor inside for longer than stale_after; returns (run_id, count)
+
+    Each batch commits together with the run's running total, so an
+    interrupted run still records what it did. pause sleeps between batches
+    to leave room for gate traffic on a large backlog.
+    """
+    autocommit = connection.autocommit
+    connection.autocommit = False
+    cursor = connection.cursor()
+    try:
+        cursor.execute("""
+            INSERT INTO visitor_checkout_runs (cutoff)
+            VALUES (LOCALTIMESTAMP - %s)
+            RETURNING run_id, cutoff
+        """, (stale_after,))
+        run_id, cutoff = cursor.fetchone()
+        connection.commit()
+
+        params = {'cutoff': cutoff, 'assumed_stay': assumed_stay, 'batch_size': batch_size}
+        total = 0
+        while True:
+            cursor.execute(CHECKOUT_BATCH_SQL, params)
+            count = cursor.rowcount
+            if count:
+                cursor.execute("UPDATE visitor_checkout_runs SET checked_out = checked_out + %s WHERE run_id = %s",
+                               (count, run_id))
+            connection.commit()
+            total += count
+            if count < batch_size:
+                break
+            if pause:
+                time.sleep(pause)
+
+        cursor.execute("UPDATE visitor_checkout_runs SET finished_at = LOCALTIMESTAMP WHERE run_id = %s", (run_id,))
+        connection.commit()
+        return run_id, total
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.autocommit = autocommit
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Check out visitors whose exit was never recorded")
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL'), help="default: $DATABASE_URL")
+    parser.add_argument('--window-hours', type=float, default=STALE_AFTER.total_seconds() / 3600,
+                        help=f"check out entries older than this (default: {STALE_AFTER.total_seconds() / 3600:g})")
+    parser.add_argument('--assumed-stay-minutes', type=float, default=ASSUMED_STAY.total_seconds() / 60,
+                        help=f"inferred stay before exit (default: {ASSUMED_STAY.total_seconds() / 60:g})")
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help=f"default: {BATCH_SIZE}")
+    parser.add_argument('--pause', type=float, default=0.0, metavar='SECONDS', help="sleep between batches")
+    parser.add_argument('--every', type=float, metavar='SECONDS', help="keep running at this interval")
+    parser.add_argument('--dry-run', action='store_true', help="only count the visitors that would be checked out")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.database_url:
+        raise SystemExit("Set DATABASE_URL or pass --database-url")
+    os.environ['DATABASE_URL'] = args.database_url
+    stale_after = timedelta(hours=args.window_hours)
+    assumed_stay = timedelta(minutes=args.assumed_stay_minutes)
+
+    from database import Database
+    db = Database()
+    try:
+        if args.dry_run:
+            cursor = db.connection.cursor()
+            print(f"{count_stale_visitors(cursor, stale_after):,} visitor(s) would be checked out")
+            cursor.close()
+            return
+        while True:
+            start = time.perf_counter()
+            run_id, count = check_out_stale_visitors(db.connection, stale_after, assumed_stay,
+                                                     args.batch_size, args.pause)
+            elapsed = time.perf_counter() - start
+            print(f"Run {run_id}: checked out {count:,} visitor(s) in {elapsed:.2f}s")
+            if not args.every:
+                break
+            time.sleep(max(0.0, args.every - elapsed))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.close_connection()
+
+
+if __name__ == "__main__":
+    main()
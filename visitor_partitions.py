@@ -0,0 +1,320 @@
+"""Monthly partitions and retention for the visitors table
+
+visitors is range partitioned by month on entry_time, one table per month
+named ``visitors_y2026m10``. Database.create_tables keeps partitions for the
+previous, current and next PARTITION_MONTHS_AHEAD months in place, so day to
+day nothing needs to run by hand. The CLI covers the rest:
+
+    python visitor_partitions.py ensure --from 2021-01
+    python visitor_partitions.py archive --keep-months 24 --archive-dir visitor_archive
+    python visitor_partitions.py migrate
+
+``archive`` detaches every month that ended before the retention window,
+writes it to ``<archive-dir>/<partition>.csv.gz`` and drops it
+(``--detach-only`` keeps the detached table, renamed with a ``_detached``
+suffix, instead). The detach is committed on its own (CONCURRENTLY on
+PostgreSQL 14+) before the dump starts, so the lock on visitors lasts only as
+long as the detach. Schedule it monthly from cron.
+
+``migrate`` converts a visitors table created before partitioning: the rows
+are copied into a new partitioned table in a single transaction, holding an
+exclusive lock on visitors until it commits.
+"""
+
+import os
+import re
+import gzip
+import argparse
+from datetime import date
+
+
+# Months created beyond the current one, and months archive keeps by default
+PARTITION_MONTHS_AHEAD = int(os.getenv('VISITOR_PARTITIONS_AHEAD', '3'))
+RETENTION_MONTHS = int(os.getenv('VISITOR_RETENTION_MONTHS', '24'))
+
+PARTITION_NAME = re.compile(r'^visitors_y(\d{4})m(\d{2})$')
+
+
+def month_start(value):
+    return date(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    years, index = divmod(month.month - 1 + count, 12)
+    return date(month.year + years, index + 1, 1)
+
+
+def partition_name(month):
+    return f"visitors_y{month.year}m{month.month:02d}"
+
+
+def partition_month(name):
+    """First day of the month a partition covers, or None for tables not named like one"""
+    match = PARTITION_NAME.match(name)
+    return date(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def ensure_partitions(cursor, first, last):
+    """Create any missing monthly partitions from first's month through last's month
+
+    Returns the names created. Does nothing while visitors is still an
+    unpartitioned table.
+    """
+    months = []
+    month = month_start(first)
+    while month <= month_start(last):
+        months.append(month)
+        month = add_months(month, 1)
+
+    cursor.execute("""
+        SELECT c.relkind = 'p',
+               ARRAY(SELECT relname::text FROM pg_class WHERE relname = ANY(%s))
+        FROM pg_class c
+        WHERE c.oid = to_regclass('visitors')
+    """, ([partition_name(month) for month in months],))
+    row = cursor.fetchone()
+    if not row or not row[0]:
+        return []
+
+    existing = set(row[1])
+    created = []
+    for month in months:
+        name = partition_name(month)
+        if name in existing:
+            continue
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {name} PARTITION OF visitors
+            FOR VALUES FROM (%s) TO (%s)
+        """, (month, add_months(month, 1)))
+        created.append(name)
+    return created
+
+
+def ensure_upcoming_partitions(cursor, months_ahead=PARTITION_MONTHS_AHEAD):
+    """Partitions from last month through months_ahead months from now
+
+    Starts a month back so a database clock behind the app's near a month
+    boundary still finds its partition.
+    """
+    this_month = month_start(date.today())
+    return ensure_partitions(cursor, add_months(this_month, -1), add_months(this_month, months_ahead))
+
+
+def list_partitions(cursor):
+    """(month, name) for each attached monthly partition, oldest first"""
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass('visitors')
+    """)
+    partitions = [(partition_month(name), name) for (name,) in cursor.fetchall()]
+    return sorted(partition for partition in partitions if partition[0])
+
+
+def list_detached_partitions(cursor):
+    """(month, name) for monthly tables already detached but not yet archived
+
+    Left behind when an archive run failed between the detach and the drop.
+    """
+    cursor.execute("""
+        SELECT relname
+        FROM pg_class
+        WHERE relkind = 'r' AND NOT relispartition
+          AND relnamespace = 'public'::regnamespace AND relname ~ '^visitors_y[0-9]{4}m[0-9]{2}$'
+    """)
+    return sorted((partition_month(name), name) for (name,) in cursor.fetchall())
+
+
+def expired_partitions(cursor, keep_months=RETENTION_MONTHS):
+    """Partitions whose month ended before the last keep_months months (counting the current one)
+
+    Includes detached leftovers of the same months, so a failed run is picked up again.
+    """
+    cutoff = add_months(month_start(date.today()), 1 - keep_months)
+    partitions = set(list_partitions(cursor)) | set(list_detached_partitions(cursor))
+    return sorted((month, name) for month, name in partitions if month < cutoff)
+
+
+def detach_partition(connection, name):
+    """Detach a partition from visitors, holding the parent's lock only for the detach itself
+
+    Uses DETACH ... CONCURRENTLY on PostgreSQL 14+, which never blocks gate
+    inserts and reads (and must run outside a transaction); older servers
+    detach in a transaction of its own. A concurrent detach interrupted
+    earlier is finalized. Does nothing once the table is detached.
+    """
+    autocommit = connection.autocommit
+    connection.autocommit = True
+    cursor = connection.cursor()
+    try:
+        concurrent = connection.server_version >= 140000
+        pending = "i.inhdetachpending" if concurrent else "FALSE"
+        cursor.execute(f"""
+            SELECT {pending} FROM pg_inherits i
+            WHERE i.inhparent = to_regclass('visitors') AND i.inhrelid = to_regclass(%s)
+        """, (name,))
+        row = cursor.fetchone()
+        if row is None:
+            return
+        if row[0]:
+            cursor.execute(f"ALTER TABLE visitors DETACH PARTITION {name} FINALIZE")
+        elif concurrent:
+            cursor.execute(f"ALTER TABLE visitors DETACH PARTITION {name} CONCURRENTLY")
+        else:
+            cursor.execute(f"ALTER TABLE visitors DETACH PARTITION {name}")
+    finally:
+        cursor.close()
+        connection.autocommit = autocommit
+
+
+def archive_partition(connection, name, archive_dir, detach_only=False):
+    """Detach one partition and either dump it to gzip CSV and drop it, or keep it renamed
+
+    The detach commits on its own (see detach_partition); the dump and drop
+    then run in a second transaction that only locks the standalone table,
+    so gate traffic on visitors isn't blocked while the month is written.
+    The archive file only appears once the drop has committed. Returns the
+    archive path, or the detached table's name.
+    """
+    detach_partition(connection, name)
+
+    connection.autocommit = False
+    cursor = connection.cursor()
+    try:
+        if detach_only:
+            cursor.execute(f"ALTER TABLE {name} RENAME TO {name}_detached")
+            connection.commit()
+            return f"{name}_detached"
+
+        path = os.path.join(archive_dir, f"{name}.csv.gz")
+        partial = path + '.partial'
+        with gzip.open(partial, 'wt', encoding='utf-8', newline='') as f:
+            cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER)", f)
+        cursor.execute(f"DROP TABLE {name}")
+        connection.commit()
+        os.replace(partial, path)
+        return path
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+
+
+def migrate(db):
+    """Convert an unpartitioned visitors table, keeping ids and the id sequence position"""
+    connection = db.connection
+    connection.autocommit = False
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT relkind FROM pg_class WHERE oid = to_regclass('visitors')")
+        if cursor.fetchone()[0] == 'p':
+            print("visitors is already partitioned")
+            connection.rollback()
+            return False
+
+        cursor.execute("LOCK TABLE visitors IN ACCESS EXCLUSIVE MODE")
+        cursor.execute("UPDATE visitors SET entry_time = COALESCE(exit_time, LOCALTIMESTAMP) WHERE entry_time IS NULL")
+        cursor.execute("SELECT MIN(entry_time), MAX(visitor_id) FROM visitors")
+        oldest, max_id = cursor.fetchone()
+
+        # Free the names the new table and its indexes are created with
+        cursor.execute("ALTER TABLE visitors RENAME TO visitors_unpartitioned")
+        cursor.execute("ALTER SEQUENCE visitors_visitor_id_seq RENAME TO visitors_unpartitioned_visitor_id_seq")
+        cursor.execute("""
+            SELECT indexrelid::regclass::text FROM pg_index
+            WHERE indrelid = 'visitors_unpartitioned'::regclass
+        """)
+        for (index,) in cursor.fetchall():
+            cursor.execute(f"ALTER INDEX {index} RENAME TO {index}_unpartitioned")
+
+        db.create_visitors_table(cursor)
+        ensure_partitions(cursor, oldest or date.today(), date.today())
+
+        cursor.execute("""
+            SELECT column_name FROM information_schema.columns
+            WHERE table_name = 'visitors_unpartitioned'
+            ORDER BY ordinal_position
+        """)
+        columns = ', '.join(name for (name,) in cursor.fetchall())
+        cursor.execute(f"INSERT INTO visitors ({columns}) SELECT {columns} FROM visitors_unpartitioned")
+        copied = cursor.rowcount
+        cursor.execute("SELECT setval('visitors_visitor_id_seq', GREATEST(%s, 1))", (max_id or 0,))
+        cursor.execute("DROP TABLE visitors_unpartitioned")
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.autocommit = True
+
+    cursor = connection.cursor()
+    cursor.execute("ANALYZE visitors")
+    partitions = list_partitions(cursor)
+    cursor.close()
+    print(f"Copied {copied:,} visitors into {len(partitions)} monthly partitions")
+    return True
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the monthly partitions of the visitors table")
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL'), help="default: $DATABASE_URL")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    ensure = commands.add_parser('ensure', help="create missing partitions")
+    ensure.add_argument('--from', dest='first', metavar='YYYY-MM',
+                        help="first month to cover (default: last month)")
+    ensure.add_argument('--ahead', type=int, default=PARTITION_MONTHS_AHEAD,
+                        help=f"months to create past the current one (default: {PARTITION_MONTHS_AHEAD})")
+
+    archive = commands.add_parser('archive', help="detach and archive months past the retention window")
+    archive.add_argument('--keep-months', type=int, default=RETENTION_MONTHS,
+                         help=f"months kept attached, including the current one (default: {RETENTION_MONTHS})")
+    archive.add_argument('--archive-dir', default='visitor_archive', help="default: visitor_archive")
+    archive.add_argument('--detach-only', action='store_true', help="keep detached tables instead of dumping them")
+    archive.add_argument('--dry-run', action='store_true', help="only list the partitions that would be archived")
+
+    commands.add_parser('migrate', help="convert an unpartitioned visitors table")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.database_url:
+        raise SystemExit("Set DATABASE_URL or pass --database-url")
+    os.environ['DATABASE_URL'] = args.database_url
+
+    from database import Database
+    db = Database()
+    try:
+        if args.command == 'migrate':
+            migrate(db)
+        elif args.command == 'ensure':
+            this_month = month_start(date.today())
+            first = date.fromisoformat(f"{args.first}-01") if args.first else add_months(this_month, -1)
+            cursor = db.connection.cursor()
+            created = ensure_partitions(cursor, first, add_months(this_month, args.ahead))
+            cursor.close()
+            print(f"Created {len(created)} partition(s): {', '.join(created)}" if created else "All partitions exist")
+        elif args.command == 'archive':
+            cursor = db.connection.cursor()
+            expired = expired_partitions(cursor, args.keep_months)
+            cursor.close()
+            if not expired:
+                print("Nothing to archive")
+            if not args.dry_run and not args.detach_only:
+                os.makedirs(args.archive_dir, exist_ok=True)
+            for month, name in expired:
+                if args.dry_run:
+                    print(f"  would archive {name}")
+                    continue
+                result = archive_partition(db.connection, name, args.archive_dir, args.detach_only)
+                print(f"  {name} -> {result}")
+    finally:
+        db.close_connection()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""Pre-aggregated visitor analytics
+
+The visitor analytics tab reads three rollup tables instead of scanning
+visitors:
+
+    visitor_hourly          visits, exits and total stay per entry hour
+    visitor_flat_daily      visits per flat per day
+    visitor_vehicle_daily   visits per (normalized) vehicle number and flat per day
+
+A refresh finds the visitor rows whose updated_at moved past the stored
+watermark (an index scan on idx_visitors_updated_at), and recomputes the
+rollup rows for just the entry days those rows fall on. An exit recorded
+hours later therefore updates its entry day's stay figures. The first run,
+or ``--rebuild``, aggregates the whole table. Run it from cron or leave it
+looping:
+
+    python visitor_rollups.py               # one incremental refresh
+    python visitor_rollups.py --every 300   # refresh every five minutes
+    python visitor_rollups.py --rebuild
+
+Admins can also refresh from the analytics tab. Concurrent refreshes are
+serialized with an advisory lock, and a refresh that finds it held is skipped.
+"""
+
+import os
+import time
+import argparse
+from datetime import timedelta
+
+from database import VEHICLE_KEY_SQL
+
+
+ROLLUP_NAME = 'visitors'
+ROLLUP_TABLES = ['visitor_hourly', 'visitor_flat_daily', 'visitor_vehicle_daily']
+# How far before the watermark a refresh looks, for rows committed late with an older updated_at
+ROLLUP_OVERLAP = timedelta(minutes=int(os.getenv('VISITOR_ROLLUP_OVERLAP_MINUTES', '5')))
+
+# Each rollup recomputed from the visitors matching {where}
+ROLLUP_INSERTS = [
+    """
+    INSERT INTO visitor_hourly (hour, visits, exits, stay_seconds)
+    SELECT date_trunc('hour', entry_time), COUNT(*),
+           COUNT(*) FILTER (WHERE exit_time >= entry_time),
+           COALESCE(SUM(EXTRACT(EPOCH FROM exit_time - entry_time))
+                    FILTER (WHERE exit_time >= entry_time), 0)::bigint
+    FROM visitors
+    WHERE {where}
+    GROUP BY 1
+    """,
+    """
+    INSERT INTO visitor_flat_daily (day, flat_number, visits)
+    SELECT entry_time::date, flat_number, COUNT(*)
+    FROM visitors
+    WHERE {where}
+    GROUP BY 1, 2
+    """,
+    f"""
+    INSERT INTO visitor_vehicle_daily (day, vehicle_number, flat_number, visits)
+    SELECT entry_time::date, {VEHICLE_KEY_SQL}, flat_number, COUNT(*)
+    FROM visitors
+    WHERE {{where}} AND {VEHICLE_KEY_SQL} <> ''
+    GROUP BY 1, 2, 3
+    """,
+]
+
+# Rollup rows covering the given days; ranges first so the primary keys are used
+ROLLUP_DELETES = [
+    "DELETE FROM visitor_hourly WHERE hour >= %(first)s AND hour < %(after)s AND hour::date = ANY(%(days)s)",
+    "DELETE FROM visitor_flat_daily WHERE day = ANY(%(days)s)",
+    "DELETE FROM visitor_vehicle_daily WHERE day = ANY(%(days)s)",
+]
+
+DAYS_WHERE = "entry_time >= %(first)s AND entry_time < %(after)s AND entry_time::date = ANY(%(days)s)"
+
+
+def refresh_visitor_rollups(connection, rebuild=False, overlap=ROLLUP_OVERLAP):
+    """Bring the rollups up to date in one transaction
+
+    Returns the number of entry days recomputed (every day on a rebuild),
+    or None when another refresh was already running.
+    """
+    autocommit = connection.autocommit
+    connection.autocommit = False
+    cursor = connection.cursor()
+    try:
+        cursor.execute("SELECT pg_try_advisory_xact_lock(hashtext('visitor_rollups'))")
+        if not cursor.fetchone()[0]:
+            connection.rollback()
+            return None
+
+        cursor.execute("SELECT watermark FROM rollup_state WHERE name = %s", (ROLLUP_NAME,))
+        row = cursor.fetchone()
+        watermark = row[0] if row else None
+
+        if rebuild or watermark is None:
+            cursor.execute("SELECT MAX(updated_at) FROM visitors")
+            watermark = cursor.fetchone()[0]
+            cursor.execute(f"TRUNCATE {', '.join(ROLLUP_TABLES)}")
+            for sql in ROLLUP_INSERTS:
+                cursor.execute(sql.format(where="TRUE"))
+            cursor.execute("SELECT COUNT(*) FROM (SELECT DISTINCT hour::date FROM visitor_hourly) days")
+            days_refreshed = cursor.fetchone()[0]
+        else:
+            cursor.execute("""
+                SELECT entry_time::date, MAX(updated_at)
+                FROM visitors
+                WHERE updated_at > %s
+                GROUP BY 1
+            """, (watermark - overlap,))
+            changed = cursor.fetchall()
+            if changed:
+                days = sorted(day for day, _ in changed)
+                params = {'days': days, 'first': days[0], 'after': days[-1] + timedelta(days=1)}
+                for sql in ROLLUP_DELETES:
+                    cursor.execute(sql, params)
+                for sql in ROLLUP_INSERTS:
+                    cursor.execute(sql.format(where=DAYS_WHERE), params)
+                watermark = max([watermark] + [latest for _, latest in changed])
+            days_refreshed = len(changed)
+
+        cursor.execute("""
+            INSERT INTO rollup_state (name, watermark, refreshed_at)
+            VALUES (%s, %s, LOCALTIMESTAMP)
+            ON CONFLICT (name) DO UPDATE
+            SET watermark = EXCLUDED.watermark, refreshed_at = EXCLUDED.refreshed_at
+        """, (ROLLUP_NAME, watermark))
+        connection.commit()
+        return days_refreshed
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        cursor.close()
+        connection.autocommit = autocommit
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Refresh the visitor analytics rollups")
+    parser.add_argument('--database-url', default=os.getenv('DATABASE_URL'), help="default: $DATABASE_URL")
+    parser.add_argument('--rebuild', action='store_true', help="recompute every rollup from scratch")
+    parser.add_argument('--every', type=float, metavar='SECONDS', help="keep refreshing at this interval")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not args.database_url:
+        raise SystemExit("Set DATABASE_URL or pass --database-url")
+    os.environ['DATABASE_URL'] = args.database_url
+
+    from database import Database
+    db = Database()
+    rebuild = args.rebuild
+    try:
+        while True:
+            start = time.perf_counter()
+            days = refresh_visitor_rollups(db.connection, rebuild=rebuild)
+            elapsed = time.perf_counter() - start
+            if days is None:
+                print("Another refresh is running, skipped")
+            else:
+                print(f"Refreshed {days} day(s) in {elapsed:.2f}s")
+            if not args.every:
+                break
+            rebuild = False
+            time.sleep(max(0.0, args.every - elapsed))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        db.close_connection()
+
+
+if __name__ == "__main__":
+    main()